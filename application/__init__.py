@@ -14,4 +14,16 @@ def create_app():
     from application.routes.foldseek_routes import foldseek_bp
     app.register_blueprint(foldseek_bp)
 
+    # Bases creadas antes de StructureBlobs: las lecturas necesitan la columna pdb_hash
+    # (no escribe si el esquema ya está al día; con una base de sólo lectura sólo avisa)
+    from application.routes import foldseek_routes
+    from application.services.structure_store import ensure_schema
+    ensure_schema(foldseek_routes.db_path)
+
+    from application.routes.api_routes import api_bp
+    app.register_blueprint(api_bp)
+
+    from application.services import instrumentation
+    instrumentation.init_app(app)
+
     return app
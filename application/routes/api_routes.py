@@ -0,0 +1,321 @@
+import gzip
+import hashlib
+import os
+from flask import Blueprint, Response, abort, jsonify, redirect, request, send_file, stream_with_context, url_for
+from application.services.db_connection import get_connection_manager
+from application.services.bulk_export import (
+    FORMATS, arrow_available, stream_zones_arrow, stream_zones_csv
+)
+from application.services.download_packages import get_export_jobs, package_members, stream_zip
+from application.services.foldseek_data_fetch import FoldSeekDataFetch
+from application.services.instrumentation import stage
+from application.services.uniprot_data_fetch import UniProtDataFetch
+from application.services.result_cache import ResultCache
+from application.services.structure_files import (
+    get_alignment_pdb, get_alignment_pdb_hash, get_reference_pdb, get_reference_pdb_hash
+)
+from application.services.summary_tables import get_data_version
+
+try:
+    import brotli
+except ImportError:  # Brotli es opcional: sin él se sirve gzip
+    brotli = None
+
+api_bp = Blueprint('api', __name__, url_prefix="/api")
+
+db_path = os.path.join("database", "proteins_discovery.db")
+foldseek_fetcher = FoldSeekDataFetch(db_path)
+uniprot_fetcher = UniProtDataFetch(db_path)
+
+SOURCES = ("foldseek", "uniprot")
+
+# Los PDB alineados cambian sólo al reingerir; el de referencia es prácticamente inmutable
+ALIGNED_PDB_CACHE_CONTROL = "public, max-age=3600"
+REFERENCE_PDB_CACHE_CONTROL = "public, max-age=86400"
+JSON_CACHE_CONTROL = "public, max-age=60"
+
+EXPORT_MIMETYPES = {
+    ".zip": "application/zip",
+    ".parquet": "application/vnd.apache.parquet",
+    ".csv": "text/csv",
+}
+
+# Cuerpos ya comprimidos, por (ETag, codificación)
+_compressed = ResultCache(max_entries=64, max_bytes=128 * 1024 ** 2)
+
+
+def _preferred_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(data, encoding, digest):
+    key = ("pdb", digest, encoding)
+    body = _compressed.get(key)
+    if body is None:
+        body = brotli.compress(data, quality=5) if encoding == "br" else gzip.compress(data, compresslevel=6)
+        _compressed.put(key, body)
+    return body
+
+
+def _not_modified(etag, cache_control):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def pdb_response(load_text, cache_control, digest=None):
+    """
+    Respuesta con el texto PDB, comprimida según Accept-Encoding, con ETag fuerte por
+    variante y soporte de peticiones condicionales (304).
+
+    El ETag es el pdb_hash almacenado (``digest``), por lo que una petición condicional
+    se responde sin leer ni descomprimir el PDB; sólo las filas antiguas sin hash
+    calculan el SHA-256 del texto.
+
+    Args:
+        load_text (callable): Devuelve el texto PDB (o None si no existe).
+        cache_control (str): Cabecera Cache-Control.
+        digest (str): pdb_hash almacenado, si lo hay.
+
+    Returns:
+        Response: Respuesta, o None si el PDB no existe.
+    """
+    encoding = _preferred_encoding()
+    if digest:
+        etag = f"{digest}-{encoding}" if encoding else digest
+        if etag in request.if_none_match:
+            return _not_modified(etag, cache_control)
+
+    pdb_text = load_text()
+    if not pdb_text:
+        return None
+    data = pdb_text.encode()
+    if not digest:
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        etag = f"{digest}-{encoding}" if encoding else digest
+        if etag in request.if_none_match:
+            return _not_modified(etag, cache_control)
+
+    body = _compress(data, encoding, digest) if encoding else data
+    response = Response(body, mimetype="chemical/x-pdb")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def json_response(payload, etag):
+    """JSON con ETag (derivado de data_version) y Cache-Control."""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = JSON_CACHE_CONTROL
+    return response
+
+
+def _check_source(source):
+    if source not in SOURCES:
+        abort(404, description=f"Fuente desconocida: {source}")
+
+
+@api_bp.route("/structures")
+def structures():
+    """Listado de estructuras disponibles (?source=foldseek|uniprot; ambas por defecto)."""
+    source = request.args.get("source")
+    if source:
+        _check_source(source)
+    payload = {}
+    if source in (None, "foldseek"):
+        payload["foldseek"] = foldseek_fetcher.get_foldseek_structures()
+    if source in (None, "uniprot"):
+        payload["uniprot"] = uniprot_fetcher.get_uniprot_structures()
+    return jsonify(payload)
+
+
+@api_bp.route("/alignments/<source>/<int:alignment_id>")
+def alignment(source, alignment_id):
+    """Alineamiento principal, zonas alineadas y URL de ambas estructuras."""
+    _check_source(source)
+    with stage("db"), get_connection_manager(db_path).reader() as conn:
+        data_version = get_data_version(conn, source, alignment_id)
+    etag = f"{source}-{alignment_id}-{data_version}"
+    if etag in request.if_none_match:
+        return _not_modified(etag, JSON_CACHE_CONTROL)
+
+    if source == "foldseek":
+        with stage("db"):
+            details = foldseek_fetcher.get_alignment_details(alignment_id)
+        main = {
+            "reference": details.get("reference_aligned"),
+            "match": details.get("alignment_match"),
+            "target": details.get("target_aligned"),
+            "similarity": details.get("similarity"),
+        }
+    else:
+        with stage("db"):
+            details = uniprot_fetcher.get_uniprot_alignment_details(alignment_id)
+        main = {
+            "reference": details.get("seq_ref"),
+            "match": details.get("alignment_match"),
+            "target": details.get("seq"),
+            "similarity": details.get("similarity"),
+            "protein": {key: details.get(key) for key in ("name", "full_name", "organism", "gene", "description")},
+        }
+    if not details:
+        abort(404, description="Alineamiento no encontrado")
+
+    return json_response({
+        "source": source,
+        "id": alignment_id,
+        "data_version": data_version,
+        "alignment": main,
+        "zones": [zone.to_dict() for zone in details["zones"]],
+        "structures": {
+            "reference": url_for("api.alignment_pdb", source=source, alignment_id=alignment_id, kind="reference"),
+            "aligned": url_for("api.alignment_pdb", source=source, alignment_id=alignment_id, kind="aligned"),
+        },
+    }, etag)
+
+
+@api_bp.route("/pdb/<source>/<int:alignment_id>/<kind>")
+def alignment_pdb(source, alignment_id, kind):
+    """
+    PDB alineado de un alineamiento, o redirección a la URL canónica de su referencia
+    (la misma para todos los alineamientos, de modo que el navegador la descarga una vez).
+    """
+    _check_source(source)
+    if kind not in ("reference", "aligned"):
+        abort(404)
+    reference_id, digest = get_alignment_pdb_hash(db_path, source, alignment_id)
+    if kind == "reference":
+        if reference_id is None:
+            abort(404, description="Alineamiento no encontrado")
+        response = redirect(url_for("api.reference_pdb", reference_sequence_id=reference_id))
+        response.headers["Cache-Control"] = REFERENCE_PDB_CACHE_CONTROL
+        return response
+    response = pdb_response(lambda: get_alignment_pdb(db_path, source, alignment_id)[1],
+                            ALIGNED_PDB_CACHE_CONTROL, digest)
+    if response is None:
+        abort(404, description="Estructura alineada no disponible")
+    return response
+
+
+@api_bp.route("/pdb/reference/<int:reference_sequence_id>")
+def reference_pdb(reference_sequence_id):
+    """PDB de la secuencia de referencia."""
+    response = pdb_response(lambda: get_reference_pdb(db_path, reference_sequence_id),
+                            REFERENCE_PDB_CACHE_CONTROL, get_reference_pdb_hash(db_path, reference_sequence_id))
+    if response is None:
+        abort(404, description="Estructura de referencia no disponible")
+    return response
+
+
+@api_bp.route("/download/<source>/<int:alignment_id>")
+def download_package(source, alignment_id):
+    """Paquete ZIP de un alineamiento, transmitido a medida que se genera."""
+    _check_source(source)
+    members = package_members(db_path, source, alignment_id)
+    first = next(members, None)
+    if first is None:
+        abort(404, description="Alineamiento no encontrado")
+
+    def all_members():
+        yield first
+        yield from members
+
+    response = Response(stream_with_context(stream_zip(all_members())), mimetype="application/zip")
+    response.headers["Content-Disposition"] = f"attachment; filename={source}_{alignment_id}.zip"
+    return response
+
+
+@api_bp.route("/exports", methods=["POST"])
+def create_export():
+    """
+    Inicia una exportación masiva en segundo plano. El cuerpo JSON indica los
+    alineamientos (``{"items": [["foldseek", 3], ...]}``) o una fuente completa
+    (``{"source": "uniprot"}``).
+    """
+    body = request.get_json(silent=True) or {}
+    if "items" in body:
+        try:
+            items = [(source, int(alignment_id)) for source, alignment_id in body["items"]]
+        except (TypeError, ValueError):
+            abort(400, description="items debe ser una lista de pares [fuente, id]")
+        for source, _ in items:
+            _check_source(source)
+    elif body.get("source") == "foldseek":
+        items = [("foldseek", s["alignment_detail_id"]) for s in foldseek_fetcher.get_foldseek_structures()]
+    elif body.get("source") == "uniprot":
+        items = [("uniprot", s["alignment_id"]) for s in uniprot_fetcher.get_uniprot_structures()]
+    else:
+        abort(400, description="Indique items o source")
+
+    job = get_export_jobs(db_path).submit(items)
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers["Location"] = url_for("api.export_status", job_id=job.job_id)
+    return response
+
+
+@api_bp.route("/exports/<job_id>")
+def export_status(job_id):
+    """Estado de una exportación (pending, running, done o failed)."""
+    job = get_export_jobs(db_path).get(job_id)
+    if job is None:
+        abort(404, description="Exportación no encontrada o vencida")
+    payload = job.to_dict()
+    if job.status == "done":
+        payload["download"] = url_for("api.export_file", job_id=job_id)
+    return jsonify(payload)
+
+
+@api_bp.route("/exports/<job_id>/file")
+def export_file(job_id):
+    """Archivo de una exportación terminada (ZIP, o Parquet/CSV para las zonas)."""
+    job = get_export_jobs(db_path).get(job_id)
+    if job is None or job.status != "done":
+        abort(404, description="Exportación no disponible")
+    extension = os.path.splitext(job.path)[1]
+    return send_file(job.path, mimetype=EXPORT_MIMETYPES.get(extension, "application/octet-stream"),
+                     as_attachment=True, download_name=f"export_{job_id}{extension}")
+
+
+@api_bp.route("/export/zones")
+def export_all_zones():
+    """
+    Todas las zonas alineadas con sus metadatos (?format=csv|arrow|parquet, ?source=...).
+    CSV y Arrow se transmiten lote a lote; Parquet se genera como exportación en segundo
+    plano (202 con Location hacia /api/exports/<job_id>).
+    """
+    fmt = request.args.get("format", "csv")
+    if fmt not in FORMATS:
+        abort(400, description=f"Formato no soportado: {fmt}")
+    source = request.args.get("source")
+    if source:
+        _check_source(source)
+    sources = (source,) if source else SOURCES
+    if fmt != "csv" and not arrow_available():
+        fmt = "csv"
+
+    if fmt == "csv":
+        response = Response(stream_with_context(stream_zones_csv(db_path, sources)), mimetype="text/csv")
+    elif fmt == "arrow":
+        response = Response(stream_with_context(stream_zones_arrow(db_path, sources)),
+                            mimetype="application/vnd.apache.arrow.stream")
+    else:
+        job = get_export_jobs(db_path).submit_zones(sources)
+        response = jsonify(job.to_dict())
+        response.status_code = 202
+        response.headers["Location"] = url_for("api.export_status", job_id=job.job_id)
+        return response
+    extension = "csv" if fmt == "csv" else "arrows"
+    response.headers["Content-Disposition"] = f"attachment; filename=zones.{extension}"
+    return response
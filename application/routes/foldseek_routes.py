@@ -4,8 +4,11 @@ from application.services.foldseek_data_fetch import FoldSeekDataFetch
 from application.services.uniprot_data_fetch import UniProtDataFetch
 from application.services.alignment_processor import procesar_estructura_foldseek
 from application.services.py3dmol_service import Py3DMolService
+from application.services.db_connection import get_connection_manager
+from application.services.instrumentation import stage
+from application.services.result_cache import get_result_cache
+from application.services.summary_tables import get_data_version
 import tempfile
-import base64
 
 foldseek_bp = Blueprint('foldseek', __name__, template_folder="../templates")
 
@@ -32,7 +35,8 @@ def procesar_estructura_uniprot(alignment_id, db_path):
     """
     print(f"Procesando UniProt ID: {alignment_id}")
     # Obtener detalles del alineamiento
-    details = uniprot_fetcher.get_uniprot_alignment_details(int(alignment_id))
+    with stage("db"):
+        details = uniprot_fetcher.get_uniprot_alignment_details(int(alignment_id))
     if not details:
         return {
             "ref_pdb": None, 
@@ -56,45 +60,10 @@ def procesar_estructura_uniprot(alignment_id, db_path):
     }
     
     # Procesar zonas alineadas - limitando estrictamente a 4 zonas
-    import sqlite3  # Asegurarnos de importar sqlite3 aquí
-    
-    # Tomar solo los primeros 4 elementos
-    reference_zone_ids = details.get("reference_zone_ids", [])[:4]
-    aligned_sequences = details.get("aligned_sequences", [])[:4]
-    zone_matches = details.get("zone_matches", [])[:4]
-    
-    zonas_alineadas = []
-    
-    # Obtener las zonas de referencia
-    with sqlite3.connect(db_path) as conn:
-        cursor = conn.cursor()
-        
-        try:
-            # Crear un diccionario que mapee IDs de zona a números de zona
-            zone_numbers = {}
-            for i, zone_id in enumerate(reference_zone_ids):
-                if zone_id and zone_id.strip():
-                    try:
-                        cursor.execute("""
-                            SELECT zone_number, sequence_fragment
-                            FROM ReferenceZones
-                            WHERE zone_id = ?
-                        """, (int(zone_id),))
-                        result = cursor.fetchone()
-                        if result and i < len(aligned_sequences) and i < len(zone_matches):
-                            zonas_alineadas.append({
-                                "ref": result[1],
-                                "match": zone_matches[i],
-                                "target": aligned_sequences[i]
-                            })
-                    except (ValueError, TypeError):
-                        continue
-                
-                # Salir temprano una vez que tenemos 4 zonas
-                if len(zonas_alineadas) >= 4:
-                    break
-        except Exception as e:
-            print(f"Error procesando zonas: {e}")
+    zonas_alineadas = [
+        {"ref": zone.reference_fragment, "match": zone.match, "target": zone.fragment}
+        for zone in details.get("zones", []) if zone.reference_fragment is not None
+    ][:4]
     
     # Si hay menos de 4 zonas, rellenar con datos vacíos
     while len(zonas_alineadas) < 4:
@@ -113,23 +82,112 @@ def procesar_estructura_uniprot(alignment_id, db_path):
     }
 
 
+def vista_vacia():
+    """Variables de la plantilla cuando no hay estructura seleccionada."""
+    return {
+        "ref_pdb": False,
+        "aligned_pdb": False,
+        "alignment_main": None,
+        "aligned_zones": [],
+        "mutation_viewer_html": None,
+    }
+
+
+def renderizar_estructura(selected_source, selected_id, show_structures):
+    """
+    Calcula los datos de la vista de una estructura (alineamiento, zonas y, si se
+    piden las estructuras, el visualizador de mutaciones). Mol* descarga los PDB
+    desde la API (/api/pdb/...), por lo que no se incrustan en la página.
+
+    Args:
+        selected_source (str): "foldseek" o "uniprot".
+        selected_id (int): ID del alineamiento.
+        show_structures (bool): Si se deben preparar los visualizadores 3D.
+
+    Returns:
+        dict: Variables de la plantilla.
+    """
+    vista = vista_vacia()
+
+    if selected_source == "foldseek":
+        # Usar el procesador para FoldSeek
+        resultado = procesar_estructura_foldseek(selected_id, db_path)
+        ref_pdb = resultado["ref_pdb"]
+        aligned_pdb = resultado["aligned_pdb"]
+        aligned_zones = resultado["zonas_alineadas"]
+        # La plantilla sólo comprueba que existan: la vista cacheada no guarda los PDB
+        vista.update(ref_pdb=bool(ref_pdb), aligned_pdb=bool(aligned_pdb),
+                     alignment_main=resultado["alineamiento_principal"], aligned_zones=aligned_zones)
+        
+        if show_structures and ref_pdb and aligned_pdb:
+            # SEPARADO: Procesamos datos para el visualizador de mutaciones
+            # La tabla de residuos se construye una sola vez y se comparte con las zonas
+            with stage("pdb_parse"):
+                residue_table = py3dmol_service.residue_table(aligned_pdb, resultado.get("aligned_pdb_hash"))
+                residue_info, count, resids = py3dmol_service.get_residue_info(residue_table)
+            
+            with stage("residue_map"):
+                # Construir mapeo de residuos a secuencia para MUTACIONES
+                res_seq = {}
+                if resultado and "alineamiento_principal" in resultado:
+                    alignment_match = resultado["alineamiento_principal"].get("match", "")
+                    target_aligned = resultado["alineamiento_principal"].get("target", "")
+                    
+                    for i in range(min(len(resids), len(target_aligned), len(alignment_match))):
+                        if i < len(resids) and resids[i]:
+                            res_seq[resids[i][0]] = (target_aligned[i], alignment_match[i])
+                
+                # Construir información de zonas para MUTACIONES
+                zones_matches = []
+                for i, zona in enumerate(aligned_zones):
+                    if zona["ref"] and zona["match"] and zona["target"]:
+                        zone_residues = py3dmol_service.get_zone_residues(
+                            residue_table, 
+                            zona["target"], 
+                            resultado["alineamiento_principal"].get("target", "")
+                        )
+                        if zone_residues:
+                            zone_matches = [(zone_residues[j], zona["match"][j]) 
+                                          for j in range(min(len(zone_residues), len(zona["match"])))]
+                            zones_matches.append({
+                                'zone_number': i+1,
+                                'residues': zone_residues,
+                                'matches': zone_matches,
+                                'sequence': zona["target"],
+                                'match_pattern': zona["match"]
+                            })
+            
+            # SOLO para el visualizador de MUTACIONES (py3Dmol)
+            with stage("py3dmol"):
+                vista["mutation_viewer_html"] = py3dmol_service.create_mutation_visualization(
+                    aligned_pdb,
+                    res_seq=res_seq,
+                    res_zone_seq=zones_matches
+                )
+    
+    elif selected_source == "uniprot":
+        # Procesar datos UniProt
+        resultado = procesar_estructura_uniprot(selected_id, db_path)
+        vista.update(ref_pdb=bool(resultado["ref_pdb"]), aligned_pdb=bool(resultado["aligned_pdb"]),
+                     alignment_main=resultado["alineamiento_principal"],
+                     aligned_zones=resultado["zonas_alineadas"])
+        # Visualizador de mutaciones para UniProt: implementar si es necesario
+
+    return vista
+
+
 @foldseek_bp.route("/", methods=["GET", "POST"])
 def index():
     selected_source = request.form.get("source", "")
     selected_id = request.form.get("structure_id")
-    ref_pdb, aligned_pdb = None, None
-    alignment_main = None
-    aligned_zones = []
-    mutation_viewer_html = None
-    encoded_ref_pdb = None
-    encoded_aligned_pdb = None
+    vista = vista_vacia()
 
-    foldseek_structures = foldseek_fetcher.get_foldseek_structures()
-    uniprot_structures = uniprot_fetcher.get_uniprot_structures()
+    # Sólo se lista la fuente seleccionada (el desplegable muestra una única fuente)
+    with stage("db"):
+        foldseek_structures = foldseek_fetcher.get_foldseek_structures() if selected_source == "foldseek" else []
+        uniprot_structures = uniprot_fetcher.get_uniprot_structures() if selected_source == "uniprot" else []
 
     show_structures = False
-    res_seq = {}
-    zones_matches = []
 
     if request.method == "POST":
         selected_source = request.form.get("source", "")
@@ -138,93 +196,25 @@ def index():
 
         if selected_source and selected_id:
             try:
-                if selected_source == "foldseek":
-                    # Usar el procesador para FoldSeek
-                    resultado = procesar_estructura_foldseek(int(selected_id), db_path)
-                    ref_pdb = resultado["ref_pdb"]
-                    aligned_pdb = resultado["aligned_pdb"]
-                    alignment_main = resultado["alineamiento_principal"]
-                    aligned_zones = resultado["zonas_alineadas"]
-                    
-                    if show_structures and ref_pdb and aligned_pdb:
-                        # Codificar datos PDB para el Visualizador 3D de Estructuras (Mol*)
-                        encoded_ref_pdb = base64.b64encode(ref_pdb.encode()).decode()
-                        encoded_aligned_pdb = base64.b64encode(aligned_pdb.encode()).decode()
-                        
-                        # SEPARADO: Procesamos datos para el visualizador de mutaciones
-                        residue_info, count, resids = py3dmol_service.get_residue_info(aligned_pdb)
-                        
-                        # Construir mapeo de residuos a secuencia para MUTACIONES
-                        res_seq = {}
-                        if resultado and "alineamiento_principal" in resultado:
-                            alignment_match = resultado["alineamiento_principal"].get("match", "")
-                            target_aligned = resultado["alineamiento_principal"].get("target", "")
-                            
-                            for i in range(min(len(resids), len(target_aligned), len(alignment_match))):
-                                if i < len(resids) and resids[i]:
-                                    res_seq[resids[i][0]] = (target_aligned[i], alignment_match[i])
-                        
-                        # Construir información de zonas para MUTACIONES
-                        zones_matches = []
-                        for i, zona in enumerate(aligned_zones):
-                            if zona["ref"] and zona["match"] and zona["target"]:
-                                zone_residues = py3dmol_service.get_zone_residues(
-                                    aligned_pdb, 
-                                    zona["target"], 
-                                    resultado["alineamiento_principal"].get("target", "")
-                                )
-                                if zone_residues:
-                                    zone_matches = [(zone_residues[j], zona["match"][j]) 
-                                                  for j in range(min(len(zone_residues), len(zona["match"])))]
-                                    zones_matches.append({
-                                        'zone_number': i+1,
-                                        'residues': zone_residues,
-                                        'matches': zone_matches,
-                                        'sequence': zona["target"],
-                                        'match_pattern': zona["match"]
-                                    })
-                        
-                        # SOLO para el visualizador de MUTACIONES (py3Dmol)
-                        mutation_viewer_html = py3dmol_service.create_mutation_visualization(
-                            aligned_pdb,
-                            res_seq=res_seq,
-                            res_zone_seq=zones_matches
-                        )
-                
-                elif selected_source == "uniprot":
-                    # Procesar datos UniProt
-                    resultado = procesar_estructura_uniprot(int(selected_id), db_path)
-                    ref_pdb = resultado["ref_pdb"]
-                    aligned_pdb = resultado["aligned_pdb"]
-                    alignment_main = resultado["alineamiento_principal"]
-                    aligned_zones = resultado["zonas_alineadas"]
-                    
-                    if show_structures and ref_pdb and aligned_pdb:
-                        # Codificar datos PDB para Mol*
-                        encoded_ref_pdb = base64.b64encode(ref_pdb.encode()).decode()
-                        encoded_aligned_pdb = base64.b64encode(aligned_pdb.encode()).decode()
-                        
-                        # Similar procesamiento para visualizador de mutaciones...
-                        # Implementar si es necesario
-            
+                structure_id = int(selected_id)
+                # La vista sólo cambia cuando la ingesta reescribe el alineamiento (data_version)
+                with stage("db"), get_connection_manager(db_path).reader() as conn:
+                    data_version = get_data_version(conn, selected_source, structure_id)
+                vista = get_result_cache().get_or_compute(
+                    (selected_source, structure_id, data_version, show_structures),
+                    lambda: renderizar_estructura(selected_source, structure_id, show_structures)
+                )
             except Exception as e:
                 print(f"Error retrieving structure: {e}")
-                ref_pdb, aligned_pdb = None, None
-                alignment_main = None
-                aligned_zones = []
-
-    return render_template(
-        "foldseek_selector.html", 
-        foldseek_structures=foldseek_structures,
-        uniprot_structures=uniprot_structures,
-        selected_source=selected_source,
-        selected_id=selected_id,
-        ref_pdb=ref_pdb,
-        aligned_pdb=aligned_pdb,
-        encoded_ref_pdb=encoded_ref_pdb,
-        encoded_aligned_pdb=encoded_aligned_pdb,
-        show_structures=show_structures,
-        alignment_main=alignment_main,
-        aligned_zones=aligned_zones,
-        mutation_viewer_html=mutation_viewer_html
-    )
+                vista = vista_vacia()
+
+    with stage("template"):
+        return render_template(
+            "foldseek_selector.html", 
+            foldseek_structures=foldseek_structures,
+            uniprot_structures=uniprot_structures,
+            selected_source=selected_source,
+            selected_id=selected_id,
+            show_structures=show_structures,
+            **vista
+        )
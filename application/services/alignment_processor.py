@@ -1,13 +1,18 @@
-import sqlite3
+from application.services.db_connection import get_connection_manager
+from application.services.instrumentation import stage
+from application.services.reference_zones import get_reference_zones
+from application.services.structure_store import load_pdb
+from application.services.zone_records import FOLDSEEK_ZONES_QUERY, fetch_zone_records
 
 def procesar_estructura_foldseek(alignment_detail_id: int, db_path: str) -> dict:
     print(f"Procesando FoldSeek ID: {alignment_detail_id}")
-    with sqlite3.connect(db_path) as conn:
+    with stage("db"), get_connection_manager(db_path).reader() as conn:
         cursor = conn.cursor()
 
         # Obtener alineamiento principal
         cursor.execute("""
-            SELECT fad.reference_aligned, fad.match, fad.target_aligned, fad.similarity, fad.pdb, rz.pdb 
+            SELECT fad.reference_aligned, fad.match, fad.target_aligned, fad.similarity, fad.pdb, rz.pdb,
+                   fad.pdb_hash, rz.pdb_hash
             FROM FoldSeekAlignmentDetails fad
             JOIN FoldSeek f ON fad.foldseek_id = f.foldseek_id
             JOIN ReferenceSequences rz ON f.id_referencia = rz.reference_sequence_id
@@ -20,6 +25,7 @@ def procesar_estructura_foldseek(alignment_detail_id: int, db_path: str) -> dict
             return {
                 "ref_pdb": None, 
                 "aligned_pdb": None,
+                "aligned_pdb_hash": None,
                 "alineamiento_principal": None,
                 "zonas_alineadas": []
             }
@@ -37,80 +43,23 @@ def procesar_estructura_foldseek(alignment_detail_id: int, db_path: str) -> dict
             "target": row[2],
             "similarity": formatted_similarity
         }
-        aligned_pdb = row[4]
-        ref_pdb = row[5]
+        aligned_pdb = load_pdb(conn, row[6], row[4])
+        ref_pdb = load_pdb(conn, row[7], row[5])
 
-        # Comprobemos si el problema está en la consulta SQL
-        # Primero veamos si hay zonas alineadas para este alineamiento:
-        cursor.execute("""
-            SELECT COUNT(*) FROM FoldSeekAlignedZones 
-            WHERE alignment_detail_id = ?
-        """, (alignment_detail_id,))
-        count = cursor.fetchone()[0]
-        print(f"FoldSeek: Hay {count} zonas alineadas para alignment_detail_id={alignment_detail_id}")
-
-        if count == 0:
-            # No hay zonas, intentemos ver todas las zonas de alineamiento en la BD
-            cursor.execute("SELECT COUNT(*) FROM FoldSeekAlignedZones")
-            total_count = cursor.fetchone()[0]
-            print(f"FoldSeek: Hay un total de {total_count} zonas alineadas en la base de datos")
-            
-            # Ver si el problema es que no hay reference_zone_id válidos
-            cursor.execute("""
-                SELECT 
-                    faz.fragment, 
-                    faz.match, 
-                    faz.reference_zone_id
-                FROM FoldSeekAlignedZones faz
-                WHERE faz.alignment_detail_id = ?
-                LIMIT 4
-            """, (alignment_detail_id,))
-            
-            raw_zones = cursor.fetchall()
-            print(f"FoldSeek: Encontradas {len(raw_zones)} zonas sin JOIN con reference_zone_id")
-            
-            zonas = []
-            for rz in raw_zones:
-                fragment = rz[0] if rz[0] else ""
-                match = rz[1] if rz[1] else ""
-                ref_zone_id = rz[2]
-                
-                ref_seq = ""
-                if ref_zone_id:
-                    cursor.execute("""
-                        SELECT sequence_fragment FROM ReferenceZones 
-                        WHERE zone_id = ?
-                    """, (ref_zone_id,))
-                    ref_result = cursor.fetchone()
-                    if ref_result:
-                        ref_seq = ref_result[0]
-                    else:
-                        print(f"FoldSeek: No se encontró secuencia de referencia para zone_id={ref_zone_id}")
-                
-                zonas.append((ref_seq, match, fragment))
-        else:
-            # Hay zonas, intentemos la consulta normal
-            cursor.execute("""
-                SELECT 
-                    rz.sequence_fragment, 
-                    faz.match, 
-                    faz.fragment
-                FROM FoldSeekAlignedZones faz
-                JOIN ReferenceZones rz ON faz.reference_zone_id = rz.zone_id
-                WHERE faz.alignment_detail_id = ? 
-                LIMIT 4;
-            """, (alignment_detail_id,))
-            
-            zonas = cursor.fetchall()
-            print(f"FoldSeek: Se encontraron {len(zonas)} zonas con JOIN")
+        # Zonas alineadas, una fila por zona (con su zona de referencia desde la caché)
+        zonas = fetch_zone_records(conn, FOLDSEEK_ZONES_QUERY, alignment_detail_id,
+                                   get_reference_zones(db_path))[:4]
+        print(f"FoldSeek: Hay {len(zonas)} zonas alineadas para alignment_detail_id={alignment_detail_id}")
 
         # Crear las zonas alineadas sólo con los datos reales
         aligned_zones = []
         for zona in zonas:
+            if zona.reference_zone_id and zona.reference_fragment is None:
+                print(f"FoldSeek: No se encontró secuencia de referencia para zone_id={zona.reference_zone_id}")
             aligned_zones.append({
-                "ref": zona[0] if zona[0] else "",
-                "match": zona[1] if zona[1] else "",
-                "target": zona[2] if zona[2] else ""
+                "ref": zona.reference_fragment or "",
+                "match": zona.match or "",
+                "target": zona.fragment or ""
             })
             
         
@@ -125,6 +74,7 @@ def procesar_estructura_foldseek(alignment_detail_id: int, db_path: str) -> dict
     return {
         "ref_pdb": ref_pdb,
         "aligned_pdb": aligned_pdb,
+        "aligned_pdb_hash": row[6],
         "alineamiento_principal": alignment_main,
         "zonas_alineadas": aligned_zones
     }
@@ -0,0 +1,82 @@
+import importlib
+import importlib.util
+import threading
+
+# Backends científicos pesados: nombre lógico -> módulo. Ninguno se importa al crear
+# la aplicación; se cargan la primera vez que una operación los necesita.
+BACKENDS = {
+    "py3Dmol": "py3Dmol",
+    "pymol2": "pymol2",
+    "vmd": "vmd",
+    "biopython": "Bio.PDB",
+    "mdanalysis": "MDAnalysis",
+    "pyarrow": "pyarrow",
+    "parquet": "pyarrow.parquet",
+    "scipy": "scipy.spatial",
+}
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+class BackendUnavailable(ImportError):
+    """El backend solicitado no está instalado."""
+
+
+def get_backend(name):
+    """
+    Importa (una sola vez) y devuelve el módulo de un backend.
+
+    Args:
+        name (str): Nombre lógico registrado en BACKENDS.
+
+    Returns:
+        module: Módulo importado.
+
+    Raises:
+        BackendUnavailable: Si el paquete no está instalado.
+    """
+    module = _loaded.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        module = _loaded.get(name)
+        if module is None:
+            try:
+                module = importlib.import_module(BACKENDS[name])
+            except ImportError as e:
+                raise BackendUnavailable(f"El backend '{name}' ({BACKENDS[name]}) no está instalado: {e}") from e
+            _loaded[name] = module
+    return module
+
+
+def backend_available(name):
+    """Indica si el backend está instalado, sin importarlo."""
+    if name in _loaded:
+        return True
+    try:
+        return importlib.util.find_spec(BACKENDS[name]) is not None
+    except ImportError:
+        # find_spec de un submódulo importa el paquete padre, que puede no existir
+        return False
+
+
+def loaded_backends():
+    """Nombres de los backends ya importados en este proceso."""
+    return sorted(_loaded)
+
+
+def preload(names=None):
+    """
+    Importa por adelantado los backends indicados (todos por defecto), p. ej. en
+    trabajadores de ingesta que los usarán con seguridad. Los ausentes se omiten.
+
+    Returns:
+        list: Backends cargados.
+    """
+    for name in BACKENDS if names is None else names:
+        try:
+            get_backend(name)
+        except BackendUnavailable as e:
+            print(e)
+    return loaded_backends()
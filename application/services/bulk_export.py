@@ -0,0 +1,216 @@
+"""
+Exportación masiva de las zonas alineadas (UniProt y FoldSeek) a Parquet, Arrow o CSV.
+
+Uso:
+    python -m application.services.bulk_export zonas.parquet
+    python -m application.services.bulk_export zonas.csv --source foldseek
+"""
+import argparse
+import csv
+import io
+import os
+
+from application.services.backends import backend_available, get_backend
+from application.services.db_connection import get_connection_manager
+
+# Columnas comunes a ambas fuentes, en el orden en que las devuelven las consultas
+COLUMNS = (
+    ("source", "string"),
+    ("alignment_id", "int64"),
+    ("aligned_zone_id", "int64"),
+    ("zone_number", "int64"),
+    ("reference_fragment", "string"),
+    ("fragment", "string"),
+    ("match", "string"),
+    ("hydrophobicity", "float64"),
+    ("volume", "float64"),
+    ("delta_hydrophobicity", "float64"),
+    ("delta_volume", "float64"),
+    ("tipo_carga", "string"),
+    ("cargas", "string"),
+    ("cargas_reference", "string"),
+    ("vsd_valido", "bool"),
+    ("similarity", "float64"),
+    ("identifier", "string"),
+    ("protein_name", "string"),
+    ("organism", "string"),
+    ("gene", "string"),
+    ("database_name", "string"),
+)
+
+EXPORT_QUERIES = {
+    "uniprot": """
+        SELECT 'uniprot', a.alignment_id, az.aligned_zone_id, rz.zone_number, rz.sequence_fragment,
+               az.aligned_sequence, az.match, az.hydrophobicity_aligned, az.volume_aligned,
+               az.delta_hydrophobicity, az.delta_volume, az.tipo_carga, az.cargas, az.cargas_reference,
+               az.vsd_valido, a.similarity, a.source_id, p.name, p.organism, p.gene, 'uniprot'
+        FROM AlignedZones az
+        JOIN Alignments a ON az.alignment_id = a.alignment_id
+        LEFT JOIN Proteins p ON a.source_id = p.accession_number
+        LEFT JOIN ReferenceZones rz ON az.reference_zone_id = rz.zone_id
+        ORDER BY az.alignment_id, az.aligned_zone_id
+    """,
+    "foldseek": """
+        SELECT 'foldseek', fad.alignment_detail_id, faz.aligned_zone_id, rz.zone_number, rz.sequence_fragment,
+               faz.fragment, faz.match, faz.hydrophobicity, faz.volume,
+               faz.delta_hydrophobicity, faz.delta_volume, faz.tipo_carga, faz.cargas, faz.cargas_reference,
+               faz.vsd_valido, fad.similarity, f.target, f.protein_name, f.taxName, NULL, f.database_name
+        FROM FoldSeekAlignedZones faz
+        JOIN FoldSeekAlignmentDetails fad ON faz.alignment_detail_id = fad.alignment_detail_id
+        JOIN FoldSeek f ON fad.foldseek_id = f.foldseek_id
+        LEFT JOIN ReferenceZones rz ON faz.reference_zone_id = rz.zone_id
+        ORDER BY faz.alignment_detail_id, faz.aligned_zone_id
+    """,
+}
+
+FORMATS = ("parquet", "arrow", "csv")
+
+
+def iter_zone_batches(db_path, sources=("uniprot", "foldseek"), batch_size=50000):
+    """
+    Recorre las zonas alineadas en lotes de filas, sin cargar la tabla completa.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        sources (tuple): Fuentes a exportar.
+        batch_size (int): Filas por lote.
+
+    Yields:
+        list: Filas (tuplas en el orden de COLUMNS).
+    """
+    with get_connection_manager(db_path).reader() as conn:
+        for source in sources:
+            cursor = conn.execute(EXPORT_QUERIES[source])
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+
+def arrow_available():
+    # pyarrow es opcional (sin él sólo se exporta CSV) y se importa al primer uso
+    return backend_available("pyarrow")
+
+
+def arrow_schema():
+    pa = get_backend("pyarrow")
+    return pa.schema([(name, pa.bool_() if kind == "bool" else getattr(pa, kind)()) for name, kind in COLUMNS])
+
+
+def to_record_batch(rows, schema):
+    pa = get_backend("pyarrow")
+    arrays = []
+    for column, field in zip(zip(*rows), schema):
+        if field.type == pa.bool_():
+            # SQLite guarda los booleanos como 0/1
+            column = [None if value is None else bool(value) for value in column]
+        arrays.append(pa.array(column, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def format_for_path(path):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return {"feather": "arrow", "ipc": "arrow"}.get(extension, extension)
+
+
+def export_zones(db_path, output_path, fmt=None, sources=("uniprot", "foldseek"), batch_size=50000):
+    """
+    Exporta todas las zonas alineadas a un archivo, lote a lote (memoria acotada).
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        output_path (str): Archivo de salida.
+        fmt (str): "parquet", "arrow" o "csv" (por defecto, según la extensión). Si
+            pyarrow no está instalado se usa CSV.
+        sources (tuple): Fuentes a exportar.
+        batch_size (int): Filas por lote.
+
+    Returns:
+        tuple: (ruta escrita, formato usado, filas escritas).
+    """
+    fmt = fmt or format_for_path(output_path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+    if fmt != "csv" and not arrow_available():
+        print("pyarrow no está instalado; se exporta en CSV")
+        fmt = "csv"
+        output_path = os.path.splitext(output_path)[0] + ".csv"
+
+    rows_written = 0
+    tmp_path = f"{output_path}.tmp"
+    if fmt == "csv":
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(name for name, _ in COLUMNS)
+            for rows in iter_zone_batches(db_path, sources, batch_size):
+                writer.writerows(rows)
+                rows_written += len(rows)
+    else:
+        schema = arrow_schema()
+        writer = (get_backend("parquet").ParquetWriter(tmp_path, schema, compression="zstd") if fmt == "parquet"
+                  else get_backend("pyarrow").ipc.new_file(tmp_path, schema))
+        try:
+            for rows in iter_zone_batches(db_path, sources, batch_size):
+                writer.write_batch(to_record_batch(rows, schema))
+                rows_written += len(rows)
+        finally:
+            writer.close()
+    os.replace(tmp_path, output_path)
+    return output_path, fmt, rows_written
+
+
+def stream_zones_csv(db_path, sources=("uniprot", "foldseek"), batch_size=5000):
+    """
+    Genera el CSV de las zonas alineadas como bloques de texto (para respuestas HTTP).
+
+    Yields:
+        str: Fragmentos del CSV.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(name for name, _ in COLUMNS)
+    for rows in iter_zone_batches(db_path, sources, batch_size):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_zones_arrow(db_path, sources=("uniprot", "foldseek"), batch_size=50000):
+    """
+    Genera las zonas alineadas en formato Arrow IPC de streaming, lote a lote.
+
+    Yields:
+        bytes: Fragmentos del flujo Arrow.
+    """
+    pa = get_backend("pyarrow")
+    schema = arrow_schema()
+    buffer = io.BytesIO()
+    writer = pa.ipc.new_stream(pa.PythonFile(buffer, mode="w"), schema)
+    for rows in iter_zone_batches(db_path, sources, batch_size):
+        writer.write_batch(to_record_batch(rows, schema))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    writer.close()
+    yield buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_path")
+    parser.add_argument("--db", default=os.path.join("database", "proteins_discovery.db"))
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--source", choices=("uniprot", "foldseek"), action="append")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    path, fmt, rows = export_zones(args.db, args.output_path, args.format,
+                             tuple(args.source or ("uniprot", "foldseek")), args.batch_size)
+    print(f"{rows} zonas exportadas a {path} ({fmt})")
+
+
+if __name__ == "__main__":
+    main()
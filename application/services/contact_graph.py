@@ -0,0 +1,478 @@
+"""
+Grafos de contactos entre residuos de las proteínas de ValidVSDProteins, guardados en
+las columnas ``grafo``, ``numero_nodos``, ``numero_aristas``, ``grado_promedio`` y
+``densidad`` de ProteinCalculations.
+
+Los nodos son los residuos (su átomo CA) de la estructura alineada de cada proteína y
+hay una arista entre dos residuos cuyos CA están a ``cutoff`` Å o menos. Los pares se
+buscan con un índice espacial: ``cKDTree`` si SciPy está instalado y, si no, listas de
+celdas con NumPy (celdas de lado ``cutoff``; sólo se comparan los puntos de celdas
+vecinas). Cada grafo se guarda en el BLOB como una matriz CSR binaria (triángulo
+superior) y ``load_graphs`` carga muchos grafos en arreglos concatenados para calcular
+estadísticas de red sin crear un objeto de Python por arista.
+
+Uso:
+    python -m application.services.contact_graph database/proteins_discovery.db --cutoff 8 --workers 4
+"""
+import argparse
+import hashlib
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from application.services.backends import backend_available, get_backend
+from application.services.db_connection import get_connection_manager
+from application.services.pdb_arrays import parse_pdb
+
+# Se incluye en el hash: cambiarla obliga a reconstruir todos los grafos
+GRAPH_VERSION = 1
+DEFAULT_CUTOFF = 8.0
+
+# Cabecera del BLOB: firma, bytes por índice de columna (2 o 4), nodos y aristas.
+# Le siguen resids (int32, n), indptr (uint32, n + 1) e indices (uint16/uint32, aristas),
+# todo little-endian; cada arista (i, j) se guarda una sola vez, con i < j.
+GRAPH_MAGIC = b"CSR1"
+_HEADER = struct.Struct("<4sB3xII")
+
+# Desplazamientos a las celdas vecinas de media capa: cada par de celdas se visita una vez
+_HALF_SHELL = [(0, 0, 0)] + [
+    (dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+    if (dx, dy, dz) > (0, 0, 0)
+]
+
+UPSERT_QUERY = """
+    INSERT INTO ProteinCalculations (vsd_protein_id, numero_nodos, numero_aristas, grado_promedio,
+                                     densidad, grafo, grafo_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (vsd_protein_id) DO UPDATE SET
+        numero_nodos = excluded.numero_nodos,
+        numero_aristas = excluded.numero_aristas,
+        grado_promedio = excluded.grado_promedio,
+        densidad = excluded.densidad,
+        grafo = excluded.grafo,
+        grafo_hash = excluded.grafo_hash
+"""
+
+# Estructura alineada de cada proteína válida: el primer alineamiento con zonas válidas
+STRUCTURES_QUERY = """
+    SELECT v.id,
+           CASE v.source
+               WHEN 'UniProt' THEN (
+                   SELECT a.pdb_hash FROM Alignments a
+                   WHERE a.source_id = v.protein_id AND a.pdb_hash IS NOT NULL
+                     AND EXISTS (SELECT 1 FROM AlignedZones z
+                                 WHERE z.alignment_id = a.alignment_id AND z.vsd_valido = 1)
+                   ORDER BY a.alignment_id LIMIT 1)
+               ELSE (
+                   SELECT d.pdb_hash FROM FoldSeekAlignmentDetails d
+                   WHERE d.foldseek_id = CAST(v.protein_id AS INTEGER) AND d.pdb_hash IS NOT NULL
+                     AND EXISTS (SELECT 1 FROM FoldSeekAlignedZones z
+                                 WHERE z.alignment_detail_id = d.alignment_detail_id AND z.vsd_valido = 1)
+                   ORDER BY d.alignment_detail_id LIMIT 1)
+           END,
+           pc.grafo_hash
+    FROM ValidVSDProteins v
+    LEFT JOIN ProteinCalculations pc ON pc.vsd_protein_id = v.id
+"""
+
+
+def graph_hash(pdb_hash, cutoff):
+    return hashlib.sha1(f"{GRAPH_VERSION}:{float(cutoff)}:{pdb_hash}".encode()).hexdigest()
+
+
+def residue_points(structure):
+    """
+    Nodos del grafo: el primer CA de cada residuo proteico.
+
+    Args:
+        structure: Texto PDB, ``PDBAtoms`` o ``coordinate_store.StructureArrays``.
+
+    Returns:
+        tuple: (resids int32, coordenadas float64 (n, 3)).
+    """
+    if isinstance(structure, str):
+        # Sólo hacen falta los CA: se descartan las demás líneas antes de convertir el texto
+        structure = parse_pdb("\n".join(line for line in structure.splitlines()
+                                        if line.startswith("ATOM") and line[12:16].strip() == "CA"))
+    ca = structure.ca_indices()
+    resseqs = structure.atoms["resseq"] if hasattr(structure, "atoms") else structure.resseqs
+    return resseqs[ca].astype(np.int32), np.asarray(structure.coords[ca], dtype=np.float64)
+
+
+def _cell_pairs(points, cutoff):
+    """Pares (i < j) a ``cutoff`` o menos con listas de celdas (sólo NumPy)."""
+    n = len(points)
+    cells = np.floor((points - points.min(axis=0)) / cutoff).astype(np.int64) + 1
+    # Una celda vacía de margen en cada eje: los vecinos de los bordes no se confunden
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    first, second = [], []
+    for dx, dy, dz in _HALF_SHELL:
+        neighbour = keys + (dx * dims[1] + dy) * dims[2] + dz
+        start = np.searchsorted(sorted_keys, neighbour, "left")
+        counts = np.searchsorted(sorted_keys, neighbour, "right") - start
+        total = int(counts.sum())
+        if not total:
+            continue
+        # Todos los candidatos de cada punto en dos arreglos planos (sin bucle por punto)
+        i = np.repeat(np.arange(n), counts)
+        j = order[np.arange(total) - np.repeat(np.cumsum(counts) - counts - start, counts)]
+        keep = i < j if (dx, dy, dz) == (0, 0, 0) else np.ones(total, dtype=bool)
+        first.append(i[keep])
+        second.append(j[keep])
+    if not first:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    i, j = np.concatenate(first), np.concatenate(second)
+    close = ((points[i] - points[j]) ** 2).sum(axis=1) <= cutoff * cutoff
+    return np.minimum(i, j)[close], np.maximum(i, j)[close]
+
+
+def contact_pairs(points, cutoff=DEFAULT_CUTOFF):
+    """
+    Pares de puntos a ``cutoff`` o menos.
+
+    Args:
+        points (np.ndarray): Coordenadas (n, 3).
+        cutoff (float): Distancia máxima (Å).
+
+    Returns:
+        tuple: Índices (i, j) con i < j.
+    """
+    if len(points) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if backend_available("scipy"):
+        pairs = get_backend("scipy").cKDTree(points).query_pairs(cutoff, output_type="ndarray")
+        return pairs[:, 0].astype(np.int64), pairs[:, 1].astype(np.int64)
+    return _cell_pairs(points, cutoff)
+
+
+class ContactGraph:
+    """
+    Grafo no dirigido en formato CSR con cada arista una sola vez (triángulo superior).
+
+    Attributes:
+        resids (np.ndarray): Número de residuo de cada nodo.
+        indptr (np.ndarray): Inicio de las aristas de cada nodo en ``indices`` (n + 1).
+        indices (np.ndarray): Nodo destino (mayor que el de origen) de cada arista.
+    """
+
+    __slots__ = ("resids", "indptr", "indices")
+
+    def __init__(self, resids, indptr, indices):
+        self.resids = resids
+        self.indptr = indptr
+        self.indices = indices
+
+    @classmethod
+    def from_pairs(cls, resids, first, second):
+        """Construye el CSR a partir de pares (i, j) con i < j."""
+        order = np.lexsort((second, first))
+        indptr = np.zeros(len(resids) + 1, dtype=np.uint32)
+        np.cumsum(np.bincount(first, minlength=len(resids)), out=indptr[1:])
+        return cls(np.asarray(resids, dtype=np.int32), indptr, second[order])
+
+    @classmethod
+    def from_structure(cls, structure, cutoff=DEFAULT_CUTOFF):
+        """Grafo de contactos entre los CA de una estructura (ver ``residue_points``)."""
+        resids, points = residue_points(structure)
+        return cls.from_pairs(resids, *contact_pairs(points, cutoff))
+
+    @property
+    def n_nodes(self):
+        return len(self.resids)
+
+    @property
+    def n_edges(self):
+        return len(self.indices)
+
+    def edges(self):
+        """
+        Returns:
+            tuple: Arreglos (origen, destino) de las aristas.
+        """
+        sources = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr.astype(np.int64)))
+        return sources, self.indices.astype(np.int64)
+
+    def degrees(self):
+        return np.bincount(np.concatenate(self.edges()), minlength=self.n_nodes)
+
+    def statistics(self):
+        """
+        Returns:
+            dict: ``numero_nodos``, ``numero_aristas``, ``grado_promedio`` y ``densidad``.
+        """
+        n, m = self.n_nodes, self.n_edges
+        return {
+            "numero_nodos": n,
+            "numero_aristas": m,
+            "grado_promedio": 2.0 * m / n if n else 0.0,
+            "densidad": 2.0 * m / (n * (n - 1)) if n > 1 else 0.0,
+        }
+
+    def to_bytes(self):
+        """Serializa el grafo en el formato binario del BLOB ``grafo``."""
+        width = 2 if self.n_nodes <= 0xFFFF else 4
+        return b"".join((
+            _HEADER.pack(GRAPH_MAGIC, width, self.n_nodes, self.n_edges),
+            self.resids.astype("<i4").tobytes(),
+            self.indptr.astype("<u4").tobytes(),
+            self.indices.astype(f"<u{width}").tobytes(),
+        ))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        """Grafo de un BLOB ``grafo`` (las columnas son vistas sobre ``blob``, sin copiar)."""
+        width, n, m = _read_header(blob)
+        offset = _HEADER.size
+        resids = np.frombuffer(blob, dtype="<i4", count=n, offset=offset)
+        indptr = np.frombuffer(blob, dtype="<u4", count=n + 1, offset=offset + 4 * n)
+        indices = np.frombuffer(blob, dtype=f"<u{width}", count=m, offset=offset + 8 * n + 4)
+        return cls(resids, indptr, indices)
+
+
+def _read_header(blob):
+    magic, width, n, m = _HEADER.unpack_from(blob)
+    if magic != GRAPH_MAGIC:
+        raise ValueError("El BLOB no contiene un grafo CSR")
+    return width, n, m
+
+
+class GraphBatch:
+    """
+    Varios grafos concatenados: los nodos del grafo ``k`` son
+    ``node_offsets[k]:node_offsets[k + 1]`` y sus aristas
+    ``edge_offsets[k]:edge_offsets[k + 1]`` (con índices de nodo globales).
+
+    Attributes:
+        node_offsets, edge_offsets (np.ndarray): Límites de cada grafo (len + 1).
+        resids (np.ndarray): Residuo de cada nodo.
+        sources, targets (np.ndarray): Extremos de cada arista.
+    """
+
+    __slots__ = ("node_offsets", "edge_offsets", "resids", "sources", "targets")
+
+    def __len__(self):
+        return len(self.node_offsets) - 1
+
+    def graph_ids(self):
+        """Grafo al que pertenece cada nodo."""
+        return np.repeat(np.arange(len(self)), np.diff(self.node_offsets))
+
+    def degrees(self):
+        """Grado de cada nodo (todos los grafos en un único ``np.bincount``)."""
+        return np.bincount(np.concatenate((self.sources, self.targets)), minlength=int(self.node_offsets[-1]))
+
+    def statistics(self):
+        """
+        Estadísticas de todos los grafos a la vez.
+
+        Returns:
+            dict: Arreglos ``numero_nodos``, ``numero_aristas``, ``grado_promedio``,
+            ``densidad`` y ``grado_maximo`` (uno por grafo).
+        """
+        n = np.diff(self.node_offsets)
+        m = np.diff(self.edge_offsets)
+        degrees = self.degrees()
+        max_degree = np.zeros(len(self), dtype=np.int64)
+        if len(degrees):
+            max_degree = np.maximum.reduceat(np.r_[degrees, 0], np.minimum(self.node_offsets[:-1], len(degrees)))
+            max_degree[n == 0] = 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "numero_nodos": n,
+                "numero_aristas": m,
+                "grado_promedio": np.where(n > 0, 2.0 * m / n, 0.0),
+                "densidad": np.where(n > 1, 2.0 * m / (n * (n - 1.0)), 0.0),
+                "grado_maximo": max_degree,
+            }
+
+    def graph(self, k):
+        """Grafo ``k`` como ``ContactGraph``."""
+        start, end = self.node_offsets[k], self.node_offsets[k + 1]
+        first = self.sources[self.edge_offsets[k]:self.edge_offsets[k + 1]] - start
+        second = self.targets[self.edge_offsets[k]:self.edge_offsets[k + 1]] - start
+        return ContactGraph.from_pairs(self.resids[start:end], first, second)
+
+
+def load_graphs(blobs):
+    """
+    Carga muchos BLOB ``grafo`` en un ``GraphBatch``: sólo se lee la cabecera de cada
+    grafo en Python; las aristas se expanden con operaciones vectorizadas.
+
+    Args:
+        blobs (list): BLOB de cada grafo.
+
+    Returns:
+        GraphBatch: Grafos concatenados en el orden de ``blobs``.
+    """
+    graphs = [ContactGraph.from_bytes(blob) for blob in blobs]
+    n = np.fromiter((graph.n_nodes for graph in graphs), dtype=np.int64, count=len(graphs))
+    m = np.fromiter((graph.n_edges for graph in graphs), dtype=np.int64, count=len(graphs))
+    batch = GraphBatch()
+    batch.node_offsets = np.zeros(len(graphs) + 1, dtype=np.int64)
+    batch.edge_offsets = np.zeros(len(graphs) + 1, dtype=np.int64)
+    np.cumsum(n, out=batch.node_offsets[1:])
+    np.cumsum(m, out=batch.edge_offsets[1:])
+    if not graphs:
+        batch.resids = np.zeros(0, dtype=np.int32)
+        batch.sources = batch.targets = np.zeros(0, dtype=np.int64)
+        return batch
+
+    batch.resids = np.concatenate([graph.resids for graph in graphs])
+    # Aristas por nodo a partir de los indptr; el origen es la posición global del nodo
+    out_degree = np.concatenate([np.diff(graph.indptr.astype(np.int64)) for graph in graphs])
+    batch.sources = np.repeat(np.arange(int(batch.node_offsets[-1])), out_degree)
+    edge_graph = np.repeat(np.arange(len(graphs)), m)
+    batch.targets = np.concatenate([graph.indices for graph in graphs]).astype(np.int64) \
+        + batch.node_offsets[:-1][edge_graph]
+    return batch
+
+
+def read_graphs(db_path, vsd_protein_ids=None):
+    """
+    Grafos guardados en ProteinCalculations.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        vsd_protein_ids (list): Proteínas a cargar (por defecto, todas las que tienen grafo).
+
+    Returns:
+        tuple: (lista de vsd_protein_id, ``GraphBatch`` en el mismo orden).
+    """
+    query = "SELECT vsd_protein_id, grafo FROM ProteinCalculations WHERE grafo IS NOT NULL"
+    with get_connection_manager(db_path).reader() as conn:
+        if vsd_protein_ids is None:
+            rows = conn.execute(query + " ORDER BY vsd_protein_id").fetchall()
+        else:
+            wanted = list(vsd_protein_ids)
+            found = {}
+            for i in range(0, len(wanted), 500):
+                chunk = wanted[i:i + 500]
+                found.update(conn.execute(f"{query} AND vsd_protein_id IN ({','.join('?' * len(chunk))})",
+                                          chunk).fetchall())
+            rows = [(key, found[key]) for key in wanted if key in found]
+    return [row[0] for row in rows], load_graphs([row[1] for row in rows])
+
+
+def _load_structure(conn, digest):
+    from application.services.coordinate_store import get_coordinate_store
+    from application.services.structure_store import get_pdb
+    store = get_coordinate_store()
+    structure = store.load(digest) if store is not None else None
+    return structure if structure is not None else get_pdb(conn, digest)
+
+
+def graph_rows(db_path, cutoff, items):
+    """
+    Filas de UPSERT_QUERY para un bloque de proteínas (se ejecuta en los procesos del pool).
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        cutoff (float): Distancia máxima entre CA (Å).
+        items (list): Tuplas (vsd_protein_id, pdb_hash, hash del grafo).
+
+    Returns:
+        list: Filas para ``executemany`` (se omiten las estructuras que no se pudieron leer).
+    """
+    rows = []
+    with get_connection_manager(db_path).reader() as conn:
+        for vsd_protein_id, digest, graph_digest in items:
+            try:
+                structure = _load_structure(conn, digest)
+                if not structure:
+                    print(f"Estructura {digest} no encontrada (proteína {vsd_protein_id})")
+                    continue
+                graph = ContactGraph.from_structure(structure, cutoff)
+            except Exception as e:
+                print(f"Error al construir el grafo de la proteína {vsd_protein_id}: {e}")
+                continue
+            stats = graph.statistics()
+            rows.append((vsd_protein_id, stats["numero_nodos"], stats["numero_aristas"],
+                         round(stats["grado_promedio"], 4), round(stats["densidad"], 6),
+                         graph.to_bytes(), graph_digest))
+    return rows
+
+
+def pending_graphs(db_path, cutoff=DEFAULT_CUTOFF, force=False):
+    """
+    Returns:
+        tuple: (lista de (vsd_protein_id, pdb_hash, hash del grafo) por construir,
+        grafos al día, proteínas sin estructura alineada en StructureBlobs).
+    """
+    pending, up_to_date, missing = [], 0, 0
+    with get_connection_manager(db_path).reader() as conn:
+        for vsd_protein_id, digest, stored_hash in conn.execute(STRUCTURES_QUERY):
+            if not digest:
+                missing += 1
+                continue
+            graph_digest = graph_hash(digest, cutoff)
+            if graph_digest == stored_hash and not force:
+                up_to_date += 1
+            else:
+                pending.append((vsd_protein_id, digest, graph_digest))
+    return pending, up_to_date, missing
+
+
+def update_contact_graphs(db_path, cutoff=DEFAULT_CUTOFF, workers=None, chunk_size=200, force=False):
+    """
+    Construye los grafos de contactos de las proteínas de ValidVSDProteins nuevas o cuya
+    estructura alineada cambió. Las estructuras aún guardadas como texto en la columna
+    ``pdb`` requieren antes ``structure_store.migrate_database``.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        cutoff (float): Distancia máxima entre CA (Å).
+        workers (int): Procesos (por defecto, uno por núcleo; 1 construye en este proceso).
+        chunk_size (int): Proteínas por bloque.
+        force (bool): Reconstruir también los grafos al día.
+
+    Returns:
+        dict: Grafos construidos, al día, proteínas sin estructura y errores.
+    """
+    from application.services.protein_calculations import ensure_schema
+    ensure_schema(db_path)
+    pending, up_to_date, missing = pending_graphs(db_path, cutoff, force)
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, max(len(chunks), 1))
+    build = partial(graph_rows, db_path, cutoff)
+
+    written = 0
+
+    def write(rows):
+        with get_connection_manager(db_path).writer() as conn:
+            conn.executemany(UPSERT_QUERY, rows)
+        return len(rows)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rows in pool.map(build, chunks):
+                written += write(rows)
+    else:
+        for chunk in chunks:
+            written += write(build(chunk))
+
+    stats = {"construidos": written, "al_dia": up_to_date, "sin_estructura": missing,
+             "errores": len(pending) - written}
+    print(f"Grafos de contactos: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", nargs="?", default=os.path.join("database", "proteins_discovery.db"))
+    parser.add_argument("--cutoff", type=float, default=DEFAULT_CUTOFF, help="Distancia máxima entre CA (Å)")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    parser.add_argument("--force", action="store_true", help="Reconstruir también los grafos al día")
+    args = parser.parse_args()
+    update_contact_graphs(args.db_path, args.cutoff, args.workers, args.chunk_size, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Representación binaria de las estructuras para lectura sin reparsear el PDB.
+
+Cada estructura de StructureBlobs se guarda, con el mismo hash, como un arreglo NumPy
+estructurado (un registro de ``ATOM_DTYPE`` por átomo) en ``<dir>/<hh>/<hash>.npy`` más
+un ``<hash>.json`` con las líneas que no son átomos (CRYST1, TER, END...). El ``.npy``
+se abre con ``np.load(mmap_mode="r")``: cargar una estructura no copia ni convierte
+nada y las columnas (coordenadas, residuo, cadena...) son vistas sobre el archivo.
+``to_pdb`` reconstruye el texto original (con saltos de línea Unix); lo que un registro
+de átomo tenga más allá de la columna 80 se guarda aparte en el ``.json``.
+
+Los archivos se generan al guardar un PDB en la ingesta; para una base existente:
+    python -m application.services.coordinate_store database/proteins_discovery.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from application.services.pdb_arrays import ResidueTable
+
+FORMAT_VERSION = 1
+
+# Columnas de texto con el ancho exacto del formato PDB (permiten reconstruir la línea);
+# las coordenadas en float32 conservan los 3 decimales del PDB para |x| < 8192 Å.
+ATOM_DTYPE = np.dtype([
+    ("record", "S6"),
+    ("serial", "S5"),
+    ("name", "S4"),
+    ("altloc", "S1"),
+    ("resname", "S4"),
+    ("chain", "S1"),
+    ("resseq", "<i4"),
+    ("icode", "S1"),
+    ("coords", "<f4", (3,)),
+    ("occupancy", "S6"),
+    ("bfactor", "S6"),
+    ("segid", "S4"),
+    ("element", "S2"),
+    ("charge", "S2"),
+    ("residue_index", "<i4"),
+    # Largo de la línea, hasta 80 columnas (el resto va en ``overflow``)
+    ("width", "u1"),
+])
+
+# Campo -> (columna inicial, columna final) en la línea ATOM/HETATM
+_TEXT_FIELDS = {
+    "record": (0, 6), "serial": (6, 11), "name": (12, 16), "altloc": (16, 17),
+    "resname": (17, 21), "chain": (21, 22), "icode": (26, 27), "occupancy": (54, 60),
+    "bfactor": (60, 66), "segid": (72, 76), "element": (76, 78), "charge": (78, 80),
+}
+
+
+class StructureArrays:
+    """
+    Estructura cargada desde el almacén binario.
+
+    Attributes:
+        atoms (np.ndarray): Registros ``ATOM_DTYPE`` (normalmente un memmap de sólo lectura).
+        other_lines (list): Pares ``[posición, línea]`` de los registros que no son átomos;
+            la posición es el número de átomos que los preceden.
+        overflow (list): Pares ``[átomo, texto]`` con lo que sigue a la columna 80 en las
+            líneas de átomo más largas.
+    """
+
+    __slots__ = ("atoms", "other_lines", "final_newline", "overflow", "_residues")
+
+    def __init__(self, atoms, other_lines, final_newline=True, overflow=()):
+        self.atoms = atoms
+        self.other_lines = other_lines
+        self.final_newline = final_newline
+        self.overflow = list(overflow)
+        self._residues = None
+
+    def __len__(self):
+        return len(self.atoms)
+
+    @property
+    def coords(self):
+        """Coordenadas (n_atoms, 3) en float32, sin copiar."""
+        return self.atoms["coords"]
+
+    @property
+    def residue_index(self):
+        return self.atoms["residue_index"]
+
+    def residue_starts(self):
+        """Índice del primer átomo de cada residuo."""
+        index = self.residue_index
+        if not len(index):
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+
+    def ca_indices(self):
+        """Índice del primer átomo CA de cada residuo proteico (como ``PDBAtoms.ca_indices``)."""
+        atoms = self.atoms
+        ca = np.flatnonzero((np.char.strip(atoms["name"]) == b"CA") & (np.char.strip(atoms["record"]) == b"ATOM"))
+        if not len(ca):
+            return ca
+        residues = np.asarray(self.residue_index)[ca]
+        return ca[np.r_[True, residues[1:] != residues[:-1]]]
+
+    def residue_table(self):
+        """
+        Returns:
+            ResidueTable: Tabla de residuos (se construye una vez por estructura abierta),
+            equivalente a ``build_residue_table`` sobre el texto.
+        """
+        if self._residues is None:
+            starts = self.residue_starts()
+            self._residues = ResidueTable(
+                self.atoms["resseq"][starts].astype(np.int32),
+                np.char.strip(self.atoms["resname"][starts]).astype("U4"),
+                self.atoms["chain"][starts].astype("U1"),
+            )
+        return self._residues
+
+    def to_pdb(self):
+        """
+        Returns:
+            str: Texto PDB igual al que se guardó.
+        """
+        atom_lines = _format_atom_lines(self.atoms)
+        for index, tail in self.overflow:
+            atom_lines[index] += tail
+        lines = []
+        previous = 0
+        for position, line in self.other_lines:
+            lines.extend(atom_lines[previous:position])
+            lines.append(line)
+            previous = position
+        lines.extend(atom_lines[previous:])
+        return "\n".join(lines) + ("\n" if self.final_newline and lines else "")
+
+
+def _column(block, start, end):
+    """Columnas [start, end) de un bloque (n, 80) de bytes como arreglo ``S{end-start}``."""
+    return np.ascontiguousarray(block[:, start:end]).view(f"S{end - start}").ravel()
+
+
+def encode_pdb(pdb_text):
+    """
+    Convierte un PDB en registros ``ATOM_DTYPE``. Las columnas se extraen con vistas sobre
+    un único bloque de bytes, sin recorrer los campos línea a línea.
+
+    Args:
+        pdb_text (str): Contenido PDB.
+
+    Returns:
+        StructureArrays: Estructura en memoria (no asociada a un archivo).
+    """
+    atom_lines, other_lines = [], []
+    for line in pdb_text.splitlines():
+        if line.startswith(("ATOM", "HETATM")):
+            atom_lines.append(line)
+        else:
+            other_lines.append([len(atom_lines), line])
+
+    atoms = np.zeros(len(atom_lines), dtype=ATOM_DTYPE)
+    if atom_lines:
+        block = np.frombuffer("".join(line.ljust(80)[:80] for line in atom_lines).encode("latin-1"),
+                              dtype=np.uint8).reshape(-1, 80)
+        for field, (start, end) in _TEXT_FIELDS.items():
+            atoms[field] = _column(block, start, end)
+        atoms["resseq"] = _column(block, 22, 26).astype(np.int32)
+        for axis, start in enumerate((30, 38, 46)):
+            atoms["coords"][:, axis] = _column(block, start, start + 8).astype(np.float32)
+        atoms["width"] = [min(len(line), 80) for line in atom_lines]
+
+        chains, resseqs, icodes = atoms["chain"], atoms["resseq"], atoms["icode"]
+        new_residue = np.r_[True, (chains[1:] != chains[:-1]) | (resseqs[1:] != resseqs[:-1])
+                            | (icodes[1:] != icodes[:-1])]
+        atoms["residue_index"] = np.cumsum(new_residue) - 1
+    overflow = [[index, line[80:]] for index, line in enumerate(atom_lines) if len(line) > 80]
+    return StructureArrays(atoms, other_lines, pdb_text.endswith("\n"), overflow)
+
+
+def _fixed_width(values, width, decimals=0):
+    """
+    Números alineados a la derecha con ``decimals`` decimales (como ``f"{v:{width}.{decimals}f}"``),
+    escritos dígito a dígito sobre un bloque (n, width) de bytes.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    remaining = np.rint(np.abs(values) * 10 ** decimals).astype(np.int64)
+    out = np.full((len(values), width), ord(" "), dtype=np.uint8)
+    leftmost = np.full(len(values), width, dtype=np.int64)
+    # Siempre se escriben los decimales, el punto y al menos un dígito entero
+    always = decimals + 1 if decimals else 0
+    for k in range(width):
+        column = width - 1 - k
+        if decimals and k == decimals:
+            out[:, column] = ord(".")
+            continue
+        active = slice(None) if k <= always else remaining > 0
+        out[active, column] = ord("0") + remaining[active] % 10
+        leftmost[active] = column
+        remaining //= 10
+    negative = np.flatnonzero(np.signbit(values) & (leftmost > 0))
+    out[negative, leftmost[negative] - 1] = ord("-")
+    return out
+
+
+def _format_atom_lines(atoms):
+    n = len(atoms)
+    block = np.full((n, 80), ord(" "), dtype=np.uint8)
+    for field, (start, end) in _TEXT_FIELDS.items():
+        block[:, start:end] = np.ascontiguousarray(atoms[field]).view(np.uint8).reshape(n, end - start)
+    block[:, 22:26] = _fixed_width(atoms["resseq"], 4)
+    coords = atoms["coords"]
+    for axis, start in enumerate((30, 38, 46)):
+        block[:, start:start + 8] = _fixed_width(coords[:, axis], 8, 3)
+    text = block.tobytes().decode("latin-1")
+    return [text[i * 80:i * 80 + width] for i, width in enumerate(atoms["width"].tolist())]
+
+
+class CoordinateStore:
+    """
+    Directorio de estructuras binarias direccionado por el hash de StructureBlobs.
+
+    Args:
+        root (str): Directorio base.
+    """
+
+    def __init__(self, root, max_open=256):
+        self.root = root
+        self.max_open = max_open
+        # Estructuras abiertas (LRU de memmaps): sólo ocupan memoria las páginas leídas
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, digest, suffix=".npy"):
+        return os.path.join(self.root, digest[:2], digest + suffix)
+
+    def has(self, digest):
+        return os.path.exists(self.path(digest, ".json"))
+
+    def write(self, digest, pdb_text):
+        """
+        Guarda la estructura ``pdb_text`` bajo ``digest`` (no hace nada si ya existe).
+        El ``.json`` se escribe al final: su presencia indica que la estructura está completa.
+
+        Returns:
+            bool: True si se escribió.
+        """
+        if not digest or not pdb_text or self.has(digest):
+            return False
+        try:
+            structure = encode_pdb(pdb_text)
+        except ValueError as e:
+            print(f"No se pudo convertir la estructura {digest} a formato binario: {e}")
+            return False
+        os.makedirs(os.path.dirname(self.path(digest)), exist_ok=True)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(self.path(digest) + suffix, "wb") as f:
+                np.save(f, structure.atoms, allow_pickle=False)
+            os.replace(self.path(digest) + suffix, self.path(digest))
+            with open(self.path(digest, ".json") + suffix, "w") as f:
+                json.dump({"version": FORMAT_VERSION, "other_lines": structure.other_lines,
+                           "final_newline": structure.final_newline, "overflow": structure.overflow}, f)
+            os.replace(self.path(digest, ".json") + suffix, self.path(digest, ".json"))
+        except OSError as e:
+            print(f"No se pudo guardar la estructura binaria {digest}: {e}")
+            return False
+        return True
+
+    def load(self, digest):
+        """
+        Abre una estructura en modo memmap.
+
+        Args:
+            digest (str): Hash del PDB.
+
+        Returns:
+            StructureArrays: Estructura, o None si no está en el almacén.
+        """
+        if not digest:
+            return None
+        with self._lock:
+            structure = self._open.get(digest)
+            if structure is not None:
+                self._open.move_to_end(digest)
+                return structure
+        try:
+            with open(self.path(digest, ".json")) as f:
+                meta = json.load(f)
+            if meta.get("version") != FORMAT_VERSION:
+                return None
+            atoms = np.load(self.path(digest), mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        structure = StructureArrays(atoms, meta["other_lines"], meta.get("final_newline", True),
+                                    meta.get("overflow", ()))
+        with self._lock:
+            self._open[digest] = structure
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return structure
+
+    def residue_table(self, digest):
+        """Tabla de residuos de una estructura del almacén, o None si no está."""
+        structure = self.load(digest)
+        return structure.residue_table() if structure is not None else None
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_coordinate_store(root=None):
+    """
+    Almacén compartido para ``root`` (por defecto ``Config.COORDINATE_DIR``).
+
+    Returns:
+        CoordinateStore: Almacén, o None si está desactivado (``COORDINATE_DIR`` vacío).
+    """
+    if root is None:
+        from config import Config
+        root = Config.COORDINATE_DIR
+    if not root:
+        return None
+    key = (os.getpid(), os.path.abspath(root))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = CoordinateStore(root)
+        return store
+
+
+def write_structures(pairs, root=None):
+    """
+    Genera las estructuras binarias de los PDB recién guardados. Se llama después de
+    confirmar la transacción, fuera del bloqueo de escritura de la base.
+
+    Args:
+        pairs (list): Pares (hash, texto PDB).
+
+    Returns:
+        int: Estructuras escritas.
+    """
+    store = get_coordinate_store(root)
+    if store is None:
+        return 0
+    return sum(store.write(digest, pdb_text) for digest, pdb_text in pairs)
+
+
+def build_store(db_path, root=None):
+    """
+    Genera las estructuras binarias que falten para todos los PDB de StructureBlobs
+    (los PDB aún guardados como texto requieren antes ``structure_store.migrate_database``).
+
+    Returns:
+        int: Estructuras escritas.
+    """
+    from application.services.structure_store import ensure_schema, get_pdb
+    store = get_coordinate_store(root)
+    if store is None:
+        print("COORDINATE_DIR está vacío: el almacén binario está desactivado")
+        return 0
+    ensure_schema(db_path)
+    written = 0
+    conn = sqlite3.connect(db_path)
+    try:
+        digests = [row[0] for row in conn.execute("SELECT pdb_hash FROM StructureBlobs")]
+        for i, digest in enumerate(digests, 1):
+            if not store.has(digest):
+                written += store.write(digest, get_pdb(conn, digest))
+            if i % 500 == 0:
+                print(f"{i}/{len(digests)} estructuras revisadas")
+    finally:
+        conn.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", nargs="?", default=os.path.join("database", "proteins_discovery.db"))
+    parser.add_argument("--dir", help="Directorio del almacén (por defecto Config.COORDINATE_DIR)")
+    args = parser.parse_args()
+    print(f"Estructuras binarias generadas: {build_store(args.db_path, args.dir)}")
+
+
+if __name__ == "__main__":
+    main()
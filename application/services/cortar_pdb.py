@@ -1,7 +1,8 @@
-import MDAnalysis as mda
-from MDAnalysis.coordinates.PDB import PDBWriter
-from Bio.PDB import PDBParser, PPBuilder
 import numpy as np
+from application.services.backends import get_backend
+from application.services.helix_orientation import (
+    analyze_structures, group_centers, helix_selection, normal_distances, z_direction
+)
 
 class PDBHandler:
     """
@@ -19,9 +20,10 @@ class PDBHandler:
         Returns:
             str: Secuencia primaria de aminoácidos como una cadena.
         """
-        parser = PDBParser(QUIET=True)
+        bio_pdb = get_backend("biopython")
+        parser = bio_pdb.PDBParser(QUIET=True)
         structure = parser.get_structure('protein', pdb_file)
-        ppb = PPBuilder()
+        ppb = bio_pdb.PPBuilder()
         sequence = "".join([str(pp.get_sequence()) for pp in ppb.build_peptides(structure)])
 
         if not sequence:
@@ -40,13 +42,14 @@ class PDBHandler:
             start_residue (int): Índice inicial del residuo.
             end_residue (int): Índice final del residuo.
         """
+        mda = get_backend("mdanalysis")
         u = mda.Universe(input_pdb)
         selection = u.select_atoms(f"resid {start_residue}:{end_residue}")
 
         if selection.n_atoms == 0:
             raise ValueError(f"No se encontraron residuos en el rango {start_residue}-{end_residue}.")
 
-        with PDBWriter(output_pdb) as writer:
+        with mda.coordinates.PDB.PDBWriter(output_pdb) as writer:
             writer.write(selection)
 
         print(f"Archivo recortado guardado en: {output_pdb}")
@@ -63,7 +66,7 @@ class VSDAnalyzer:
         Args:
             pdb_file (str): Ruta al archivo PDB de entrada.
         """
-        self.u = mda.Universe(pdb_file)
+        self.u = get_backend("mdanalysis").Universe(pdb_file)
         self.protein = self.u.select_atoms("protein")
         self.center_of_mass = self.protein.center_of_mass()
 
@@ -81,31 +84,54 @@ class VSDAnalyzer:
             list: Lista de residuos orientados hacia el interior.
         """
         z_axis = np.array([self.center_of_mass[0], self.center_of_mass[1], 1e3])
-        z_direction = z_axis - self.center_of_mass
-        z_direction /= np.linalg.norm(z_direction)
+        z_dir = z_direction(self.center_of_mass)
+
+        # Centros de masa de todos los residuos en una sola reducción agrupada
+        residues = self.protein.residues
+        _, atom_residue = np.unique(self.protein.resindices, return_inverse=True)
+        centers = group_centers(self.protein.positions.astype(np.float64), self.protein.masses,
+                                atom_residue.ravel(), len(residues))
+
+        # Residuos de las hélices, en el orden en que se recorren las hélices
+        helix = helix_selection(residues.resids, helices_residues)
+        selected = np.flatnonzero(helix >= 0)
+        selected = selected[np.argsort(helix[selected], kind="stable")]
+
+        distances = normal_distances(centers[selected], self.center_of_mass[None, :], z_dir[None, :])
+        inward = distances < cutoff
+
+        # Factor B: 1.0 en los residuos hacia el interior, 0.0 en el resto de las hélices
+        flags = np.full(len(residues), -1.0)
+        flags[selected] = inward
+        atom_flags = flags[atom_residue.ravel()]
+        tempfactors = self.protein.tempfactors.copy()
+        tempfactors[atom_flags >= 0] = atom_flags[atom_flags >= 0]
+        self.protein.tempfactors = tempfactors
 
-        residues_to_center = []
-
-        for helix, (start, end) in helices_residues.items():
-            helix_residues = self.protein.select_atoms(f"resid {start}:{end}").residues
+        self.protein.write(output_pdb)
+        self._generate_vmd_file(vmd_output, z_axis)
 
-            for res in helix_residues:
-                res_center = res.atoms.center_of_mass()
-                vector_to_center = self.center_of_mass - res_center
-                projection = np.dot(vector_to_center, z_direction)
-                normal_vector = vector_to_center - projection * z_direction
-                normal_distance = np.linalg.norm(normal_vector)
+        return [residues[i] for i in selected[inward]]
 
-                if normal_distance < cutoff:
-                    residues_to_center.append(res)
-                    res.atoms.tempfactors = 1.0
-                else:
-                    res.atoms.tempfactors = 0.0
+    @staticmethod
+    def analyze_many(pdb_files, helices_residues, cutoff=5.0):
+        """
+        Analiza la orientación de las hélices de varias estructuras en una sola llamada,
+        sin MDAnalysis (ver helix_orientation.analyze_structures).
 
-        self.protein.write(output_pdb)
-        self._generate_vmd_file(vmd_output, z_axis)
+        Args:
+            pdb_files (list): Rutas de archivos PDB.
+            helices_residues (dict): Diccionario con las hélices y sus residuos (inicio, fin).
+            cutoff (float): Distancia umbral para clasificar residuos orientados hacia el interior.
 
-        return residues_to_center
+        Returns:
+            list: Un HelixOrientation por archivo.
+        """
+        texts = []
+        for pdb_file in pdb_files:
+            with open(pdb_file) as f:
+                texts.append(f.read())
+        return analyze_structures(texts, helices_residues, cutoff)
 
     def _generate_vmd_file(self, vmd_output, z_axis):
         """
@@ -0,0 +1,142 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+class ConnectionManager:
+    """
+    Conexiones SQLite compartidas por todos los servicios.
+
+    Las lecturas toman una conexión de un pool acotado y la devuelven al terminar,
+    de modo que el número de conexiones abiertas no crece con los hilos del servidor;
+    todas las escrituras pasan por una única conexión protegida por un lock. Las
+    conexiones se configuran con WAL, mmap y caché de páginas ampliada, y conservan
+    una caché de sentencias preparadas.
+    """
+
+    def __init__(self, db_path, cache_size_kib=65536, mmap_size=256 * 1024 ** 2,
+                 cached_statements=256, busy_timeout_ms=30000, pool_size=8):
+        """
+        Args:
+            db_path (str): Ruta de la base de datos.
+            cache_size_kib (int): Caché de páginas por conexión, en KiB.
+            mmap_size (int): Bytes de la base de datos mapeados en memoria.
+            cached_statements (int): Sentencias preparadas que conserva cada conexión.
+            busy_timeout_ms (int): Espera máxima ante bloqueos de escritura.
+            pool_size (int): Conexiones de lectura inactivas que se conservan.
+        """
+        self.db_path = db_path
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._writer = None
+        self._writer_lock = threading.RLock()
+        self._wal_checked = False
+
+    def _connect(self, check_same_thread=True):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=check_same_thread,
+        )
+        conn.execute(f"PRAGMA cache_size = -{self.cache_size_kib}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def _ensure_wal(self, conn):
+        # journal_mode es persistente en el archivo: basta con fijarlo una vez
+        if not self._wal_checked:
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+            except sqlite3.OperationalError as e:
+                print(f"No se pudo activar WAL en {self.db_path}: {e}")
+            self._wal_checked = True
+
+    def _open_reader(self):
+        conn = self._connect(check_same_thread=False)
+        with self._writer_lock:
+            self._ensure_wal(conn)
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """
+        Conexión de lectura tomada del pool y devuelta al salir.
+
+        Si no hay conexiones inactivas se abre una nueva (nunca se espera, por lo que
+        las lecturas anidadas no se bloquean); al devolverla, las que exceden el
+        tamaño del pool se cierran.
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open_reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def writer(self):
+        """
+        Conexión única de escritura; confirma la transacción al salir o la revierte
+        si se produce una excepción.
+        """
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = self._connect(check_same_thread=False)
+                self._ensure_wal(self._writer)
+                self._writer.execute("PRAGMA synchronous = NORMAL")
+            with self._writer:
+                yield self._writer
+
+    def close_all(self):
+        """Cierra las conexiones inactivas y la de escritura de este administrador."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+def get_connection_manager(db_path):
+    """
+    Devuelve el ConnectionManager compartido para ``db_path`` en el proceso actual.
+
+    Los procesos hijos (p. ej. trabajadores de un ProcessPoolExecutor) obtienen su
+    propio administrador: las conexiones SQLite no deben heredarse tras un fork.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+
+    Returns:
+        ConnectionManager: Administrador de conexiones.
+    """
+    key = (os.getpid(), os.path.abspath(db_path))
+    manager = _managers.get(key)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.get(key)
+            if manager is None:
+                manager = ConnectionManager(db_path)
+                _managers[key] = manager
+    return manager
@@ -0,0 +1,302 @@
+import io
+import os
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from application.services.bulk_export import export_zones
+from application.services.foldseek_data_fetch import FoldSeekDataFetch
+from application.services.structure_files import get_alignment_pdb, get_reference_pdb
+from application.services.uniprot_data_fetch import UniProtDataFetch
+
+CHUNK_SIZE = 256 * 1024
+
+COORDINATE_RECORDS = ("ATOM", "HETATM", "TER")
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Destino no buscable de zipfile: acumula los bytes escritos hasta que se drenan."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _iter_content(content):
+    """Convierte texto, bytes, una ruta (``("file", ruta)``) o un iterable en bloques de bytes."""
+    if isinstance(content, str):
+        content = content.encode()
+    if isinstance(content, bytes):
+        for start in range(0, len(content), CHUNK_SIZE):
+            yield content[start:start + CHUNK_SIZE]
+    elif isinstance(content, tuple) and content[0] == "file":
+        with open(content[1], "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    else:
+        for chunk in content:
+            yield chunk.encode() if isinstance(chunk, str) else chunk
+
+
+def _write_members(zf, members):
+    """Escribe los miembros en ``zf`` cediendo el control tras cada bloque escrito."""
+    for name, content in members:
+        with zf.open(name, "w", force_zip64=True) as dest:
+            for chunk in _iter_content(content):
+                dest.write(chunk)
+                yield
+
+
+def stream_zip(members):
+    """
+    Genera un ZIP como secuencia de bloques de bytes, a medida que se producen los miembros.
+
+    Args:
+        members (iterable): Pares ``(nombre, contenido)``; el contenido puede ser texto,
+            bytes, un iterable de bloques o ``("file", ruta)``.
+
+    Yields:
+        bytes: Fragmentos del archivo ZIP.
+    """
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for _ in _write_members(zf, members):
+            data = buffer.drain()
+            if data:
+                yield data
+    yield buffer.drain()
+
+
+def write_zip(path, members):
+    """Escribe un ZIP en disco de forma atómica (archivo temporal y renombrado)."""
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for _ in _write_members(zf, members):
+            pass
+    os.replace(tmp_path, path)
+
+
+def combined_pdb(reference_pdb, aligned_pdb):
+    """
+    Referencia y estructura alineada en un solo PDB, como ``combine_pdbs`` de PyMOL
+    pero sin cargar las moléculas: los registros de coordenadas de ambas (cada una
+    cerrada con TER) seguidos de END.
+
+    Yields:
+        str: Bloques de texto.
+    """
+    for text in (reference_pdb, aligned_pdb):
+        lines = [line for line in text.splitlines() if line.startswith(COORDINATE_RECORDS)]
+        if lines and not lines[-1].startswith("TER"):
+            lines.append("TER")
+        if lines:
+            yield "\n".join(lines) + "\n"
+    yield "END\n"
+
+
+def package_members(db_path, source, alignment_id, prefix=""):
+    """
+    Miembros del paquete de descarga de un alineamiento, generados bajo demanda.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        source (str): "foldseek" o "uniprot".
+        alignment_id (int): alignment_detail_id (FoldSeek) o alignment_id (UniProt).
+        prefix (str): Carpeta dentro del ZIP (para exportaciones de varios alineamientos).
+
+    Yields:
+        tuple: (nombre, contenido).
+    """
+    fetcher = FoldSeekDataFetch(db_path) if source == "foldseek" else UniProtDataFetch(db_path)
+    info_content = fetcher.get_alignment_info(alignment_id)
+    if info_content is None:
+        return
+    reference_id, aligned_pdb = get_alignment_pdb(db_path, source, alignment_id)
+    yield f"{prefix}alignment_info.txt", info_content
+    reference_pdb = get_reference_pdb(db_path, reference_id) if reference_id is not None else None
+    if reference_pdb:
+        yield f"{prefix}reference.pdb", reference_pdb
+    if aligned_pdb:
+        yield f"{prefix}aligned.pdb", aligned_pdb
+    if reference_pdb and aligned_pdb:
+        yield f"{prefix}combined.pdb", combined_pdb(reference_pdb, aligned_pdb)
+
+
+class ExportJob:
+    __slots__ = ("job_id", "kind", "items", "status", "done", "total", "path", "error", "created_at", "finished_at")
+
+    def __init__(self, job_id, items, kind="packages"):
+        self.job_id = job_id
+        self.kind = kind
+        self.items = items
+        self.status = "pending"
+        self.done = 0
+        self.total = len(items)
+        self.path = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ExportJobManager:
+    """
+    Exportaciones masivas en segundo plano: cada trabajo escribe en ``export_dir`` un ZIP
+    con una carpeta por alineamiento o, para ``submit_zones``, la tabla de zonas en Parquet. Los trabajos terminados y sus archivos se
+    eliminan cuando superan ``ttl_seconds``.
+    """
+
+    def __init__(self, db_path, export_dir, max_workers=2, ttl_seconds=3600):
+        """
+        Args:
+            db_path (str): Ruta de la base de datos.
+            export_dir (str): Directorio de los ZIP generados.
+            max_workers (int): Trabajos de exportación simultáneos.
+            ttl_seconds (int): Vida de un trabajo terminado y de su archivo.
+        """
+        self.db_path = db_path
+        self.export_dir = export_dir
+        self.ttl_seconds = ttl_seconds
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        os.makedirs(export_dir, exist_ok=True)
+        self.cleanup()
+
+    def submit(self, items):
+        """
+        Args:
+            items (list): Pares (fuente, id) a exportar.
+
+        Returns:
+            ExportJob: Trabajo creado.
+        """
+        return self._submit(ExportJob(uuid.uuid4().hex, list(items)))
+
+    def submit_zones(self, sources):
+        """
+        Args:
+            sources (tuple): Fuentes cuyas zonas alineadas se exportan a Parquet.
+
+        Returns:
+            ExportJob: Trabajo creado.
+        """
+        return self._submit(ExportJob(uuid.uuid4().hex, list(sources), kind="zones"))
+
+    def _submit(self, job):
+        self.cleanup()
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        self.cleanup()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        job.status = "running"
+        try:
+            job.path = self._write_zones(job) if job.kind == "zones" else self._write_packages(job)
+            job.status = "done"
+        except Exception as e:
+            print(f"Error en la exportación {job.job_id}: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _write_packages(self, job):
+        path = os.path.join(self.export_dir, f"export_{job.job_id}.zip")
+
+        def members():
+            for source, alignment_id in job.items:
+                yield from package_members(self.db_path, source, alignment_id, prefix=f"{source}_{alignment_id}/")
+                job.done += 1
+
+        write_zip(path, members())
+        return path
+
+    def _write_zones(self, job):
+        # Sin pyarrow, export_zones cambia a CSV y devuelve la ruta real
+        path, _, _ = export_zones(self.db_path, os.path.join(self.export_dir, f"export_{job.job_id}.parquet"),
+                                  "parquet", tuple(job.items))
+        job.done = job.total
+        return path
+
+    def cleanup(self):
+        """Elimina los trabajos vencidos y los archivos huérfanos del directorio de exportación."""
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished_at is not None and now - job.finished_at > self.ttl_seconds]
+            for job in expired:
+                del self._jobs[job.job_id]
+            active = {job.job_id for job in self._jobs.values()}
+        for job in expired:
+            if job.path:
+                _remove(job.path)
+        # Archivos de ejecuciones anteriores del servidor (o temporales abandonados)
+        for name in os.listdir(self.export_dir):
+            path = os.path.join(self.export_dir, name)
+            job_id = name[len("export_"):].split(".")[0]
+            if job_id not in active:
+                try:
+                    if now - os.path.getmtime(path) > self.ttl_seconds:
+                        _remove(path)
+                except OSError:
+                    pass
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def get_export_jobs(db_path):
+    """Devuelve el ExportJobManager del proceso (configurado desde Config)."""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                from config import Config
+                _jobs = ExportJobManager(db_path, Config.EXPORT_DIR, ttl_seconds=Config.EXPORT_TTL_SECONDS)
+    return _jobs
@@ -1,14 +1,32 @@
 import sqlite3
-import os
-import zipfile
-from datetime import datetime
+from application.services.db_connection import get_connection_manager
+from application.services.reference_zones import get_reference_zones
+from application.services.structure_store import load_pdb
+from application.services.zone_records import FOLDSEEK_ZONES_QUERY, fetch_zone_records, legacy_zone_lists
+
+# Claves del antiguo formato GROUP_CONCAT -> atributo de ZoneRecord
+FOLDSEEK_LEGACY_KEYS = {
+    "aligned_fragments": "fragment",
+    "fragment_matches": "match",
+    "fragment_hydrophobicities": "hydrophobicity",
+    "fragment_volumes": "volume",
+    "delta_hydrophobicities": "delta_hydrophobicity",
+    "delta_volumes": "delta_volume",
+    "charge_types": "tipo_carga",
+    "charges": "cargas",
+    "reference_charges": "cargas_reference",
+    "reference_zone_ids": "reference_zone_id",
+}
 
 class FoldSeekDataFetch():
     def __init__(self, db_path):
         self.db_path = db_path
+        self.db = get_connection_manager(db_path)
+        self.zones = get_reference_zones(db_path)
     def get_foldseek_structures(self):
         """
-        Obtiene las estructuras de FoldSeek disponibles desde la vista foldseek_summary_view.
+        Obtiene las estructuras de FoldSeek disponibles desde la tabla materializada
+        foldseek_summary_view (o desde las tablas base si aún no existe o está vacía).
 
         Args:
             database_path (str): Ruta al archivo de la base de datos.
@@ -16,6 +34,11 @@ class FoldSeekDataFetch():
         Returns:
             list: Lista de diccionarios con las estructuras disponibles.
         """
+        summary_query = """
+            SELECT database_name, target, alignment_detail_id
+            FROM foldseek_summary_view
+            ORDER BY foldseek_id, alignment_detail_id;
+        """
         query = """
             SELECT 
                 f.database_name,
@@ -26,7 +49,7 @@ class FoldSeekDataFetch():
             JOIN FoldSeekAlignedZones faz ON fad.alignment_detail_id = faz.alignment_detail_id
             JOIN ReferenceSequences rz ON f.id_referencia = rz.reference_sequence_id
             WHERE f.database_name != 'gmgcl_id'
-            AND fad.pdb IS NOT NULL
+            AND (fad.pdb_hash IS NOT NULL OR fad.pdb IS NOT NULL)
             AND fad.alignment_detail_id IN (
                 SELECT DISTINCT faz.alignment_detail_id 
                 FROM FoldSeekAlignedZones faz
@@ -35,10 +58,16 @@ class FoldSeekDataFetch():
             GROUP BY f.foldseek_id, fad.alignment_detail_id;
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.db.reader() as conn:
                 cursor = conn.cursor()
-                cursor.execute(query)
-                rows = cursor.fetchall()
+                try:
+                    rows = cursor.execute(summary_query).fetchall()
+                except sqlite3.OperationalError:
+                    # Base de datos sin tablas materializadas
+                    rows = []
+                if not rows:
+                    # Tablas materializadas ausentes o aún sin llenar (ver ensure_summary_tables)
+                    rows = cursor.execute(query).fetchall()
 
                 # Convertir los resultados en una lista de diccionarios
                 structures = [
@@ -66,7 +95,8 @@ class FoldSeekDataFetch():
             alignment_detail_id (int): ID del detalle de alineamiento.
 
         Returns:
-            dict: Detalles del alineamiento y sus zonas alineadas.
+            dict: Detalles del alineamiento; "zones" contiene un ZoneRecord por zona
+                alineada (las listas por columna se conservan por compatibilidad).
         """
         query = """
             SELECT 
@@ -76,49 +106,32 @@ class FoldSeekDataFetch():
                 fad.similarity,
                 fad.pdb,
                 rz.pdb AS reference_pdb,
-                GROUP_CONCAT(faz.fragment, ' | ') AS aligned_fragments,
-                GROUP_CONCAT(faz.match, ', ') AS fragment_matches,
-                GROUP_CONCAT(faz.hydrophobicity, ', ') AS fragment_hydrophobicities,
-                GROUP_CONCAT(faz.volume, ', ') AS fragment_volumes,
-                GROUP_CONCAT(faz.delta_hydrophobicity, ', ') AS delta_hydrophobicities,
-                GROUP_CONCAT(faz.delta_volume, ', ') AS delta_volumes,
-                GROUP_CONCAT(faz.tipo_carga, ', ') AS charge_types,
-                GROUP_CONCAT(faz.cargas, '| ') AS charges,
-                GROUP_CONCAT(faz.cargas_reference, '| ') AS reference_charges,
-                GROUP_CONCAT(faz.reference_zone_id, ', ') AS reference_zone_ids
+                fad.pdb_hash,
+                rz.pdb_hash AS reference_pdb_hash
             FROM FoldSeekAlignmentDetails fad
-            JOIN FoldSeekAlignedZones faz ON fad.alignment_detail_id = faz.alignment_detail_id
             JOIN FoldSeek f ON fad.foldseek_id = f.foldseek_id
             JOIN ReferenceSequences rz ON f.id_referencia = rz.reference_sequence_id
-            WHERE fad.alignment_detail_id = ?
-            GROUP BY fad.alignment_detail_id;
+            WHERE fad.alignment_detail_id = ?;
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, (alignment_detail_id,))
-                row = cursor.fetchone()
-                if row:
-                    return {
-                    "reference_aligned": row[0],
-                    "alignment_match": row[1],
-                    "target_aligned": row[2],
-                    "similarity": row[3],
-                    "pdb_path": row[4],
-                    "reference_pdb_path": row[5],
-                    "aligned_fragments": row[6].split(" | ") if row[6] else [],
-                    "fragment_matches": row[7].split(", ") if row[7] else [],
-                    "fragment_hydrophobicities": row[8].split(", ") if row[8] else [],
-                    "fragment_volumes": row[9].split(", ") if row[9] else [],
-                    "delta_hydrophobicities": row[10].split(", ") if row[10] else [],
-                    "delta_volumes": row[11].split(", ") if row[11] else [],
-                    "charge_types": row[12].split(", ") if row[12] else [],
-                    "charges": row[13].split("| ") if row[13] else [],
-                    "reference_charges": row[14].split("| ") if row[14] else [],
-                    "reference_zone_ids": row[15].split(", ") if row[15] else []
-                },
-                else:
+            with self.db.reader() as conn:
+                row = conn.execute(query, (alignment_detail_id,)).fetchone()
+                zones = fetch_zone_records(conn, FOLDSEEK_ZONES_QUERY, alignment_detail_id, self.zones) if row else []
+                if not zones:
                     return {}
+                aligned_pdb = load_pdb(conn, row[6], row[4])
+                reference_pdb = load_pdb(conn, row[7], row[5])
+            details = {
+                "reference_aligned": row[0],
+                "alignment_match": row[1],
+                "target_aligned": row[2],
+                "similarity": row[3],
+                "pdb_path": aligned_pdb,
+                "reference_pdb_path": reference_pdb,
+                "zones": zones
+            }
+            details.update(legacy_zone_lists(zones, FOLDSEEK_LEGACY_KEYS))
+            return details
         except Exception as e:
             print(f"Error fetching alignment details: {e}")
             return {}
@@ -128,52 +141,28 @@ class FoldSeekDataFetch():
         Obtiene los números de las zonas alineadas a partir de sus IDs.
 
         Args:
-            database_path (str): Ruta al archivo de la base de datos.
             zone_ids (list): Lista de IDs de zona.
 
         Returns:
-            list: Lista de números de zonas.
-        """
-        query = """
-            SELECT zone_number, sequence_fragment
-            FROM ReferenceZones
-            WHERE zone_id = ?
+            dict: Número de zona -> fragmento de la secuencia de referencia.
         """
         try:
-            zone_numbers = {}
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                for zone_id in zone_ids:
-                    cursor.execute(query, (zone_id,))
-                    result = cursor.fetchone()
-                    if result:
-                        zone_numbers[result[0]] = result[1]
-            return zone_numbers
+            return self.zones.zone_numbers(zone_ids)
         except Exception as e:
             print(f"Error fetching zone numbers: {e}")
-            return []
+            return {}
 
-    def create_download_package_from_view(self, alignment_detail_id, ref_pdb, aligned_pdb, combined_pdb_path):
+    def get_alignment_info(self, alignment_detail_id):
         """
-        Crea un paquete ZIP con datos basados en la vista foldseek_summary_view.
+        Genera el texto alignment_info.txt de un alineamiento FoldSeek.
 
         Args:
-            database_path (str): Ruta de la base de datos.
             alignment_detail_id (int): ID del alineamiento.
-            ref_pdb (str): Contenido del archivo PDB de referencia.
-            aligned_pdb (str): Contenido del archivo PDB alineado.
-            combined_pdb_path (str): Ruta del archivo combinado.
 
         Returns:
-            str: Ruta del archivo ZIP creado.
+            str: Contenido del archivo o None si el alineamiento no existe.
         """
-        try:
-            # Crear timestamp para un nombre único
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            zip_path = os.path.join(os.path.dirname(combined_pdb_path), f"foldseek_data_{timestamp}.zip")
-
-            # Conectar a la base de datos y obtener datos desde la vista
-            conn = sqlite3.connect(self.db_path)
+        with self.db.reader() as conn:
             cursor = conn.cursor()
 
             # Obtener detalles del alineamiento
@@ -200,35 +189,11 @@ class FoldSeekDataFetch():
 
             db_name, target, taxName, taxId, hyperlink, similarity, ref_aligned, match, target_aligned = data
 
-            # Obtener datos de las zonas alineadas
-            zone_query = """
-                SELECT 
-                    GROUP_CONCAT(faz.reference_zone_id, ', ') AS reference_zone_ids,
-                    GROUP_CONCAT(faz.fragment, ' | ') AS aligned_fragments,
-                    GROUP_CONCAT(faz.match, ', ') AS fragment_matches,
-                    GROUP_CONCAT(faz.hydrophobicity, ', ') AS fragment_hydrophobicities,
-                    GROUP_CONCAT(faz.volume, ', ') AS fragment_volumes,
-                    GROUP_CONCAT(faz.delta_hydrophobicity, ', ') AS delta_hydrophobicities,
-                    GROUP_CONCAT(faz.delta_volume, ', ') AS delta_volumes,
-                    GROUP_CONCAT(faz.tipo_carga, ', ') AS charge_types,
-                    GROUP_CONCAT(faz.cargas, '| ') AS charges,
-                    GROUP_CONCAT(faz.cargas_reference, '| ') AS reference_charges
-                FROM FoldSeekAlignedZones faz
-                WHERE faz.alignment_detail_id = ?
-                GROUP BY faz.alignment_detail_id;
-
-            """
-            cursor.execute(zone_query, (alignment_detail_id,))
-            zones_data = cursor.fetchall()
-            
+            # Zonas alineadas, una fila por zona
+            zones = fetch_zone_records(conn, FOLDSEEK_ZONES_QUERY, alignment_detail_id, self.zones)
 
-            zone_numbers_query = """
-            SELECT zone_number, sequence_fragment
-            FROM ReferenceZones
-            WHERE zone_id = ?
-            """
-            # Crear contenido informativo
-            info_content = f"""FoldSeek Alignment Information
+        # Crear contenido informativo
+        info_content = f"""FoldSeek Alignment Information
 ==============================
 Database: {db_name}
 Target: {target}
@@ -246,54 +211,19 @@ Target   : {target_aligned}
 Zone Analysis
 ==============================
 """
-            zone_numbers = []
-            for idx, zone in enumerate(zones_data, start=1):
-                references_zones_ids, fragment, zone_match, hydrophobicity, volume, delta_hydrophobicity, delta_volume, tipo_carga, cargas, reference_charges = zone
-            
-            references_zones_ids = references_zones_ids.split(", ")    
-            fragment = fragment.split(" | ")
-            zone_match = zone_match.split(", ")
-            hydrophobicity = hydrophobicity.split(", ")
-            volume = volume.split(", ")
-            delta_hydrophobicity = delta_hydrophobicity.split(", ")
-            delta_volume = delta_volume.split(", ")
-            tipo_carga = tipo_carga.split(", ")
-            cargas = cargas.split("| ")
-            reference_charges = reference_charges.split("| ")
-            for i in range(len(fragment)):
-                cursor.execute(zone_numbers_query, (references_zones_ids[i],))
-                zone_data=(cursor.fetchall()[0])        
-                info_content += f"""
-Zone {zone_data[0]}:
+        for zone in zones:
+            info_content += f"""
+Zone {zone.zone_number}:
 -------------
-Reference Zone : {zone_data[1]}
-Match          : {zone_match[i]}
-Fragment       : {fragment[i]}
-Hydrophobicity : {hydrophobicity[i]}
-Volume         : {volume[i]}
-Delta Hydrophobicity: {delta_hydrophobicity[i]}
-Delta Volume   : {delta_volume[i]}
-Charge Type    : {tipo_carga[i]}
-Reference Charges: {reference_charges[i]}
-Target Charges : {cargas[i]}
+Reference Zone : {zone.reference_fragment}
+Match          : {zone.match}
+Fragment       : {zone.fragment}
+Hydrophobicity : {zone.hydrophobicity}
+Volume         : {zone.volume}
+Delta Hydrophobicity: {zone.delta_hydrophobicity}
+Delta Volume   : {zone.delta_volume}
+Charge Type    : {zone.tipo_carga}
+Reference Charges: {zone.cargas_reference}
+Target Charges : {zone.cargas}
 """
-
-            conn.close()
-            # Crear archivo ZIP
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                # Añadir PDBs de referencia y alineado
-                zipf.writestr("reference.pdb", ref_pdb)
-                zipf.writestr("aligned.pdb", aligned_pdb)
-
-                # Añadir archivo combinado
-                with open(combined_pdb_path, 'r') as f:
-                    zipf.writestr("combined.pdb", f.read())
-
-                # Añadir archivo de información
-                zipf.writestr("alignment_info.txt", info_content)
-
-            return zip_path
-
-        except Exception as e:
-            print(f"Error creating download package: {e}")
-            return None
\ No newline at end of file
+        return info_content
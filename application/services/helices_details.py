@@ -0,0 +1,266 @@
+"""
+Llenado de la tabla HelicesDetails: orientación (I = hacia el interior del dominio,
+O = hacia el exterior) de cada residuo de las hélices S1-S4 de las estructuras alineadas
+de los alineamientos UniProt y FoldSeek con zonas VSD válidas.
+
+Los límites de cada hélice en la numeración de la estructura se obtienen de su zona de
+ReferenceZones: el fragmento de referencia se ubica en la secuencia de referencia, se
+lleva a la secuencia objetivo a través del alineamiento y de ahí a los residuos CA de la
+estructura (como en superposition). La orientación se calcula con
+helix_orientation.analyze_structures para bloques de estructuras repartidos en un pool
+de procesos, y todas las filas se escriben con ``executemany`` en una sola transacción.
+Cada alineamiento guarda ``helices_hash`` (PDB alineado, alineamiento, zonas y cutoff):
+las estructuras sin cambios no se vuelven a analizar.
+
+Uso:
+    python -m application.services.helices_details database/proteins_discovery.db --workers 4
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from application.services.db_connection import get_connection_manager
+from application.services.helix_orientation import analyze_structures
+from application.services.reference_zones import get_reference_zones
+from application.services.superposition import map_sequence_to_residues
+
+# Se incluye en el hash: cambiarla obliga a analizar de nuevo todas las estructuras
+HELICES_VERSION = 1
+DEFAULT_CUTOFF = 5.0
+
+# Por fuente: alineamientos con estructura y zonas válidas, sus zonas y la tabla a marcar
+SOURCES = {
+    "UniProt": {
+        "structures": """
+            SELECT a.alignment_id, a.pdb_hash, a.seq_ref, a.seq, a.helices_hash
+            FROM Alignments a
+            WHERE a.pdb_hash IS NOT NULL
+              AND EXISTS (SELECT 1 FROM AlignedZones z WHERE z.alignment_id = a.alignment_id AND z.vsd_valido = 1)
+        """,
+        "zones": "SELECT alignment_id, aligned_zone_id, reference_zone_id FROM AlignedZones",
+        "mark": "UPDATE Alignments SET helices_hash = ? WHERE alignment_id = ?",
+    },
+    "FoldSeek": {
+        "structures": """
+            SELECT d.alignment_detail_id, d.pdb_hash, d.reference_aligned, d.target_aligned, d.helices_hash
+            FROM FoldSeekAlignmentDetails d
+            WHERE d.pdb_hash IS NOT NULL
+              AND EXISTS (SELECT 1 FROM FoldSeekAlignedZones z
+                          WHERE z.alignment_detail_id = d.alignment_detail_id AND z.vsd_valido = 1)
+        """,
+        "zones": "SELECT alignment_detail_id, aligned_zone_id, reference_zone_id FROM FoldSeekAlignedZones",
+        "mark": "UPDATE FoldSeekAlignmentDetails SET helices_hash = ? WHERE alignment_detail_id = ?",
+    },
+}
+
+INSERT_QUERY = """
+    INSERT INTO HelicesDetails (aligned_zone_id, zone_number, helix, residue_id, location, source)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+DELETE_QUERY = "DELETE FROM HelicesDetails WHERE source = ? AND aligned_zone_id = ?"
+
+
+def helices_hash(pdb_hash, ref_aligned, target_aligned, zones, cutoff):
+    zone_key = ";".join(f"{zone_id}:{number}:{fragment}" for zone_id, number, fragment in zones)
+    key = f"{HELICES_VERSION}:{float(cutoff)}:{pdb_hash}:{ref_aligned}:{target_aligned}:{zone_key}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def helix_boundaries(ref_aligned, target_aligned, zones, resids, structure_sequence):
+    """
+    Residuos inicial y final de cada hélice en la numeración de la estructura.
+
+    Args:
+        ref_aligned (str): Secuencia de referencia alineada (con gaps).
+        target_aligned (str): Secuencia objetivo alineada (con gaps).
+        zones (list): Tuplas (aligned_zone_id, zone_number, fragmento de referencia),
+            ordenadas por zone_number.
+        resids (np.ndarray): Número de residuo de cada CA de la estructura.
+        structure_sequence (str): Secuencia de los CA de la estructura.
+
+    Returns:
+        dict: Hélice ("S<zone_number>") -> (inicio, fin); se omiten las zonas que no
+        se pudieron ubicar en la estructura.
+    """
+    length = min(len(ref_aligned or ""), len(target_aligned or ""))
+    if not length:
+        return {}
+    ref_cols = np.frombuffer(ref_aligned[:length].encode("ascii", "replace"), dtype=np.uint8) != ord("-")
+    tgt_cols = np.frombuffer(target_aligned[:length].encode("ascii", "replace"), dtype=np.uint8) != ord("-")
+    ref_pos = np.cumsum(ref_cols) - 1
+    target_residues = map_sequence_to_residues(target_aligned.replace("-", ""), structure_sequence)
+    target_residues = np.r_[target_residues, -1][np.where(tgt_cols, np.cumsum(tgt_cols) - 1, -1)]
+
+    reference = ref_aligned.replace("-", "")
+    boundaries = {}
+    search_from = 0
+    for _, zone_number, fragment in zones:
+        start = reference.find(fragment, search_from) if fragment else -1
+        if start == -1:
+            continue
+        search_from = start + len(fragment)
+        columns = ref_cols & (ref_pos >= start) & (ref_pos < start + len(fragment))
+        residues = target_residues[columns]
+        residues = residues[residues >= 0]
+        if len(residues):
+            boundaries[f"S{zone_number}"] = (int(resids[residues].min()), int(resids[residues].max()))
+    return boundaries
+
+
+def _load_structure(conn, digest):
+    """Estructura del almacén binario o, si no está, el PDB guardado convertido a arreglos."""
+    from application.services.coordinate_store import encode_pdb, get_coordinate_store
+    from application.services.structure_store import get_pdb
+    store = get_coordinate_store()
+    structure = store.load(digest) if store is not None else None
+    if structure is None:
+        pdb_text = get_pdb(conn, digest)
+        structure = encode_pdb(pdb_text) if pdb_text else None
+    return structure
+
+
+def helix_rows(db_path, cutoff, items):
+    """
+    Filas de HelicesDetails de un bloque de estructuras (se ejecuta en los procesos del pool).
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        cutoff (float): Distancia al eje por debajo de la cual un residuo mira al interior.
+        items (list): Tuplas (fuente, id del alineamiento, pdb_hash, referencia alineada,
+            objetivo alineado, zonas, hash).
+
+    Returns:
+        tuple: (filas para INSERT_QUERY, estructuras analizadas como (fuente, id, hash, zonas)).
+    """
+    from application.services.pdb_arrays import THREE_TO_ONE
+    structures, helices, analyzed = [], [], []
+    with get_connection_manager(db_path).reader() as conn:
+        for source, key, digest, ref_aligned, target_aligned, zones, digest_key in items:
+            try:
+                structure = _load_structure(conn, digest)
+                if structure is None:
+                    print(f"Estructura {digest} no encontrada ({source} {key})")
+                    continue
+                ca = structure.ca_indices()
+                resnames = np.char.strip(structure.atoms["resname"][ca]).astype("U4").tolist()
+                sequence = "".join(THREE_TO_ONE.get(resname, "X") for resname in resnames)
+                boundaries = helix_boundaries(ref_aligned, target_aligned, zones,
+                                              structure.atoms["resseq"][ca], sequence)
+            except Exception as e:
+                print(f"Error al preparar las hélices de {source} {key}: {e}")
+                continue
+            structures.append(structure)
+            helices.append(boundaries)
+            analyzed.append((source, key, digest_key, zones))
+
+    rows = []
+    for result, (source, _, _, zones) in zip(analyze_structures(structures, helices, cutoff), analyzed):
+        by_helix = {f"S{zone_number}": (zone_id, zone_number) for zone_id, zone_number, _ in zones}
+        for helix, resid, inward in zip(result.helices.tolist(), result.resids.tolist(), result.inward.tolist()):
+            zone_id, zone_number = by_helix[helix]
+            rows.append((zone_id, zone_number, helix, resid, "I" if inward else "O", source))
+    return rows, analyzed
+
+
+def pending_structures(db_path, cutoff=DEFAULT_CUTOFF, force=False):
+    """
+    Returns:
+        tuple: (lista de estructuras por analizar con el formato de ``helix_rows``,
+        estructuras al día).
+    """
+    reference_zones = get_reference_zones(db_path).zones()
+    pending, up_to_date = [], 0
+    with get_connection_manager(db_path).reader() as conn:
+        for source, queries in SOURCES.items():
+            zones = {}
+            for key, zone_id, reference_zone_id in conn.execute(queries["zones"]):
+                zone = reference_zones.get(reference_zone_id)
+                if zone:
+                    zones.setdefault(key, []).append((zone_id, zone[0], zone[1]))
+            for key, digest, ref_aligned, target_aligned, stored_hash in conn.execute(queries["structures"]):
+                structure_zones = sorted(zones.get(key, []), key=lambda zone: zone[1])
+                digest_key = helices_hash(digest, ref_aligned, target_aligned, structure_zones, cutoff)
+                if digest_key == stored_hash and not force:
+                    up_to_date += 1
+                else:
+                    pending.append((source, key, digest, ref_aligned, target_aligned, structure_zones, digest_key))
+    return pending, up_to_date
+
+
+def ensure_schema(db_path):
+    """Agrega a una base existente las columnas helices_hash y HelicesDetails.source."""
+    from database.create_db import add_missing_columns
+    conn = sqlite3.connect(db_path)
+    try:
+        add_missing_columns(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def update_helices_details(db_path, cutoff=DEFAULT_CUTOFF, workers=None, chunk_size=100, force=False):
+    """
+    Analiza las estructuras alineadas nuevas o modificadas y reemplaza sus filas de
+    HelicesDetails. Todas las escrituras se hacen en una única transacción.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        cutoff (float): Distancia al eje (Å) por debajo de la cual un residuo mira al interior.
+        workers (int): Procesos (por defecto, uno por núcleo; 1 analiza en este proceso).
+        chunk_size (int): Estructuras por bloque (se analizan en una sola llamada).
+        force (bool): Analizar también las estructuras al día.
+
+    Returns:
+        dict: Estructuras analizadas, al día y con error, y filas escritas.
+    """
+    ensure_schema(db_path)
+    pending, up_to_date = pending_structures(db_path, cutoff, force)
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, max(len(chunks), 1))
+    build = partial(helix_rows, db_path, cutoff)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # Todo el análisis termina antes de tomar el bloqueo de escritura
+        results = list(pool.map(build, chunks) if pool else map(build, chunks))
+    finally:
+        if pool:
+            pool.shutdown()
+
+    analyzed = rows_written = 0
+    with get_connection_manager(db_path).writer() as conn:
+        for rows, structures in results:
+            conn.executemany(DELETE_QUERY, [(source, zone_id) for source, _, _, zones in structures
+                                            for zone_id, _, _ in zones])
+            conn.executemany(INSERT_QUERY, rows)
+            for source, queries in SOURCES.items():
+                conn.executemany(queries["mark"], [(digest_key, key) for structure_source, key, digest_key, _
+                                                   in structures if structure_source == source])
+            analyzed += len(structures)
+            rows_written += len(rows)
+
+    stats = {"analizadas": analyzed, "al_dia": up_to_date, "errores": len(pending) - analyzed,
+             "filas": rows_written}
+    print(f"HelicesDetails: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", nargs="?", default=os.path.join("database", "proteins_discovery.db"))
+    parser.add_argument("--cutoff", type=float, default=DEFAULT_CUTOFF,
+                        help="Distancia al eje (Å) para clasificar un residuo hacia el interior")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-size", type=int, default=100)
+    parser.add_argument("--force", action="store_true", help="Analizar también las estructuras al día")
+    args = parser.parse_args()
+    update_helices_details(args.db_path, args.cutoff, args.workers, args.chunk_size, args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Orientación de las hélices de un VSD respecto del eje Z, calculada con NumPy.
+
+Para cada residuo de las hélices se mide la distancia de su centro de masa a la recta
+paralela al eje Z que pasa por el centro de masa de la proteína; los residuos a menos de
+``cutoff`` Å se consideran orientados hacia el interior del dominio. Los centros de masa
+de todos los residuos (de una o varias estructuras) se obtienen con una única reducción
+agrupada (``np.bincount``) y las distancias con una sola expresión vectorial.
+"""
+import numpy as np
+
+from application.services.pdb_arrays import THREE_TO_ONE, parse_pdb
+
+# Masas atómicas (uma) de los elementos habituales en proteínas y sus ligandos
+ATOMIC_MASSES = {
+    "H": 1.008, "C": 12.011, "N": 14.007, "O": 15.999, "S": 32.06, "P": 30.974,
+    "SE": 78.971, "FE": 55.845, "ZN": 65.38, "MG": 24.305, "MN": 54.938, "CU": 63.546,
+    "NA": 22.990, "K": 39.098, "CL": 35.45, "CA": 40.078,
+}
+
+# Residuos de la selección "protein" (aminoácidos estándar y nombres de CHARMM/AMBER)
+PROTEIN_RESNAMES = frozenset(THREE_TO_ONE) | {
+    "HSE", "CYX", "CYM", "ASH", "GLH", "LYN", "ARN", "ACE", "NME", "NMA",
+}
+
+
+class HelixOrientation:
+    """
+    Resultado del análisis de una estructura (un elemento por residuo de las hélices).
+
+    Attributes:
+        center_of_mass (np.ndarray): Centro de masa de la proteína.
+        z_direction (np.ndarray): Dirección unitaria del eje.
+        helices (np.ndarray): Nombre de la hélice de cada residuo.
+        resids, resnames, chains (np.ndarray): Identificación de cada residuo.
+        centers (np.ndarray): Centros de masa de los residuos (n, 3).
+        distances (np.ndarray): Distancia de cada centro al eje.
+        inward (np.ndarray): True si el residuo está a menos de ``cutoff`` del eje.
+    """
+
+    __slots__ = ("center_of_mass", "z_direction", "helices", "resids", "resnames", "chains",
+                 "centers", "distances", "inward")
+
+    def inward_residues(self):
+        """
+        Returns:
+            list: Tuplas (hélice, resname, resid) de los residuos orientados hacia el interior.
+        """
+        return list(zip(self.helices[self.inward].tolist(), self.resnames[self.inward].tolist(),
+                        self.resids[self.inward].tolist()))
+
+
+def _text_codes(values):
+    """
+    Etiquetas distintas (sin espacios) de una columna de texto y el índice de la etiqueta
+    de cada valor. Las columnas de bytes de ancho fijo (``StructureArrays``) se comparan
+    como enteros, sin ordenar cadenas.
+
+    Returns:
+        tuple: (lista de etiquetas, índices np.ndarray).
+    """
+    if values.dtype.kind == "S" and values.dtype.itemsize in (1, 2, 4, 8):
+        keys = np.ascontiguousarray(values).view(f"<u{values.dtype.itemsize}")
+        unique, inverse = np.unique(keys, return_inverse=True)
+        labels = [label.decode("ascii", "replace").strip() for label in unique.view(values.dtype).tolist()]
+    else:
+        unique, inverse = np.unique(values, return_inverse=True)
+        labels = [(label.decode("ascii", "replace") if isinstance(label, bytes) else str(label)).strip()
+                  for label in unique.tolist()]
+    return labels, inverse.ravel()
+
+
+def _map_labels(values, func, dtype=np.float64):
+    """Aplica ``func`` a cada etiqueta distinta de ``values`` (pocas: nombres, elementos) y lo expande."""
+    labels, codes = _text_codes(values)
+    return np.array([func(label) for label in labels], dtype=dtype)[codes]
+
+
+def guess_masses(elements, names):
+    """
+    Masa de cada átomo según su elemento o, si la columna está vacía, según el nombre
+    del átomo (primera letra tras quitar los dígitos, p. ej. OH2 -> O, 1HB -> H).
+
+    Args:
+        elements (np.ndarray): Columna de elementos (puede estar vacía; str o bytes).
+        names (np.ndarray): Nombres de átomo.
+
+    Returns:
+        np.ndarray: Masas (0.0 para elementos desconocidos).
+    """
+    if not len(names):
+        return np.zeros(0, dtype=np.float64)
+    by_name = _map_labels(names, lambda name: ATOMIC_MASSES.get(name.lstrip("0123456789")[:1].upper(), 0.0))
+    # Masa del elemento, o NaN si la columna está vacía
+    by_element = _map_labels(elements, lambda element: ATOMIC_MASSES.get(element.upper(), 0.0) if element
+                             else np.nan)
+    return np.where(np.isnan(by_element), by_name, by_element)
+
+
+def protein_mask(resnames):
+    """True para los átomos (o residuos) de la selección "protein"."""
+    if not len(resnames):
+        return np.zeros(0, dtype=bool)
+    return _map_labels(resnames, lambda resname: resname in PROTEIN_RESNAMES, dtype=bool)
+
+
+def _group_sums(coords, weights, groups, n_groups):
+    # Índice plano grupo*3 + eje: las tres coordenadas se suman con un único bincount
+    flat = (groups[:, None] * 3 + np.arange(3)).ravel()
+    sums = np.bincount(flat, weights=(coords * weights[:, None]).ravel(), minlength=n_groups * 3)
+    return sums.reshape(n_groups, 3), np.bincount(groups, weights=weights, minlength=n_groups)
+
+
+def group_centers(coords, weights, groups, n_groups):
+    """
+    Centros ponderados de los grupos de átomos en una sola reducción agrupada.
+
+    Args:
+        coords (np.ndarray): Coordenadas (n_atoms, 3).
+        weights (np.ndarray): Peso (masa) de cada átomo.
+        groups (np.ndarray): Grupo (0..n_groups-1) de cada átomo.
+        n_groups (int): Número de grupos.
+
+    Returns:
+        np.ndarray: Centros (n_groups, 3); NaN para los grupos sin masa.
+    """
+    sums, totals = _group_sums(coords, weights, groups, n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / totals[:, None]
+
+
+def normal_distances(points, origins, directions):
+    """
+    Distancia de cada punto a la recta ``origins + t * directions`` (una fila por punto).
+
+    Args:
+        points (np.ndarray): Puntos (n, 3).
+        origins (np.ndarray): Punto de la recta de cada fila (n, 3).
+        directions (np.ndarray): Dirección unitaria de cada fila (n, 3).
+
+    Returns:
+        np.ndarray: Distancias (n,).
+    """
+    vectors = origins - points
+    projections = np.einsum("ij,ij->i", vectors, directions)
+    return np.linalg.norm(vectors - projections[:, None] * directions, axis=1)
+
+
+def z_direction(center_of_mass, height=1e3):
+    """Dirección del centro de masa a ``(x, y, height)``, como el eje que se dibuja en VMD."""
+    z_axis = np.array([center_of_mass[0], center_of_mass[1], height])
+    direction = z_axis - center_of_mass
+    return direction / np.linalg.norm(direction)
+
+
+def helix_selection(resseqs, helices_residues):
+    """
+    Hélice de cada átomo según los rangos ``resid inicio:fin`` (inclusivos).
+
+    Args:
+        resseqs (np.ndarray): Número de residuo de cada átomo.
+        helices_residues (dict): Hélice -> (inicio, fin).
+
+    Returns:
+        np.ndarray: Índice de la hélice en ``helices_residues`` (-1 fuera de las hélices;
+        si los rangos se solapan, la primera).
+    """
+    bounds = np.array(list(helices_residues.values()), dtype=np.int64).reshape(-1, 2)
+    if not len(bounds):
+        return np.full(len(resseqs), -1)
+    inside = (resseqs[:, None] >= bounds[:, 0]) & (resseqs[:, None] <= bounds[:, 1])
+    return np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+
+
+def _text(values, dtype):
+    """Columna de texto como str sin espacios (las de ``StructureArrays`` son bytes)."""
+    return np.char.strip(np.char.decode(values, "ascii")).astype(dtype) if values.dtype.kind == "S" else values
+
+
+def _structure_columns(structure):
+    """(coords, masas, es proteína, resnames, chains, resseqs, residue_index) de una estructura."""
+    if isinstance(structure, str):
+        structure = parse_pdb(structure)
+    if hasattr(structure, "atoms"):  # coordinate_store.StructureArrays: columnas de bytes
+        atoms = structure.atoms
+        elements, names, resnames, chains = atoms["element"], atoms["name"], atoms["resname"], atoms["chain"]
+        resseqs = atoms["resseq"]
+    else:
+        elements, names, resnames, chains = structure.elements, structure.names, structure.resnames, structure.chains
+        resseqs = structure.resseqs
+    is_protein = protein_mask(resnames)
+    masses = np.where(is_protein, guess_masses(elements, names), 0.0)
+    return (np.asarray(structure.coords, dtype=np.float64), masses, is_protein, resnames, chains,
+            np.asarray(resseqs), np.asarray(structure.residue_index))
+
+
+def analyze_structures(structures, helices_residues, cutoff=5.0):
+    """
+    Analiza la orientación de las hélices de varias estructuras a la vez: se concatenan
+    sus átomos y se calculan todos los centros de masa y distancias de una vez.
+
+    Args:
+        structures (list): Estructuras como texto PDB, ``PDBAtoms`` o ``StructureArrays``.
+        helices_residues (dict | list): Hélice -> (residuo inicial, residuo final), común
+            a todas las estructuras o un diccionario por estructura.
+        cutoff (float): Distancia al eje por debajo de la cual un residuo mira al interior.
+
+    Returns:
+        list: Un ``HelixOrientation`` por estructura.
+    """
+    columns = [_structure_columns(structure) for structure in structures]
+    if isinstance(helices_residues, dict):
+        helices_residues = [helices_residues] * len(columns)
+    if not columns:
+        return []
+
+    # Residuos de todas las estructuras numerados de forma consecutiva
+    first_atoms, residue_groups, owners = [], [], []
+    n_residues = 0
+    for i, (*_, residue_index) in enumerate(columns):
+        starts = (np.flatnonzero(np.r_[True, residue_index[1:] != residue_index[:-1]])
+                  if len(residue_index) else np.zeros(0, dtype=np.int64))
+        first_atoms.append(starts)
+        residue_groups.append(n_residues + residue_index)
+        owners.append(np.full(len(starts), i))
+        n_residues += len(starts)
+    owners = np.concatenate(owners)
+
+    coords = np.concatenate([column[0] for column in columns])
+    masses = np.concatenate([column[1] for column in columns])
+    is_protein = np.concatenate([column[2] for column in columns])
+
+    # Sumas ponderadas por residuo (una reducción); la proteína completa es la suma de sus residuos
+    sums, totals = _group_sums(coords, masses, np.concatenate(residue_groups).astype(np.int64), n_residues)
+    protein_sums = np.stack([np.bincount(owners, weights=sums[:, axis], minlength=len(columns))
+                             for axis in range(3)], axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        residue_centers = sums / totals[:, None]
+        protein_centers = protein_sums / np.bincount(owners, weights=totals, minlength=len(columns))[:, None]
+    directions = np.array([z_direction(center) for center in protein_centers])
+    distances = normal_distances(residue_centers, protein_centers[owners], directions[owners])
+
+    results = []
+    offset = atom_offset = 0
+    for i, (xyz, _, _, structure_resnames, chains, resseqs, _) in enumerate(columns):
+        starts = first_atoms[i]
+        window = slice(offset, offset + len(starts))
+        offset += len(starts)
+
+        helix_names = np.array(list(helices_residues[i]), dtype=object)
+        helix = helix_selection(resseqs[starts], helices_residues[i])
+        selected = np.flatnonzero(is_protein[atom_offset + starts] & (helix >= 0))
+        atom_offset += len(xyz)
+        # Mismo orden que el recorrido hélice por hélice
+        selected = selected[np.argsort(helix[selected], kind="stable")]
+
+        result = HelixOrientation()
+        result.center_of_mass = protein_centers[i]
+        result.z_direction = directions[i]
+        result.helices = helix_names[helix[selected]]
+        result.resids = resseqs[starts][selected]
+        result.resnames = _text(structure_resnames[starts][selected], "U4")
+        result.chains = _text(chains[starts][selected], "U1")
+        result.centers = residue_centers[window][selected]
+        result.distances = distances[window][selected]
+        result.inward = result.distances < cutoff
+        results.append(result)
+    return results
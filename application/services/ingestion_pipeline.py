@@ -0,0 +1,346 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from functools import partial
+
+from application.services.backends import backend_available, preload
+from application.services.coordinate_store import write_structures
+from application.services.db_connection import get_connection_manager
+from application.services.result_cache import invalidate_foldseek_entries, invalidate_uniprot_accessions
+from application.services.structure_processor import StructureProcessor, create_http_session
+from application.services.structure_store import put_pdb, release_pdbs, row_hashes
+from application.services.summary_tables import refresh_foldseek_summary, refresh_uniprot_summary
+from database.create_db import CHECKPOINT_TABLE
+
+# Backends que usan con seguridad los procesos de corte: VMD (cadena principal de
+# UniProt) y Bio.PDB (recorte por posición de FoldSeek)
+WORKER_BACKENDS = ("vmd", "biopython")
+
+
+def _align_uniprot(db_path, accession_number, pdb_content, seq):
+    """Corta y alinea una estructura UniProt dentro de un proceso trabajador."""
+    processor = StructureProcessor(db_path)
+    return processor.cut_and_align_pdb(db_path, pdb_content, seq, accession_number)
+
+
+def _align_foldseek(ref_pdb, pdb_content, start_pos, end_pos, ref_aligned, target_aligned):
+    """Recorta por posición y alinea una estructura FoldSeek dentro de un proceso trabajador."""
+    processor = StructureProcessor(None)
+    cut_pdb = processor.cut_pdb_by_position(pdb_content, start_pos, end_pos)
+    return processor.align_pdb(ref_pdb, cut_pdb, ref_aligned, target_aligned)
+
+
+class BatchWriter(threading.Thread):
+    """
+    Único escritor de la base de datos: agrupa resultados en transacciones por lotes
+    y registra el checkpoint de cada entrada en la misma transacción que su resultado.
+
+    Si un lote no se puede escribir (p. ej. "database is locked"), sus entradas se
+    marcan como fallidas, el hilo sigue vaciando la cola y ``close`` relanza el primer
+    error.
+    """
+
+    def __init__(self, db_path, batch_size=25, flush_interval=2.0):
+        super().__init__(name="ingestion-writer", daemon=True)
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._closed = object()
+        self.written = 0
+        self.error = None
+
+    def put_uniprot(self, accession_number, result, success_info):
+        self._queue.put(("uniprot", accession_number, result, success_info))
+
+    def put_foldseek(self, foldseek_id, result):
+        self._queue.put(("foldseek", foldseek_id, result, None))
+
+    def put_failure(self, source, entry_key, info):
+        self._queue.put(("failed", (source, str(entry_key)), None, info))
+
+    def close(self):
+        self._queue.put(self._closed)
+        self.join()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            if item is self._closed:
+                self._safe_flush(batch)
+                break
+            if item is not None:
+                batch.append(item)
+            if batch and (item is None or len(batch) >= self.batch_size):
+                self._safe_flush(batch)
+                batch = []
+
+    def _safe_flush(self, batch):
+        try:
+            self._flush(batch)
+        except Exception as e:
+            print(f"Error escribiendo un lote de {len(batch)} entradas: {e}")
+            if self.error is None:
+                self.error = e
+            self._mark_failed(batch, f"error de escritura: {e}")
+
+    def _mark_failed(self, batch, info):
+        """Registra como fallidas las entradas de un lote que no se pudo escribir."""
+        checkpoints = [(kind, str(key), "failed", info) if kind != "failed" else (key[0], key[1], "failed", failure)
+                       for kind, key, _, failure in batch]
+        try:
+            with get_connection_manager(self.db_path).writer() as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO IngestionCheckpoints (source, entry_key, status, info, updated_at)
+                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', checkpoints)
+        except Exception as e:
+            # Sin checkpoint, las entradas vuelven a procesarse en la próxima ejecución
+            print(f"No se pudieron registrar las entradas fallidas: {e}")
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        uniprot_rows, foldseek_rows, checkpoints = [], [], []
+        for kind, key, result, info in batch:
+            if kind == "uniprot":
+                uniprot_rows.append((result["pdb"], info, result["rmsd"], result["aligned_atoms"], key))
+                checkpoints.append(("uniprot", key, "done", info))
+            elif kind == "foldseek":
+                foldseek_rows.append((result["pdb"], result["rmsd"], result["aligned_atoms"], key))
+                checkpoints.append(("foldseek", str(key), "done", None))
+            else:
+                checkpoints.append((key[0], key[1], "failed", info))
+
+        with get_connection_manager(self.db_path).writer() as conn:
+            # Los PDB se guardan comprimidos en StructureBlobs; las filas sólo llevan su hash
+            previous = (row_hashes(conn, "Alignments", "source_id", [row[-1] for row in uniprot_rows])
+                        | row_hashes(conn, "FoldSeekAlignmentDetails", "foldseek_id",
+                                     [row[-1] for row in foldseek_rows]))
+            structures = [(put_pdb(conn, row[0]), row[0]) for row in uniprot_rows + foldseek_rows]
+            digests = [digest for digest, _ in structures]
+            conn.executemany('''
+                UPDATE Alignments
+                SET pdb = NULL, pdb_hash = ?, success_info = ?, rmsd = ?, aligned_atoms = ?
+                WHERE source_id = ?
+            ''', [(digest,) + row[1:] for digest, row in zip(digests, uniprot_rows)])
+            conn.executemany('''
+                UPDATE FoldSeekAlignmentDetails
+                SET pdb = NULL, pdb_hash = ?, rmsd = ?, aligned_atoms = ?
+                WHERE foldseek_id = ?
+            ''', [(digest,) + row[1:] for digest, row in zip(digests[len(uniprot_rows):], foldseek_rows)])
+            # Estructuras reemplazadas que ya no usa ninguna fila
+            release_pdbs(conn, previous - set(digests))
+            for row in uniprot_rows:
+                refresh_uniprot_summary(conn, row[-1], touch=True)
+            for row in foldseek_rows:
+                refresh_foldseek_summary(conn, row[-1], touch=True)
+            invalidate_uniprot_accessions(conn, [row[-1] for row in uniprot_rows])
+            invalidate_foldseek_entries(conn, [row[-1] for row in foldseek_rows])
+            conn.executemany('''
+                INSERT OR REPLACE INTO IngestionCheckpoints (source, entry_key, status, info, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', checkpoints)
+        # Formato binario (memmap) de las estructuras nuevas, fuera del bloqueo de escritura
+        write_structures(structures)
+        self.written += len(uniprot_rows) + len(foldseek_rows)
+
+
+class IngestionPipeline:
+    """
+    Ingesta concurrente y reanudable de estructuras UniProt y FoldSeek.
+
+    Las descargas se ejecutan en un pool de hilos sobre una sesión HTTP compartida,
+    el corte/alineamiento (CPU) en un pool de procesos y todas las escrituras pasan
+    por un único BatchWriter. Cada entrada terminada queda registrada en
+    IngestionCheckpoints, de modo que una ejecución interrumpida continúa donde quedó.
+    """
+
+    def __init__(self, db_path, fetch_workers=8, cpu_workers=None, batch_size=25,
+                 resume=True, retry_failed=True, session=None, cache=None):
+        """
+        Args:
+            db_path (str): Ruta de la base de datos.
+            fetch_workers (int): Descargas simultáneas.
+            cpu_workers (int): Procesos para corte/alineamiento (por defecto, núcleos disponibles).
+            batch_size (int): Resultados por transacción de escritura.
+            resume (bool): Si es False, se descartan los checkpoints previos.
+            retry_failed (bool): Si es True, se reintentan las entradas marcadas como fallidas.
+            session (requests.Session): Sesión HTTP a reutilizar (opcional).
+            cache (StructureCache): Caché de modelos (por defecto, la definida en Config).
+        """
+        self.db_path = db_path
+        self.fetch_workers = fetch_workers
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.resume = resume
+        self.retry_failed = retry_failed
+        self.session = session or create_http_session(pool_size=fetch_workers)
+        self.processor = StructureProcessor(db_path, session=self.session, cache=cache)
+
+    def ensure_checkpoint_table(self):
+        with get_connection_manager(self.db_path).writer() as conn:
+            conn.execute(CHECKPOINT_TABLE)
+            if not self.resume:
+                conn.execute("DELETE FROM IngestionCheckpoints")
+
+    def load_completed(self):
+        """
+        Returns:
+            set: Pares (source, entry_key) que no deben volver a procesarse.
+        """
+        statuses = ("done",) if self.retry_failed else ("done", "failed")
+        placeholders = ", ".join("?" for _ in statuses)
+        with get_connection_manager(self.db_path).reader() as conn:
+            rows = conn.execute(
+                f"SELECT source, entry_key FROM IngestionCheckpoints WHERE status IN ({placeholders})",
+                statuses,
+            ).fetchall()
+        return set(rows)
+
+    def run(self):
+        """
+        Ejecuta la ingesta completa.
+
+        Returns:
+            dict: Conteo de entradas procesadas, fallidas y omitidas por checkpoint.
+        """
+        self.processor.ensure_schema()
+        self.ensure_checkpoint_table()
+        completed = self.load_completed()
+
+        accessions = [acc for acc in self.processor.get_valid_accessions(self.db_path)
+                      if ("uniprot", acc) not in completed]
+        entries = [entry for entry in self.processor.get_valid_foldseek_entries(self.db_path)
+                   if ("foldseek", str(entry[0])) not in completed]
+        stats = {"done": 0, "failed": 0, "skipped": len(completed)}
+        print(f"Ingesta: {len(accessions)} UniProt y {len(entries)} FoldSeek pendientes "
+              f"({len(completed)} omitidas por checkpoint)")
+
+        writer = BatchWriter(self.db_path, batch_size=self.batch_size)
+        writer.start()
+        try:
+            # Cada proceso importa sus backends al arrancar y no en la primera entrada que procesa
+            backends = [name for name in WORKER_BACKENDS if backend_available(name)]
+            with ProcessPoolExecutor(max_workers=self.cpu_workers, initializer=preload,
+                                     initargs=(backends,)) as cpu_pool, \
+                    ThreadPoolExecutor(max_workers=self.fetch_workers) as fetch_pool:
+                pools = (fetch_pool, cpu_pool)
+                # Un Future por entrada: se resuelve cuando su resultado o su fallo llega al escritor
+                outcomes = []
+                for acc in accessions:
+                    outcomes.append(Future())
+                    fetch_pool.submit(self._ingest_uniprot, acc, pools, writer, outcomes[-1])
+                for entry in entries:
+                    outcomes.append(Future())
+                    fetch_pool.submit(self._ingest_foldseek, entry, pools, writer, outcomes[-1])
+                for outcome in as_completed(outcomes):
+                    stats["done" if outcome.result() else "failed"] += 1
+        finally:
+            writer.close()
+
+        print(f"Ingesta completada: {stats['done']} correctas, {stats['failed']} fallidas")
+        return stats
+
+    @staticmethod
+    def _fail(writer, outcome, source, entry_key, info):
+        writer.put_failure(source, entry_key, info)
+        outcome.set_result(False)
+
+    def _ingest_uniprot(self, accession_number, pools, writer, outcome):
+        try:
+            seq = self.processor.get_sequence_from_db(self.db_path, accession_number)
+            if not seq:
+                self._fail(writer, outcome, "uniprot", accession_number, "sin secuencia")
+                return
+            structures = iter(self.processor.get_protein_structures(self.db_path, accession_number))
+        except Exception as e:
+            print(f"Error ingesting UniProt {accession_number}: {e}")
+            self._fail(writer, outcome, "uniprot", accession_number, str(e))
+            return
+        self._next_uniprot(accession_number, seq, structures, pools, writer, outcome)
+
+    def _next_uniprot(self, accession_number, seq, structures, pools, writer, outcome):
+        """
+        Descarga la siguiente estructura candidata y encadena su alineamiento al escritor.
+
+        El hilo de descarga no espera al pool de procesos: el callback del Future de CPU
+        entrega el resultado al BatchWriter o, si la estructura no alinea, vuelve a
+        encolar en el pool de hilos la descarga de la siguiente candidata.
+        """
+        try:
+            for structure_id, pdb_id, resolution, download_link, source in structures:
+                pdb_content = self.processor.fetch_pdb(download_link)
+                if pdb_content is None:
+                    continue
+                future = pools[1].submit(_align_uniprot, self.db_path, accession_number, pdb_content, seq)
+                future.add_done_callback(partial(
+                    self._uniprot_aligned, accession_number, seq, structures, pools, writer, outcome,
+                    f"{source}, {pdb_id}, {resolution or download_link}",
+                ))
+                return
+        except Exception as e:
+            print(f"Error ingesting UniProt {accession_number}: {e}")
+            self._fail(writer, outcome, "uniprot", accession_number, str(e))
+            return
+
+        self._fail(writer, outcome, "uniprot", accession_number, "ninguna estructura alineada")
+
+    def _uniprot_aligned(self, accession_number, seq, structures, pools, writer, outcome, success_info, future):
+        try:
+            result = future.result()
+            if not result:
+                # La descarga siguiente vuelve al pool de hilos, fuera del hilo de callbacks
+                pools[0].submit(self._next_uniprot, accession_number, seq, structures, pools, writer, outcome)
+                return
+        except Exception as e:
+            print(f"Error ingesting UniProt {accession_number}: {e}")
+            self._fail(writer, outcome, "uniprot", accession_number, str(e))
+            return
+        writer.put_uniprot(accession_number, result, success_info)
+        outcome.set_result(True)
+
+    def _ingest_foldseek(self, entry, pools, writer, outcome):
+        foldseek_id, download_link, start_pos, end_pos = entry
+        try:
+            pdb_content = self.processor.fetch_pdb(download_link)
+            if pdb_content is None:
+                self._fail(writer, outcome, "foldseek", foldseek_id, "descarga fallida")
+                return
+
+            ref_pdb = self.processor.get_reference_pdb_foldseek(self.db_path, foldseek_id)
+            if not ref_pdb:
+                self._fail(writer, outcome, "foldseek", foldseek_id, "sin PDB de referencia")
+                return
+
+            ref_aligned, target_aligned = self.processor.get_alignment_sequences_foldseek(
+                self.db_path, foldseek_id)
+            future = pools[1].submit(
+                _align_foldseek, ref_pdb, pdb_content, start_pos, end_pos, ref_aligned, target_aligned
+            )
+        except Exception as e:
+            print(f"Error ingesting FoldSeek {foldseek_id}: {e}")
+            self._fail(writer, outcome, "foldseek", foldseek_id, str(e))
+            return
+        future.add_done_callback(partial(self._foldseek_aligned, foldseek_id, writer, outcome))
+
+    def _foldseek_aligned(self, foldseek_id, writer, outcome, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Error ingesting FoldSeek {foldseek_id}: {e}")
+            self._fail(writer, outcome, "foldseek", foldseek_id, str(e))
+            return
+        if not result:
+            self._fail(writer, outcome, "foldseek", foldseek_id, "alineamiento fallido")
+            return
+        writer.put_foldseek(foldseek_id, result)
+        outcome.set_result(True)
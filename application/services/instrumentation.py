@@ -0,0 +1,151 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus_client es opcional: sin él sólo se emite Server-Timing
+    prometheus_client = multiprocess = None
+
+# Etapas medidas en el camino de una vista: db, pdb_parse, residue_map, py3dmol, template
+if prometheus_client is not None:
+    REQUEST_SECONDS = prometheus_client.Histogram(
+        "http_request_duration_seconds", "Duración de las peticiones HTTP",
+        ["method", "endpoint", "status"])
+    STAGE_SECONDS = prometheus_client.Histogram(
+        "request_stage_duration_seconds", "Duración de cada etapa de una petición",
+        ["stage"], buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+else:
+    REQUEST_SECONDS = STAGE_SECONDS = None
+
+# cProfile no admite dos perfiles activos a la vez: se perfila una petición por vez
+_profile_lock = threading.Lock()
+
+
+@contextmanager
+def stage(name):
+    """
+    Mide una etapa. El tiempo se acumula en la petición en curso (para Server-Timing)
+    y en el histograma de la etapa.
+
+    Args:
+        name (str): Nombre de la etapa (un token, p. ej. "db" o "pdb_parse").
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if STAGE_SECONDS is not None:
+            STAGE_SECONDS.labels(stage=name).observe(elapsed)
+        if has_request_context():
+            timings = g.setdefault("stage_timings", {})
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def timed(name):
+    """Decorador equivalente a envolver la función en ``stage(name)``."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing_header(timings, total):
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def metrics_response():
+    """Métricas en el formato de texto de Prometheus."""
+    if prometheus_client is None:
+        return Response("prometheus_client no está instalado\n", status=503, mimetype="text/plain")
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Varios procesos de trabajo (gunicorn): se agregan las métricas de todos
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def _dump_profile(profiler, elapsed, profile_dir):
+    endpoint = (request.endpoint or "unknown").replace(".", "_")
+    path = os.path.join(profile_dir, f"{endpoint}_{time.strftime('%Y%m%d_%H%M%S')}_{elapsed * 1000:.0f}ms.prof")
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(path)
+        print(f"Petición lenta ({elapsed * 1000:.0f} ms) {request.method} {request.path}: perfil en {path}")
+    except OSError as e:
+        print(f"No se pudo guardar el perfil de {request.path}: {e}")
+
+
+def init_app(app):
+    """
+    Instala la instrumentación en la aplicación: duración por petición y por etapa,
+    cabecera ``Server-Timing``, ruta ``/metrics`` y, si ``PROFILE_SAMPLE_RATE`` > 0,
+    un perfil cProfile de una muestra de peticiones que se guarda cuando la petición
+    supera ``PROFILE_SLOW_MS``.
+    """
+    from config import Config
+
+    sample_rate = Config.PROFILE_SAMPLE_RATE
+    slow_seconds = Config.PROFILE_SLOW_MS / 1000
+    profile_dir = Config.PROFILE_DIR
+    send_server_timing = Config.SERVER_TIMING
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.stage_timings = {}
+        if sample_rate > 0 and random.random() < sample_rate and _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Otro perfilador (p. ej. un depurador) ya está activo
+                _profile_lock.release()
+            else:
+                g.profiler = profiler
+
+    @app.after_request
+    def record_timings(response):
+        start = g.pop("request_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+            if elapsed >= slow_seconds:
+                _dump_profile(profiler, elapsed, profile_dir)
+
+        if REQUEST_SECONDS is not None:
+            REQUEST_SECONDS.labels(method=request.method, endpoint=request.endpoint or "unknown",
+                                   status=response.status_code).observe(elapsed)
+        if send_server_timing:
+            response.headers["Server-Timing"] = server_timing_header(g.get("stage_timings", {}), elapsed)
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # Si la petición falló antes de after_request, el perfilador sigue activo
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            _profile_lock.release()
+
+    app.add_url_rule("/metrics", "metrics", metrics_response)
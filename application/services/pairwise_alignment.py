@@ -0,0 +1,317 @@
+"""
+Alineamiento por pares de una secuencia de referencia contra muchas secuencias candidatas
+con BLOSUM62 y gaps afines (Gotoh), vectorizado con NumPy.
+
+La matriz de programación dinámica se recorre por antidiagonales: las celdas de una
+antidiagonal sólo dependen de las dos anteriores, así que cada paso calcula a la vez
+todas las celdas de la antidiagonal para todas las candidatas del bloque (arreglos
+(candidatas, longitud de la referencia + 1)). El camino de vuelta también se recorre
+para todo el bloque a la vez. Modos:
+
+- ``global``: Needleman-Wunsch, ambas secuencias completas.
+- ``local``: Smith-Waterman.
+- ``semiglobal``: la referencia completa y los extremos de la candidata sin penalizar
+  (ubica el dominio de referencia dentro de una proteína más larga).
+
+Un gap de longitud k cuesta ``gap_open + (k - 1) * gap_extend`` (como EMBOSS y
+Bio.Align.PairwiseAligner con open_gap_score=-gap_open y extend_gap_score=-gap_extend).
+"""
+import numpy as np
+
+from application.services.sequence_encoding import AMINO_ACIDS, CODE_TABLE, UNKNOWN, encode, encode_many
+
+MODES = ("global", "local", "semiglobal")
+
+_BLOSUM62_ORDER = "ARNDCQEGHILKMFPSTWYV"
+_BLOSUM62_ROWS = """
+ 4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0
+-1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3
+-2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3
+-2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3
+ 0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1
+-1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2
+-1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2
+ 0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3
+-2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3
+-1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3
+-1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1
+-1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2
+-1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1
+-2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1
+-1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2
+ 1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2
+ 0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0
+-3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3
+-2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1
+ 0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4
+"""
+
+
+def _blosum62():
+    """BLOSUM62 indexado por código (orden de AMINO_ACIDS); UNKNOWN puntúa -1 contra todo."""
+    values = np.array(_BLOSUM62_ROWS.split(), dtype=np.float32).reshape(20, 20)
+    order = [_BLOSUM62_ORDER.index(letter) for letter in AMINO_ACIDS]
+    table = np.full((UNKNOWN + 1, UNKNOWN + 1), -1.0, dtype=np.float32)
+    table[:UNKNOWN, :UNKNOWN] = values[np.ix_(order, order)]
+    return table
+
+
+BLOSUM62 = _blosum62()
+
+# Puntaje de las celdas inalcanzables (cabe en float32 sin desbordar al restar penalizaciones)
+_NEG = np.float32(-1e9)
+
+# Bits del camino de vuelta: origen de H (0 diagonal, 1 gap en la referencia, 2 gap en la
+# candidata, 3 fin del alineamiento local) y si E/F extienden un gap ya abierto
+_FROM_E, _FROM_F, _STOP = 1, 2, 3
+_E_EXTEND, _F_EXTEND = 4, 8
+
+_GAP = ord("-")
+
+
+class PairwiseAlignment:
+    """
+    Alineamiento de la referencia con una candidata.
+
+    Attributes:
+        score (float): Puntaje del alineamiento.
+        reference_aligned, target_aligned (str): Secuencias alineadas (con gaps).
+        match (str): "*" idéntico, ":" sustitución con puntaje positivo, " " en otro caso.
+        reference_start, target_start (int): Primer residuo alineado de cada secuencia (base 0).
+        identity, similarity (float): Fracción de columnas idénticas y con puntaje positivo
+            (idénticas incluidas) sobre la longitud del alineamiento.
+    """
+
+    __slots__ = ("score", "reference_aligned", "target_aligned", "match", "reference_start",
+                 "target_start", "identity", "similarity")
+
+    def __repr__(self):
+        return (f"PairwiseAlignment(score={self.score}, length={len(self.match)}, "
+                f"similarity={self.similarity:.3f})")
+
+
+def _boundary(length, gap_open, gap_extend):
+    """Penalización de un gap de ``length`` residuos (0 para length 0)."""
+    return np.where(length > 0, -(gap_open + gap_extend * (length - 1)), 0.0).astype(np.float32)
+
+
+def _fill(reference_codes, target_codes, target_lengths, mode, gap_open, gap_extend, matrix):
+    """
+    Recorre las antidiagonales de la matriz de todas las candidatas del bloque.
+
+    Returns:
+        tuple: (puntajes, fila y columna donde termina cada alineamiento, bits del
+        camino de vuelta por antidiagonal (candidatas, m + n + 1, m + 1)).
+    """
+    n_targets, n = target_codes.shape
+    m = len(reference_codes)
+    gap_open, gap_extend = np.float32(gap_open), np.float32(gap_extend)
+    # Puntaje de la fila i de la referencia contra cada código (fila 0 sin uso), aplanado para np.take
+    profile = np.zeros((m + 1, matrix.shape[1]), dtype=np.float32)
+    profile[1:] = matrix[reference_codes]
+    profile_rows = np.arange(m + 1) * matrix.shape[1]
+    profile = profile.ravel()
+    # Candidatas invertidas: la columna j de la fila i de la antidiagonal d es reversed[n - d + i],
+    # así que cada antidiagonal lee un tramo contiguo
+    reversed_codes = np.ascontiguousarray(target_codes[:, ::-1])
+    row_boundary = _boundary(np.arange(n + 1), gap_open, gap_extend) if mode == "global" \
+        else np.zeros(n + 1, dtype=np.float32)
+    column_boundary = _boundary(np.arange(m + 1), gap_open, gap_extend) if mode != "local" \
+        else np.zeros(m + 1, dtype=np.float32)
+
+    traceback = np.zeros((n_targets, m + n + 1, m + 1), dtype=np.uint8)
+    h_prev2 = np.full((n_targets, m + 1), _NEG, dtype=np.float32)
+    h_prev = h_prev2.copy()
+    h_prev[:, 0] = 0.0
+    e_prev, f_prev = h_prev2.copy(), h_prev2.copy()
+
+    best = np.full(n_targets, 0.0 if mode == "local" else _NEG, dtype=np.float32)
+    best_i = np.zeros(n_targets, dtype=np.int64)
+    best_j = np.zeros(n_targets, dtype=np.int64)
+    targets = np.arange(n_targets)
+
+    for d in range(1, m + n + 1):
+        h = np.full((n_targets, m + 1), _NEG, dtype=np.float32)
+        e, f = h.copy(), h.copy()
+        # Celdas interiores de la antidiagonal: filas lo..hi (columna j = d - i entre 1 y n)
+        lo, hi = max(1, d - n), min(m, d - 1)
+        if lo <= hi:
+            rows, above = slice(lo, hi + 1), slice(lo - 1, hi)
+            codes = reversed_codes[:, n - d + lo:n - d + hi + 1]
+            match = h_prev2[:, above] + np.take(profile, profile_rows[rows] + codes)
+            e_open, e_extend = h_prev[:, rows] - gap_open, e_prev[:, rows] - gap_extend
+            f_open, f_extend = h_prev[:, above] - gap_open, f_prev[:, above] - gap_extend
+            e_cells = np.maximum(e_open, e_extend)
+            f_cells = np.maximum(f_open, f_extend)
+            h_cells = np.maximum(match, np.maximum(e_cells, f_cells))
+            if mode == "local":
+                np.maximum(h_cells, 0.0, out=h_cells)
+
+            not_diagonal = h_cells != match
+            source = not_diagonal.view(np.uint8) + (not_diagonal & (h_cells == f_cells)).view(np.uint8)
+            source |= (e_extend > e_open).view(np.uint8) << 2
+            source |= (f_extend > f_open).view(np.uint8) << 3
+            if mode == "local":
+                source[h_cells == 0.0] = _STOP
+            traceback[:, d, rows] = source
+            h[:, rows], e[:, rows], f[:, rows] = h_cells, e_cells, f_cells
+
+            if mode == "local":
+                cells = np.where(np.arange(d - lo, d - hi - 1, -1) <= target_lengths[:, None], h_cells, _NEG)
+                row = cells.argmax(axis=1)
+                value = cells[targets, row]
+                better = value > best
+                best[better], best_i[better], best_j[better] = value[better], lo + row[better], d - lo - row[better]
+
+        # Bordes: fila 0 (columna d) y columna 0 (fila d)
+        if d <= n:
+            h[:, 0] = row_boundary[d]
+        if d <= m:
+            h[:, d] = column_boundary[d]
+
+        if mode != "local" and d >= m:
+            j = d - m
+            if mode == "semiglobal":
+                better = (j <= target_lengths) & (h[:, m] > best)
+            else:
+                better = target_lengths == j
+            best[better], best_i[better], best_j[better] = h[better, m], m, j
+
+        h_prev2, h_prev = h_prev, h
+        e_prev, f_prev = e, f
+    if m + n == 0:
+        best[:] = 0.0
+    return best, best_i, best_j, traceback
+
+
+def _traceback(traceback, end_i, end_j, mode, reference_bytes, target_bytes):
+    """
+    Camino de vuelta de todas las candidatas a la vez.
+
+    Returns:
+        tuple: (columnas de la referencia y de la candidata alineadas por la derecha en
+        arreglos (candidatas, largo máximo), primera columna de cada alineamiento, fila y
+        columna de inicio).
+    """
+    n_targets = len(end_i)
+    width = traceback.shape[1] + traceback.shape[2]
+    reference_out = np.full((n_targets, width), _GAP, dtype=np.uint8)
+    target_out = reference_out.copy()
+    i, j = end_i.copy(), end_j.copy()
+    state = np.zeros(n_targets, dtype=np.uint8)  # 0 = H, 1 = E, 2 = F
+    position = np.full(n_targets, width, dtype=np.int64)
+    active = np.ones(n_targets, dtype=bool)
+
+    while active.any():
+        a = np.flatnonzero(active)
+        ia, ja, sa = i[a], j[a], state[a]
+        bits = traceback[a, ia + ja, ia]
+        source = bits & 3
+        in_h = sa == 0
+        row0, col0 = in_h & (ia == 0), in_h & (ja == 0)
+        interior = in_h & (ia > 0) & (ja > 0)
+
+        stop = (row0 & col0) | (interior & (source == _STOP))
+        if mode == "global":
+            go_left_h = row0 & (ja > 0)
+        else:
+            go_left_h = np.zeros_like(row0)
+            stop |= row0
+        if mode == "local":
+            stop |= col0
+            go_up_h = np.zeros_like(col0)
+        else:
+            go_up_h = col0 & (ia > 0)
+
+        diagonal = interior & (source == 0)
+        state[a[interior & (source == _FROM_E)]] = 1
+        state[a[interior & (source == _FROM_F)]] = 2
+        in_e, in_f = sa == 1, sa == 2
+        state[a[in_e & ((bits & _E_EXTEND) == 0)]] = 0
+        state[a[in_f & ((bits & _F_EXTEND) == 0)]] = 0
+
+        move_i = diagonal | go_up_h | in_f
+        move_j = diagonal | go_left_h | in_e
+        emit = move_i | move_j
+        target_index = a[emit]
+        position[target_index] -= 1
+        slot = position[target_index]
+        reference_out[target_index, slot] = np.where(move_i[emit], reference_bytes[np.maximum(ia[emit] - 1, 0)], _GAP)
+        target_out[target_index, slot] = np.where(move_j[emit], target_bytes[target_index, np.maximum(ja[emit] - 1, 0)],
+                                                  _GAP)
+        i[a] -= move_i
+        j[a] -= move_j
+        active[a[stop]] = False
+    return reference_out, target_out, position, i, j
+
+
+def align_batch(reference, targets, mode="semiglobal", gap_open=10.0, gap_extend=0.5, matrix=BLOSUM62):
+    """
+    Alinea la referencia con cada candidata; todas las candidatas se procesan juntas.
+
+    Conviene agrupar candidatas de longitud parecida: el bloque se rellena hasta la más
+    larga y ocupa len(targets) * (len(reference) + 1) * (longitud máxima + 1) bytes.
+
+    Args:
+        reference (str): Secuencia de referencia.
+        targets (list): Secuencias candidatas (str).
+        mode (str): "global", "local" o "semiglobal".
+        gap_open (float): Penalización por abrir un gap (positiva).
+        gap_extend (float): Penalización por cada residuo adicional del gap (positiva).
+        matrix (np.ndarray): Matriz de sustitución indexada por código (UNKNOWN + 1 filas).
+
+    Returns:
+        list: Un PairwiseAlignment por candidata.
+
+    Raises:
+        ValueError: Si el modo no existe o la referencia está vacía.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modo desconocido '{mode}'; disponibles: {', '.join(MODES)}")
+    if not reference:
+        raise ValueError("La secuencia de referencia está vacía")
+    targets = [target or "" for target in targets]
+    if not targets:
+        return []
+    reference_codes = encode(reference)
+    reference_bytes = np.frombuffer(reference.encode("ascii", "replace"), dtype=np.uint8)
+    codes, offsets = encode_many(targets)
+    lengths = np.diff(offsets)
+    # Candidatas rellenadas hasta la más larga (el relleno nunca forma parte de un alineamiento);
+    # al menos una columna, para que un bloque de candidatas vacías tenga camino de vuelta
+    n = max(int(lengths.max()), 1)
+    padded_codes = np.full((len(targets), n), UNKNOWN, dtype=np.uint8)
+    padded_bytes = np.full((len(targets), n), _GAP, dtype=np.uint8)
+    mask = np.arange(n) < lengths[:, None]
+    padded_codes[mask] = codes
+    padded_bytes[mask] = np.frombuffer("".join(targets).encode("ascii", "replace"), dtype=np.uint8)
+
+    scores, end_i, end_j, traceback = _fill(reference_codes, padded_codes, lengths, mode, gap_open, gap_extend,
+                                            matrix)
+    reference_out, target_out, position, start_i, start_j = _traceback(traceback, end_i, end_j, mode,
+                                                                       reference_bytes, padded_bytes)
+
+    gaps = (reference_out == _GAP) | (target_out == _GAP)
+    identical = ~gaps & (CODE_TABLE[reference_out] == CODE_TABLE[target_out]) & (CODE_TABLE[reference_out] < UNKNOWN)
+    similar = ~gaps & (matrix[CODE_TABLE[reference_out], CODE_TABLE[target_out]] > 0)
+    match_out = np.where(identical, ord("*"), np.where(similar, ord(":"), ord(" "))).astype(np.uint8)
+    width = reference_out.shape[1]
+    used = np.arange(width) >= position[:, None]
+    columns = np.maximum(width - position, 1)
+    identity = (identical & used).sum(axis=1) / columns
+    similarity = ((identical | similar) & used).sum(axis=1) / columns
+
+    results = []
+    for k in range(len(targets)):
+        start = position[k]
+        alignment = PairwiseAlignment()
+        alignment.score = float(scores[k])
+        alignment.reference_aligned = reference_out[k, start:].tobytes().decode("ascii")
+        alignment.target_aligned = target_out[k, start:].tobytes().decode("ascii")
+        alignment.match = match_out[k, start:].tobytes().decode("ascii")
+        alignment.reference_start = int(start_i[k])
+        alignment.target_start = int(start_j[k])
+        alignment.identity = float(identity[k])
+        alignment.similarity = float(similarity[k])
+        results.append(alignment)
+    return results
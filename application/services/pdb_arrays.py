@@ -0,0 +1,182 @@
+import numpy as np
+
+THREE_TO_ONE = {
+    "ALA": "A", "ARG": "R", "ASN": "N", "ASP": "D", "CYS": "C",
+    "GLN": "Q", "GLU": "E", "GLY": "G", "HIS": "H", "ILE": "I",
+    "LEU": "L", "LYS": "K", "MET": "M", "PHE": "F", "PRO": "P",
+    "SER": "S", "THR": "T", "TRP": "W", "TYR": "Y", "VAL": "V",
+    "HSD": "H", "HSE": "H", "HSP": "H", "HID": "H", "HIE": "H", "HIP": "H",
+    "MSE": "M", "SEC": "U", "PYL": "O",
+}
+
+
+class PDBAtoms:
+    """
+    Representación columnar de los átomos de un PDB.
+
+    Conserva las líneas originales para poder reescribir el archivo con nuevas
+    coordenadas sin perder registros que no son átomos (CRYST1, TER, END...).
+
+    Attributes:
+        lines (list): Todas las líneas del PDB.
+        atom_line_idx (np.ndarray): Índice en ``lines`` de cada átomo.
+        names, resnames, chains, icodes, altlocs, elements (np.ndarray): Columnas de texto.
+        resseqs (np.ndarray): Número de residuo de cada átomo.
+        hetatm (np.ndarray): True para registros HETATM.
+        coords (np.ndarray): Coordenadas (n_atoms, 3).
+        residue_index (np.ndarray): Índice de residuo (0..n_residues-1) de cada átomo.
+    """
+
+    __slots__ = ("lines", "atom_line_idx", "names", "resnames", "chains", "resseqs",
+                 "icodes", "altlocs", "elements", "hetatm", "coords", "residue_index")
+
+    def __len__(self):
+        return len(self.atom_line_idx)
+
+    @property
+    def n_residues(self):
+        return int(self.residue_index[-1]) + 1 if len(self.residue_index) else 0
+
+    def residue_starts(self):
+        """Índice del primer átomo de cada residuo."""
+        if not len(self.residue_index):
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(np.r_[True, self.residue_index[1:] != self.residue_index[:-1]])
+
+    def ca_indices(self):
+        """
+        Índice del primer átomo CA de cada residuo proteico, en orden de archivo.
+
+        Returns:
+            np.ndarray: Índices de átomo.
+        """
+        is_ca = (self.names == "CA") & ~self.hetatm
+        ca = np.flatnonzero(is_ca)
+        if not len(ca):
+            return ca
+        # Descartar CA alternativos (altloc) del mismo residuo
+        first = np.r_[True, self.residue_index[ca][1:] != self.residue_index[ca][:-1]]
+        return ca[first]
+
+    def sequence(self, atom_indices):
+        """Secuencia en código de una letra de los residuos de ``atom_indices``."""
+        return "".join(THREE_TO_ONE.get(name, "X") for name in self.resnames[atom_indices])
+
+
+def parse_pdb(pdb_text):
+    """
+    Convierte el texto de un PDB en arreglos NumPy (sólo registros ATOM/HETATM).
+
+    Args:
+        pdb_text (str): Contenido del archivo PDB.
+
+    Returns:
+        PDBAtoms: Átomos en formato columnar.
+    """
+    lines = pdb_text.splitlines()
+    idx = [i for i, line in enumerate(lines) if line.startswith(("ATOM", "HETATM"))]
+    atom_lines = [lines[i].ljust(80) for i in idx]
+
+    atoms = PDBAtoms()
+    atoms.lines = lines
+    atoms.atom_line_idx = np.asarray(idx, dtype=np.int64)
+    atoms.hetatm = np.array([line.startswith("HETATM") for line in atom_lines], dtype=bool)
+    atoms.names = np.array([line[12:16].strip() for line in atom_lines], dtype="U4")
+    atoms.altlocs = np.array([line[16] for line in atom_lines], dtype="U1")
+    atoms.resnames = np.array([line[17:21].strip() for line in atom_lines], dtype="U4")
+    atoms.chains = np.array([line[21] for line in atom_lines], dtype="U1")
+    atoms.resseqs = np.array([int(line[22:26]) for line in atom_lines], dtype=np.int32)
+    atoms.icodes = np.array([line[26] for line in atom_lines], dtype="U1")
+    atoms.elements = np.array([line[76:78].strip() for line in atom_lines], dtype="U2")
+    atoms.coords = np.array(
+        [(line[30:38], line[38:46], line[46:54]) for line in atom_lines], dtype=np.float64
+    ).reshape(-1, 3)
+
+    if atom_lines:
+        new_residue = np.r_[True, (atoms.chains[1:] != atoms.chains[:-1])
+                            | (atoms.resseqs[1:] != atoms.resseqs[:-1])
+                            | (atoms.icodes[1:] != atoms.icodes[:-1])]
+        atoms.residue_index = np.cumsum(new_residue) - 1
+    else:
+        atoms.residue_index = np.zeros(0, dtype=np.int64)
+    return atoms
+
+
+def format_pdb(atoms, coords=None):
+    """
+    Reescribe el PDB original sustituyendo las coordenadas de sus átomos.
+
+    Args:
+        atoms (PDBAtoms): Átomos obtenidos con ``parse_pdb``.
+        coords (np.ndarray): Nuevas coordenadas (por defecto, ``atoms.coords``).
+
+    Returns:
+        str: Texto PDB.
+    """
+    coords = atoms.coords if coords is None else coords
+    lines = list(atoms.lines)
+    for line_no, (x, y, z) in zip(atoms.atom_line_idx.tolist(), coords.tolist()):
+        line = lines[line_no].ljust(54)
+        lines[line_no] = f"{line[:30]}{x:8.3f}{y:8.3f}{z:8.3f}{line[54:]}"
+    return "\n".join(lines) + "\n"
+
+
+class ResidueTable:
+    """
+    Tabla compacta de residuos de un PDB (un elemento por residuo, en orden de archivo).
+
+    Attributes:
+        resids (np.ndarray): Número de residuo.
+        resnames (np.ndarray): Nombre de residuo.
+        chains (np.ndarray): Cadena.
+    """
+
+    __slots__ = ("resids", "resnames", "chains", "_sorted")
+
+    def __init__(self, resids, resnames, chains):
+        self.resids = resids
+        self.resnames = resnames
+        self.chains = chains
+        self._sorted = None
+
+    def __len__(self):
+        return len(self.resids)
+
+    def sorted_residues(self):
+        """
+        Pares únicos (resid, resname) ordenados por número de residuo, tal como los
+        construía la selección ``atomsel('all')`` de VMD.
+
+        Returns:
+            list: Lista de tuplas (resid, resname).
+        """
+        if self._sorted is None:
+            pairs = set(zip(self.resids.tolist(), self.resnames.tolist()))
+            self._sorted = sorted(pairs, key=lambda x: x[0])
+        return self._sorted
+
+
+def build_residue_table(pdb_text):
+    """
+    Construye la tabla de residuos leyendo sólo las columnas de residuo del PDB.
+
+    Args:
+        pdb_text (str): Contenido del archivo PDB.
+
+    Returns:
+        ResidueTable: Residuos del PDB.
+    """
+    keys = []
+    last = None
+    for line in pdb_text.splitlines():
+        if line.startswith(("ATOM", "HETATM")):
+            key = line[17:27]
+            if key != last:
+                keys.append(key)
+                last = key
+
+    return ResidueTable(
+        np.array([int(key[5:9]) for key in keys], dtype=np.int32),
+        np.array([key[0:4].strip() for key in keys], dtype="U4"),
+        np.array([key[4] for key in keys], dtype="U1"),
+    )
@@ -0,0 +1,275 @@
+"""
+Cálculo por lotes de la tabla ProteinCalculations para las filas de ValidVSDProteins:
+composición, masa molecular, punto isoeléctrico, hidrofobicidad promedio (GRAVY) y carga
+neta a pH 7. Las columnas del grafo de contactos no se calculan aquí.
+
+Las secuencias se codifican como uint8 (sequence_encoding) y cada propiedad se obtiene
+para un bloque completo de proteínas con tablas de consulta por residuo; el pI se busca
+por bisección sobre todas las proteínas del bloque a la vez. Los bloques se reparten en
+un pool de procesos. Cada fila guarda el hash de su secuencia (``sequence_hash``): una
+nueva ejecución sólo recalcula las proteínas nuevas o cuya secuencia cambió.
+
+Uso:
+    python -m application.services.protein_calculations database/proteins_discovery.db --workers 4
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from application.services.db_connection import get_connection_manager
+from application.services.sequence_encoding import (
+    AMINO_ACIDS, HYDROPHOBICITY_SCALES, UNKNOWN, composition_counts, encode_many, residue_table
+)
+
+# Se incluye en el hash: cambiarla obliga a recalcular todas las filas
+CALCULATION_VERSION = 1
+
+# Masas promedio (Da) de los aminoácidos libres; cada enlace peptídico resta una molécula de agua
+AVERAGE_MASSES = residue_table({
+    "A": 89.0932, "C": 121.1582, "D": 133.1027, "E": 147.1293, "F": 165.1891, "G": 75.0666,
+    "H": 155.1546, "I": 131.1729, "K": 146.1876, "L": 131.1729, "M": 149.2113, "N": 132.1179,
+    "P": 115.1305, "Q": 146.1445, "R": 174.201, "S": 105.0926, "T": 119.1192, "V": 117.1463,
+    "W": 204.2252, "Y": 181.1885,
+})
+WATER_MASS = 18.01528
+
+# Escala de Kyte-Doolittle
+KYTE_DOOLITTLE = residue_table(HYDROPHOBICITY_SCALES["kyte_doolittle"])
+
+# pKa de las cadenas laterales y de los extremos (los mismos valores que Bio.SeqUtils.IsoelectricPoint)
+POSITIVE_PKS = {"K": 10.0, "R": 12.0, "H": 5.98}
+NEGATIVE_PKS = {"D": 4.05, "E": 4.45, "C": 9.0, "Y": 10.0}
+N_TERMINAL_PK = residue_table({"A": 7.59, "M": 7.0, "S": 6.93, "P": 8.36, "T": 6.82, "V": 7.44, "E": 7.7}, 9.0)
+C_TERMINAL_PK = residue_table({"D": 4.55, "E": 4.75}, 2.0)
+
+_POSITIVE_CODES = [AMINO_ACIDS.index(letter) for letter in POSITIVE_PKS]
+_NEGATIVE_CODES = [AMINO_ACIDS.index(letter) for letter in NEGATIVE_PKS]
+_POSITIVE_PK_VALUES = np.array(list(POSITIVE_PKS.values()))
+_NEGATIVE_PK_VALUES = np.array(list(NEGATIVE_PKS.values()))
+
+PI_ITERATIONS = 32
+
+UPSERT_QUERY = """
+    INSERT INTO ProteinCalculations (vsd_protein_id, composicion_porcentajes, composicion_conteo,
+                                     masa_molecular, pI, hidrofobicidad_promedio, carga_neta_ph7,
+                                     sequence_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (vsd_protein_id) DO UPDATE SET
+        composicion_porcentajes = excluded.composicion_porcentajes,
+        composicion_conteo = excluded.composicion_conteo,
+        masa_molecular = excluded.masa_molecular,
+        pI = excluded.pI,
+        hidrofobicidad_promedio = excluded.hidrofobicidad_promedio,
+        carga_neta_ph7 = excluded.carga_neta_ph7,
+        sequence_hash = excluded.sequence_hash
+"""
+
+# Secuencia de cada proteína válida: Proteins.sequence (UniProt) o FoldSeek.tSeq
+SEQUENCES_QUERY = """
+    SELECT v.id,
+           CASE v.source WHEN 'UniProt' THEN p.sequence ELSE f.tSeq END,
+           pc.sequence_hash
+    FROM ValidVSDProteins v
+    LEFT JOIN Proteins p ON v.source = 'UniProt' AND p.accession_number = v.protein_id
+    LEFT JOIN FoldSeek f ON v.source = 'FoldSeek' AND f.foldseek_id = CAST(v.protein_id AS INTEGER)
+    LEFT JOIN ProteinCalculations pc ON pc.vsd_protein_id = v.id
+"""
+
+
+def sequence_hash(sequence):
+    return hashlib.sha1(f"{CALCULATION_VERSION}:{sequence}".encode()).hexdigest()
+
+
+def net_charge(counts, n_term_pk, c_term_pk, ph):
+    """
+    Carga neta de cada proteína al pH indicado (Henderson-Hasselbalch).
+
+    Args:
+        counts (np.ndarray): Conteos (n, UNKNOWN + 1) de ``composition_counts``.
+        n_term_pk (np.ndarray): pKa del extremo N de cada proteína.
+        c_term_pk (np.ndarray): pKa del extremo C de cada proteína.
+        ph (float | np.ndarray): pH común o uno por proteína.
+
+    Returns:
+        np.ndarray: Carga neta por proteína.
+    """
+    ph = np.broadcast_to(np.asarray(ph, dtype=np.float64), n_term_pk.shape)[:, None]
+    positive = counts[:, _POSITIVE_CODES] / (1.0 + 10.0 ** (ph - _POSITIVE_PK_VALUES))
+    negative = counts[:, _NEGATIVE_CODES] / (1.0 + 10.0 ** (_NEGATIVE_PK_VALUES - ph))
+    termini = 1.0 / (1.0 + 10.0 ** (ph[:, 0] - n_term_pk)) - 1.0 / (1.0 + 10.0 ** (c_term_pk - ph[:, 0]))
+    return positive.sum(axis=1) - negative.sum(axis=1) + termini
+
+
+def isoelectric_points(counts, n_term_pk, c_term_pk, low=0.0, high=14.0):
+    """
+    pI de cada proteína: bisección simultánea sobre todas (la carga decrece con el pH).
+
+    Returns:
+        np.ndarray: pH con carga neta cero.
+    """
+    low = np.full(len(counts), low)
+    high = np.full(len(counts), high)
+    for _ in range(PI_ITERATIONS):
+        middle = (low + high) / 2
+        positive = net_charge(counts, n_term_pk, c_term_pk, middle) > 0
+        low = np.where(positive, middle, low)
+        high = np.where(positive, high, middle)
+    return (low + high) / 2
+
+
+def compute_properties(sequences):
+    """
+    Propiedades de un bloque de secuencias.
+
+    Args:
+        sequences (list): Secuencias (str).
+
+    Returns:
+        dict: Arreglos ``counts``, ``length``, ``mass``, ``pi``, ``gravy`` y ``charge_ph7``
+        (NaN para las secuencias sin residuos reconocidos).
+    """
+    codes, offsets = encode_many(sequences)
+    counts = composition_counts(codes, offsets)
+    lengths = np.diff(offsets)
+    known = counts[:, :UNKNOWN].sum(axis=1)
+    has_residues = known > 0
+
+    # Primer y último residuo de cada secuencia (UNKNOWN si está vacía)
+    nonempty = lengths > 0
+    first = np.full(len(lengths), UNKNOWN, dtype=np.uint8)
+    last = np.full(len(lengths), UNKNOWN, dtype=np.uint8)
+    first[nonempty] = codes[offsets[:-1][nonempty]]
+    last[nonempty] = codes[offsets[1:][nonempty] - 1]
+    n_term_pk, c_term_pk = N_TERMINAL_PK[first], C_TERMINAL_PK[last]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mass = counts @ AVERAGE_MASSES - np.maximum(known - 1, 0) * WATER_MASS
+        gravy = (counts @ KYTE_DOOLITTLE) / known
+    return {
+        "counts": counts,
+        "length": lengths,
+        "mass": np.where(has_residues, mass, np.nan),
+        "pi": np.where(has_residues, isoelectric_points(counts, n_term_pk, c_term_pk), np.nan),
+        "gravy": np.where(has_residues, gravy, np.nan),
+        "charge_ph7": np.where(has_residues, net_charge(counts, n_term_pk, c_term_pk, 7.0), np.nan),
+    }
+
+
+# {"A": ..., "C": ..., ...} con el mismo formato que json.dumps, sin pasar por un dict por fila
+_COMPOSITION_JSON = "{" + ", ".join(f'"{aa}": %r' for aa in AMINO_ACIDS) + "}"
+
+
+def _numbers(values, digits):
+    return [None if value != value else value for value in np.round(values, digits).tolist()]
+
+
+def calculation_rows(items):
+    """
+    Filas de UPSERT_QUERY para un bloque de proteínas (se ejecuta en los procesos del pool).
+
+    Args:
+        items (list): Tuplas (vsd_protein_id, secuencia, hash de la secuencia).
+
+    Returns:
+        list: Filas para ``executemany``.
+    """
+    properties = compute_properties([sequence for _, sequence, _ in items])
+    counts = properties["counts"][:, :UNKNOWN]
+    lengths = properties["length"][:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percentages = np.where(lengths > 0, np.round(100.0 * counts / lengths, 2), 0.0).tolist()
+    columns = zip(
+        [_COMPOSITION_JSON % tuple(row) for row in percentages],
+        [_COMPOSITION_JSON % tuple(row) for row in counts.tolist()],
+        _numbers(properties["mass"], 2), _numbers(properties["pi"], 2),
+        _numbers(properties["gravy"], 4), _numbers(properties["charge_ph7"], 3),
+    )
+    return [(vsd_protein_id, *values, digest) for (vsd_protein_id, _, digest), values in zip(items, columns)]
+
+
+def ensure_schema(db_path):
+    """Crea ValidVSDProteins/ProteinCalculations si faltan, la columna sequence_hash y el índice único."""
+    from application.services.vsd_protein_processor import SQLiteHandler, VSDTableCreator
+    from database.create_db import add_missing_columns
+    VSDTableCreator(SQLiteHandler(db_path)).create_table()
+    conn = sqlite3.connect(db_path)
+    try:
+        add_missing_columns(conn.cursor())
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_proteincalculations_protein "
+                     "ON ProteinCalculations (vsd_protein_id)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def pending_proteins(db_path, force=False):
+    """
+    Returns:
+        tuple: (lista de (vsd_protein_id, secuencia, hash) por calcular, proteínas al día,
+        proteínas sin secuencia).
+    """
+    pending, up_to_date, missing = [], 0, 0
+    with get_connection_manager(db_path).reader() as conn:
+        for vsd_protein_id, sequence, stored_hash in conn.execute(SEQUENCES_QUERY):
+            if not sequence:
+                missing += 1
+                continue
+            digest = sequence_hash(sequence)
+            if digest == stored_hash and not force:
+                up_to_date += 1
+            else:
+                pending.append((vsd_protein_id, sequence, digest))
+    return pending, up_to_date, missing
+
+
+def update_protein_calculations(db_path, workers=None, chunk_size=2000, force=False):
+    """
+    Calcula ProteinCalculations para las proteínas de ValidVSDProteins nuevas o modificadas.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        workers (int): Procesos de cálculo (por defecto, uno por núcleo; 1 calcula en este proceso).
+        chunk_size (int): Proteínas por bloque.
+        force (bool): Recalcular todas las proteínas.
+
+    Returns:
+        dict: Proteínas calculadas, al día y sin secuencia.
+    """
+    ensure_schema(db_path)
+    pending, up_to_date, missing = pending_proteins(db_path, force)
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, max(len(chunks), 1))
+
+    def write(rows):
+        with get_connection_manager(db_path).writer() as conn:
+            conn.executemany(UPSERT_QUERY, rows)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for rows in pool.map(calculation_rows, chunks):
+                write(rows)
+    else:
+        for chunk in chunks:
+            write(calculation_rows(chunk))
+
+    stats = {"calculadas": len(pending), "al_dia": up_to_date, "sin_secuencia": missing}
+    print(f"ProteinCalculations: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", nargs="?", default=os.path.join("database", "proteins_discovery.db"))
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--force", action="store_true", help="Recalcular también las proteínas al día")
+    args = parser.parse_args()
+    update_protein_calculations(args.db_path, args.workers, args.chunk_size, args.force)
+
+
+if __name__ == "__main__":
+    main()
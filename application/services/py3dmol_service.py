@@ -1,9 +1,13 @@
-import py3Dmol
-import os
-import tempfile
-import json
-import pymol2
-from vmd import molecule, atomsel
+from functools import lru_cache
+from application.services.backends import get_backend
+from application.services.coordinate_store import get_coordinate_store
+from application.services.pdb_arrays import ResidueTable, build_residue_table
+
+
+@lru_cache(maxsize=16)
+def _cached_residue_table(pdb_data):
+    return build_residue_table(pdb_data)
+
 
 class Py3DMolService:
     @staticmethod
@@ -14,88 +18,68 @@ class Py3DMolService:
         """
         Combina dos archivos PDB usando PyMOL, tal como en Streamlit.
         """
-        with pymol2.PyMOL() as pymol:
+        with get_backend("pymol2").PyMOL() as pymol:
             pymol.cmd.load(pdb1_path, "molecule1")
             pymol.cmd.load(pdb2_path, "molecule2")
             pymol.cmd.create("combined", "molecule1 or molecule2")
             pymol.cmd.save(output_path, "combined")
     
+    @staticmethod
+    def residue_table(pdb_data, pdb_hash=None):
+        """
+        Devuelve la tabla de residuos de un PDB, construyéndola en memoria una sola vez.
+        Si se indica el hash y la estructura está en el almacén binario, se lee de allí
+        sin recorrer el texto.
+
+        Args:
+            pdb_data (str | ResidueTable): Contenido PDB o una tabla ya construida.
+            pdb_hash (str): Hash del PDB en StructureBlobs (opcional).
+
+        Returns:
+            ResidueTable: Tabla de residuos.
+        """
+        if isinstance(pdb_data, ResidueTable):
+            return pdb_data
+        store = get_coordinate_store() if pdb_hash else None
+        table = store.residue_table(pdb_hash) if store is not None else None
+        return table if table is not None else _cached_residue_table(pdb_data)
+
     @staticmethod
     def get_residue_info(pdb_data):
         """
-        Obtiene información de residuos usando VMD, como en Streamlit.
+        Obtiene información de residuos a partir de la tabla de residuos en memoria.
         """
-        # Guardar PDB como archivo temporal
-        temp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        pdb_path = os.path.join(temp_dir, f"temp_{os.getpid()}.pdb")
-        
-        with open(pdb_path, 'w') as f:
-            f.write(pdb_data)
-            
         try:
-            molid = molecule.load('pdb', pdb_path)
-            sel = atomsel('all')
-            residues = list(set([(r, sel.resname[i]) for i, r in enumerate(sel.resid)]))
-            residues.sort(key=lambda x: x[0])  # Ordenar por número de residuo
-            
+            residues = Py3DMolService.residue_table(pdb_data).sorted_residues()
+
             # Formatear información de residuos
             residue_info = [f"{resname}{resid}" for resid, resname in residues]
-            resids = [resid for resid in residues]
+            resids = list(residues)
             count = len(residues)
-            
-            molecule.delete(molid)
-            os.unlink(pdb_path)
-            
+
             return residue_info, count, resids
         except Exception as e:
             print(f"Error obteniendo información de residuos: {e}")
-            try:
-                os.unlink(pdb_path)
-            except:
-                pass
             return None, 0, []
-    
+
     @staticmethod
     def get_zone_residues(pdb_data, zone_sequence, all_sequence):
         """
         Obtiene los IDs de residuos para una zona específica, como en Streamlit.
         """
-        # Guardar PDB como archivo temporal
-        temp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        pdb_path = os.path.join(temp_dir, f"temp_zone_{os.getpid()}.pdb")
-        
-        with open(pdb_path, 'w') as f:
-            f.write(pdb_data)
-            
         try:
-            molid = molecule.load('pdb', pdb_path)
-            sel = atomsel('all')
-            residues = list(set([(r, sel.resname[i]) for i, r in enumerate(sel.resid)]))
-            residues.sort(key=lambda x: x[0])
-            
+            residues = Py3DMolService.residue_table(pdb_data).sorted_residues()
+
             # Encontrar inicio de zona en la secuencia completa
             zone_start_idx = all_sequence.replace("-", "").find(zone_sequence)
             if zone_start_idx == -1:
                 return []
-                
+
             # Mapear residuos de zona a IDs de residuos PDB
-            zone_residues = []
-            for i in range(len(zone_sequence)):
-                if zone_start_idx + i < len(residues):
-                    zone_residues.append(residues[zone_start_idx + i][0])
-                    
-            molecule.delete(molid)
-            os.unlink(pdb_path)
-            
-            return zone_residues
+            zone_end_idx = min(zone_start_idx + len(zone_sequence), len(residues))
+            return [resid for resid, _ in residues[zone_start_idx:zone_end_idx]]
         except Exception as e:
             print(f"Error procesando zona: {e}")
-            try:
-                os.unlink(pdb_path)
-            except:
-                pass
             return []
     
     @staticmethod
@@ -103,19 +87,9 @@ class Py3DMolService:
         """
         Crea un visualizador de mutaciones como en Streamlit.
         """
-        # Crear archivo temporal para los datos PDB
-        temp_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        pdb_path = os.path.join(temp_dir, f"temp_mutation_{os.getpid()}.pdb")
-        
-        with open(pdb_path, 'w') as f:
-            f.write(pdb_data)
-        
-        viewer = py3Dmol.view(width=800, height=600)
-        
-        with open(pdb_path, 'r') as f:
-            pdb_content = f.read()
-            viewer.addModel(pdb_content, "pdb")
+        # El modelo se carga directamente desde memoria: sin archivos compartidos entre hilos
+        viewer = get_backend("py3Dmol").view(width=800, height=600)
+        viewer.addModel(pdb_data, "pdb")
         
         viewer.setStyle({'cartoon': {'color': 'white'}})
 
@@ -155,12 +129,4 @@ class Py3DMolService:
         viewer.zoomTo()
         
         # Obtener HTML
-        html = viewer._make_html()
-        
-        # Limpiar archivo temporal
-        try:
-            os.unlink(pdb_path)
-        except:
-            pass
-        
-        return html
\ No newline at end of file
+        return viewer._make_html()
\ No newline at end of file
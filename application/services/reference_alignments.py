@@ -0,0 +1,341 @@
+"""
+Alineamiento de la secuencia de referencia (``database/reference.fasta``) contra las
+secuencias de Proteins e Isoforms y llenado de Alignments (seq_ref, seq, match,
+adjusted_score, similarity) y AlignedZones.
+
+Las candidatas se ordenan por longitud y se agrupan en bloques de tamaño parecido que
+pairwise_alignment.align_batch alinea juntos (antidiagonales vectorizadas con NumPy);
+los bloques se reparten en un pool de procesos. De cada alineamiento se extrae el
+fragmento alineado con cada zona de ReferenceZones, con sus propiedades calculadas por
+zone_properties, y todo se escribe con ``executemany`` en una sola transacción. Cada
+alineamiento guarda ``alignment_hash`` (referencia, zonas, parámetros y secuencia
+candidata): las candidatas sin cambios no se vuelven a alinear.
+
+Uso:
+    python -m application.services.reference_alignments database/proteins_discovery.db --workers 4
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from application.services.db_connection import get_connection_manager
+from application.services.pairwise_alignment import MODES, align_batch
+from application.services.reference_zones import invalidate_reference_zones
+from application.services.result_cache import invalidate_results
+from application.services.summary_tables import refresh_uniprot_summary, touch_summary
+from application.services.zone_properties import zone_rows
+
+# Se incluye en el hash: cambiarla obliga a alinear de nuevo todas las candidatas
+ALIGNMENT_VERSION = 1
+DEFAULT_FASTA = os.path.join("database", "reference.fasta")
+
+CANDIDATES_QUERY = """
+    SELECT accession_number, 'Protein', sequence FROM Proteins WHERE sequence IS NOT NULL AND sequence != ''
+    UNION ALL
+    SELECT isoform_id, 'Isoform', isoform_sequence FROM Isoforms
+    WHERE isoform_sequence IS NOT NULL AND isoform_sequence != ''
+"""
+EXISTING_QUERY = """
+    SELECT source_id, source_type, MIN(alignment_id), alignment_hash
+    FROM Alignments WHERE reference_sequence_id = ?
+    GROUP BY source_id, source_type
+"""
+NEW_ALIGNMENTS_QUERY = """
+    SELECT alignment_id, source_id, source_type FROM Alignments WHERE reference_sequence_id = ? AND alignment_id > ?
+"""
+
+UPDATE_ALIGNMENT_QUERY = """
+    UPDATE Alignments SET adjusted_score = ?, similarity = ?, seq_ref = ?, seq = ?, match = ?, alignment_hash = ?
+    WHERE alignment_id = ?
+"""
+INSERT_ALIGNMENT_QUERY = """
+    INSERT INTO Alignments (adjusted_score, similarity, seq_ref, seq, match, alignment_hash,
+                            reference_sequence_id, source_id, source_type)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPDATE_ZONE_QUERY = """
+    UPDATE AlignedZones
+    SET aligned_sequence = ?, match = ?, hydrophobicity_aligned = ?, volume_aligned = ?, delta_hydrophobicity = ?,
+        delta_volume = ?, tipo_carga = ?, cargas = ?, cargas_reference = ?
+    WHERE alignment_id = ? AND reference_zone_id = ?
+"""
+INSERT_ZONE_QUERY = """
+    INSERT INTO AlignedZones (aligned_sequence, match, hydrophobicity_aligned, volume_aligned, delta_hydrophobicity,
+                              delta_volume, tipo_carga, cargas, cargas_reference, alignment_id, reference_zone_id,
+                              vsd_valido)
+    SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM AlignedZones WHERE alignment_id = ? AND reference_zone_id = ?)
+"""
+
+
+def read_fasta(path):
+    """
+    Primer registro de un archivo FASTA.
+
+    Returns:
+        tuple: (identificador del encabezado, secuencia).
+    """
+    name, lines = None, []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(">"):
+                if name is not None:
+                    break
+                name = line[1:].split()[0] if len(line) > 1 else ""
+            elif line:
+                lines.append(line)
+    return name or os.path.splitext(os.path.basename(path))[0], "".join(lines).upper()
+
+
+def alignment_hash(reference, zones, settings, sequence):
+    zone_key = ";".join(f"{zone_id}:{fragment}" for zone_id, _, fragment in zones)
+    key = f"{ALIGNMENT_VERSION}:{settings}:{reference}:{zone_key}:{sequence}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def zone_alignments(alignment, reference, zones):
+    """
+    Columnas del alineamiento que corresponden a cada zona de referencia.
+
+    Sólo se toman las columnas con un residuo de la referencia, así que el fragmento
+    alineado tiene la misma longitud que el de la zona; las posiciones de la zona que
+    quedan fuera del alineamiento (modo local) se completan con gaps.
+
+    Args:
+        alignment (PairwiseAlignment): Alineamiento de la referencia con la candidata.
+        reference (str): Secuencia de referencia completa.
+        zones (list): Tuplas (zone_id, zone_number, fragmento), ordenadas por zone_number.
+
+    Returns:
+        list: Tuplas (zone_id, fragmento alineado, match, fracción de la zona alineada
+        con un residuo); se omiten las zonas que no aparecen en la referencia.
+    """
+    reference_row = np.frombuffer(alignment.reference_aligned.encode("ascii"), dtype=np.uint8)
+    target_row = np.frombuffer(alignment.target_aligned.encode("ascii"), dtype=np.uint8)
+    match_row = np.frombuffer(alignment.match.encode("ascii"), dtype=np.uint8)
+    residue_columns = reference_row != ord("-")
+    positions = (alignment.reference_start + np.cumsum(residue_columns) - 1)[residue_columns]
+    target_row, match_row = target_row[residue_columns], match_row[residue_columns]
+
+    results = []
+    search_from = 0
+    for zone_id, _, fragment in zones:
+        start = reference.find(fragment, search_from) if fragment else -1
+        if start == -1:
+            continue
+        search_from = start + len(fragment)
+        inside = (positions >= start) & (positions < start + len(fragment))
+        aligned = np.full(len(fragment), ord("-"), dtype=np.uint8)
+        match = np.full(len(fragment), ord(" "), dtype=np.uint8)
+        aligned[positions[inside] - start] = target_row[inside]
+        match[positions[inside] - start] = match_row[inside]
+        coverage = float((aligned != ord("-")).mean())
+        results.append((zone_id, aligned.tobytes().decode("ascii"), match.tobytes().decode("ascii"), coverage))
+    return results
+
+
+def alignment_rows(reference, zones, mode, gap_open, gap_extend, min_coverage, items):
+    """
+    Alinea un bloque de candidatas (se ejecuta en los procesos del pool).
+
+    Args:
+        reference (str): Secuencia de referencia.
+        zones (list): Tuplas (zone_id, zone_number, fragmento) de ReferenceZones.
+        mode, gap_open, gap_extend: Parámetros de ``align_batch``.
+        min_coverage (float): Fracción mínima de cada zona alineada con residuos para
+            marcar las zonas nuevas como vsd_valido.
+        items (list): Tuplas (source_id, source_type, secuencia, alignment_id existente o
+            None, hash).
+
+    Returns:
+        list: Tuplas (item, valores de Alignments, filas de zonas); cada fila de zona es
+        (columnas de UPDATE_ZONE_QUERY hasta cargas_reference, reference_zone_id, vsd_valido).
+    """
+    reference_fragments = {zone_id: fragment for zone_id, _, fragment in zones}
+    alignments = align_batch(reference, [sequence for _, _, sequence, _, _ in items], mode, gap_open, gap_extend)
+
+    extracted = [zone_alignments(alignment, reference, zones) for alignment in alignments]
+    flat = [(k, zone_id, aligned, match, coverage) for k, zone_list in enumerate(extracted)
+            for zone_id, aligned, match, coverage in zone_list]
+    properties = zone_rows([(k, zone_id, aligned) for k, zone_id, aligned, _, _ in flat], reference_fragments)
+    valid = [len(zone_list) == len(zones) and all(coverage >= min_coverage for *_, coverage in zone_list)
+             for zone_list in extracted]
+
+    zone_values = [[] for _ in items]
+    for (k, zone_id, aligned, match, _), row in zip(flat, properties):
+        zone_values[k].append((aligned, match, *row[:-1], zone_id, int(valid[k])))
+    return [(item, (alignment.score, round(alignment.similarity, 4), alignment.reference_aligned,
+                    alignment.target_aligned, alignment.match), zone_list)
+            for item, alignment, zone_list in zip(items, alignments, zone_values)]
+
+
+def chunk_candidates(pending, reference_length, chunk_size, max_cells):
+    """
+    Agrupa las candidatas ordenadas por longitud en bloques de hasta ``chunk_size``
+    candidatas cuyo camino de vuelta (candidatas x (m + n + 1) x (m + 1) bytes) no
+    supere ``max_cells``.
+    """
+    chunks, chunk = [], []
+    for item in sorted(pending, key=lambda item: len(item[2])):
+        cells = (len(chunk) + 1) * (reference_length + len(item[2]) + 1) * (reference_length + 1)
+        if chunk and (len(chunk) >= chunk_size or cells > max_cells):
+            chunks.append(chunk)
+            chunk = []
+        chunk.append(item)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def ensure_schema(db_path):
+    """Agrega a una base existente la columna Alignments.alignment_hash."""
+    from database.create_db import add_missing_columns
+    conn = sqlite3.connect(db_path)
+    try:
+        add_missing_columns(conn.cursor())
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def reference_sequence_id(conn, name, sequence):
+    """ID de la referencia en ReferenceSequences; se inserta si no existe."""
+    row = conn.execute("SELECT reference_sequence_id FROM ReferenceSequences WHERE reference_segment = ?",
+                       (sequence,)).fetchone()
+    if row:
+        return row[0]
+    return conn.execute("INSERT INTO ReferenceSequences (reference_segment, source_protein) VALUES (?, ?)",
+                        (sequence, name)).lastrowid
+
+
+def pending_candidates(db_path, reference_id, reference, zones, settings, force=False):
+    """
+    Returns:
+        tuple: (lista de candidatas por alinear con el formato de ``alignment_rows``,
+        candidatas al día).
+    """
+    pending, up_to_date = [], 0
+    with get_connection_manager(db_path).reader() as conn:
+        existing = {(source_id, source_type): (alignment_id, stored_hash) for source_id, source_type, alignment_id,
+                    stored_hash in conn.execute(EXISTING_QUERY, (reference_id,))}
+        for source_id, source_type, sequence in conn.execute(CANDIDATES_QUERY):
+            alignment_id, stored_hash = existing.get((source_id, source_type), (None, None))
+            digest = alignment_hash(reference, zones, settings, sequence)
+            if digest == stored_hash and not force:
+                up_to_date += 1
+            else:
+                pending.append((source_id, source_type, sequence, alignment_id, digest))
+    return pending, up_to_date
+
+
+def update_reference_alignments(db_path, fasta_path=DEFAULT_FASTA, mode="semiglobal", gap_open=10.0,
+                                gap_extend=0.5, min_coverage=0.8, workers=None, chunk_size=256,
+                                max_cells=64 * 1024 ** 2, force=False):
+    """
+    Alinea la referencia con las proteínas e isoformas nuevas o modificadas y escribe
+    Alignments y AlignedZones. Las zonas existentes se actualizan en su fila (se
+    conservan sus aligned_zone_id y vsd_valido).
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        fasta_path (str): FASTA con la secuencia de referencia.
+        mode (str): "global", "local" o "semiglobal" (ver pairwise_alignment).
+        gap_open, gap_extend (float): Penalizaciones de los gaps.
+        min_coverage (float): Cobertura mínima de cada zona para marcar vsd_valido.
+        workers (int): Procesos (por defecto, uno por núcleo; 1 alinea en este proceso).
+        chunk_size (int): Candidatas máximas por bloque.
+        max_cells (int): Bytes máximos del camino de vuelta de un bloque.
+        force (bool): Alinear también las candidatas al día.
+
+    Returns:
+        dict: Candidatas alineadas, al día, alineamientos nuevos y zonas escritas.
+
+    Raises:
+        ValueError: Si el FASTA no contiene ninguna secuencia.
+    """
+    name, reference = read_fasta(fasta_path)
+    if not reference:
+        raise ValueError(f"{fasta_path} no contiene ninguna secuencia")
+    ensure_schema(db_path)
+    with get_connection_manager(db_path).writer() as conn:
+        reference_id = reference_sequence_id(conn, name, reference)
+    with get_connection_manager(db_path).reader() as conn:
+        zones = conn.execute("""
+            SELECT zone_id, zone_number, sequence_fragment FROM ReferenceZones
+            WHERE reference_sequence_id = ? ORDER BY zone_number
+        """, (reference_id,)).fetchall()
+    if not zones:
+        print(f"La referencia {name} no tiene zonas en ReferenceZones: sólo se escriben los alineamientos")
+
+    settings = f"{mode}:{float(gap_open)}:{float(gap_extend)}:{float(min_coverage)}"
+    pending, up_to_date = pending_candidates(db_path, reference_id, reference, zones, settings, force)
+    chunks = chunk_candidates(pending, len(reference), chunk_size, max_cells)
+    workers = min(workers or os.cpu_count() or 1, max(len(chunks), 1))
+    build = partial(alignment_rows, reference, zones, mode, gap_open, gap_extend, min_coverage)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # Todos los alineamientos terminan antes de tomar el bloqueo de escritura
+        results = list(pool.map(build, chunks) if pool else map(build, chunks))
+    finally:
+        if pool:
+            pool.shutdown()
+
+    inserted = zones_written = 0
+    updated_ids = []
+    with get_connection_manager(db_path).writer() as conn:
+        for rows in results:
+            new = [(item, values) for item, values, _ in rows if item[3] is None]
+            conn.executemany(UPDATE_ALIGNMENT_QUERY, [(*values, item[4], item[3])
+                                                      for item, values, _ in rows if item[3] is not None])
+            last_id = conn.execute("SELECT COALESCE(MAX(alignment_id), 0) FROM Alignments").fetchone()[0]
+            conn.executemany(INSERT_ALIGNMENT_QUERY, [(*values, item[4], reference_id, item[0], item[1])
+                                                      for item, values in new])
+            alignment_ids = {(source_id, source_type): alignment_id for alignment_id, source_id, source_type
+                             in conn.execute(NEW_ALIGNMENTS_QUERY, (reference_id, last_id))}
+
+            zone_params = []
+            for item, _, zone_list in rows:
+                alignment_id = item[3] if item[3] is not None else alignment_ids[(item[0], item[1])]
+                zone_params += [(*zone[:-2], alignment_id, zone[-2], zone[-1]) for zone in zone_list]
+            conn.executemany(UPDATE_ZONE_QUERY, [params[:-1] for params in zone_params])
+            conn.executemany(INSERT_ZONE_QUERY, [(*params, params[-3], params[-2]) for params in zone_params])
+            updated_ids += [item[3] for item, _, _ in rows if item[3] is not None]
+            inserted += len(new)
+            zones_written += len(zone_params)
+        if pending:
+            refresh_uniprot_summary(conn)
+            touch_summary(conn, "uniprot", updated_ids)
+
+    invalidate_reference_zones(db_path)
+    invalidate_results("uniprot", updated_ids)
+    stats = {"alineadas": len(pending), "al_dia": up_to_date, "nuevas": inserted, "zonas": zones_written}
+    print(f"Alignments: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", nargs="?", default=os.path.join("database", "proteins_discovery.db"))
+    parser.add_argument("--fasta", default=DEFAULT_FASTA, help="FASTA con la secuencia de referencia")
+    parser.add_argument("--mode", default="semiglobal", choices=MODES)
+    parser.add_argument("--gap-open", type=float, default=10.0)
+    parser.add_argument("--gap-extend", type=float, default=0.5)
+    parser.add_argument("--min-coverage", type=float, default=0.8,
+                        help="Fracción mínima de cada zona alineada para marcar vsd_valido")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--force", action="store_true", help="Alinear también las candidatas al día")
+    args = parser.parse_args()
+    update_reference_alignments(args.db_path, args.fasta, args.mode, args.gap_open, args.gap_extend,
+                                args.min_coverage, args.workers, args.chunk_size, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+
+from application.services.db_connection import get_connection_manager
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class ReferenceZoneCache:
+    """
+    Copia en memoria de la tabla ReferenceZones (unas pocas filas por referencia).
+
+    Se carga una sola vez y se recarga cuando cambia la firma de la tabla (número de
+    filas, zone_id máximo y longitud total de los fragmentos), que se comprueba como
+    mucho cada ``check_interval`` segundos, o cuando se llama a ``invalidate()``.
+    """
+
+    SIGNATURE_QUERY = """
+        SELECT COUNT(*), COALESCE(MAX(zone_id), 0), COALESCE(SUM(LENGTH(sequence_fragment)), 0)
+        FROM ReferenceZones
+    """
+
+    def __init__(self, db_path, check_interval=30.0):
+        """
+        Args:
+            db_path (str): Ruta de la base de datos.
+            check_interval (float): Segundos entre comprobaciones de la firma de la tabla.
+        """
+        self.db_path = db_path
+        self.check_interval = check_interval
+        self._zones = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Descarta la copia en memoria; la próxima consulta recarga la tabla."""
+        with self._lock:
+            self._zones = None
+            self._signature = None
+
+    def _load(self):
+        with get_connection_manager(self.db_path).reader() as conn:
+            signature = conn.execute(self.SIGNATURE_QUERY).fetchone()
+            stale = self._zones is None or signature != self._signature
+            rows = conn.execute("""
+                SELECT zone_id, zone_number, sequence_fragment, reference_sequence_id
+                FROM ReferenceZones
+            """).fetchall() if stale else None
+        if stale:
+            self._zones = {zone_id: (zone_number, fragment, reference_id)
+                           for zone_id, zone_number, fragment, reference_id in rows}
+            self._signature = signature
+        self._checked_at = time.monotonic()
+
+    def zones(self):
+        """
+        Returns:
+            dict: zone_id -> (zone_number, sequence_fragment, reference_sequence_id).
+        """
+        with self._lock:
+            if self._zones is None or time.monotonic() - self._checked_at > self.check_interval:
+                self._load()
+            return self._zones
+
+    def lookup(self, zone_ids):
+        """
+        Busca varias zonas en una sola llamada.
+
+        Args:
+            zone_ids (list): IDs de zona (enteros o cadenas, p. ej. de un GROUP_CONCAT).
+
+        Returns:
+            list: (zone_number, sequence_fragment) por cada ID, o None si no existe.
+        """
+        zones = self.zones()
+        result = []
+        for zone_id in zone_ids:
+            try:
+                zone = zones.get(int(zone_id))
+            except (TypeError, ValueError):
+                zone = None
+            result.append(zone[:2] if zone else None)
+        return result
+
+    def zone_numbers(self, zone_ids):
+        """
+        Args:
+            zone_ids (list): IDs de zona.
+
+        Returns:
+            dict: zone_number -> sequence_fragment de las zonas encontradas.
+        """
+        return {zone[0]: zone[1] for zone in self.lookup(zone_ids) if zone}
+
+
+def get_reference_zones(db_path):
+    """
+    Devuelve la caché de ReferenceZones compartida para ``db_path`` en el proceso actual.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+
+    Returns:
+        ReferenceZoneCache: Caché de zonas de referencia.
+    """
+    key = (os.getpid(), os.path.abspath(db_path))
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                cache = ReferenceZoneCache(db_path)
+                _caches[key] = cache
+    return cache
+
+
+def invalidate_reference_zones(db_path):
+    """Descarta la copia de ReferenceZones de ``db_path`` si ya fue creada en este proceso."""
+    cache = _caches.get((os.getpid(), os.path.abspath(db_path)))
+    if cache is not None:
+        cache.invalidate()
@@ -0,0 +1,226 @@
+import glob
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class ResultCache:
+    """
+    Caché de resultados ya renderizados de la vista de una estructura.
+
+    Las claves son tuplas ``(fuente, id, data_version, ...)``: como ``data_version``
+    aumenta cada vez que la ingesta reescribe un alineamiento (ver summary_tables.py),
+    una entrada obsoleta nunca vuelve a pedirse. El nivel en memoria se limita por
+    número de entradas y por bytes (LRU); el nivel en disco es opcional y se limita
+    por bytes expulsando los archivos usados hace más tiempo.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=256 * 1024 ** 2, disk_dir=None,
+                 disk_max_bytes=2 * 1024 ** 3):
+        """
+        Args:
+            max_entries (int): Entradas máximas en memoria.
+            max_bytes (int): Tamaño máximo (serializado) de las entradas en memoria.
+            disk_dir (str): Directorio del nivel en disco (None para desactivarlo).
+            disk_max_bytes (int): Tamaño máximo del nivel en disco.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_config(cls):
+        """Crea la caché con los parámetros definidos en Config."""
+        from config import Config
+        return cls(
+            max_entries=Config.RESULT_CACHE_MAX_ENTRIES,
+            max_bytes=Config.RESULT_CACHE_MAX_BYTES,
+            disk_dir=Config.RESULT_CACHE_DIR,
+            disk_max_bytes=Config.RESULT_CACHE_DISK_MAX_BYTES,
+        )
+
+    def _disk_path(self, key):
+        # Prefijo legible (fuente_id_) para poder invalidar por alineamiento
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()[:32]
+        return os.path.join(self.disk_dir, f"{key[0]}_{key[1]}_{digest}.pkl")
+
+    def get(self, key):
+        """
+        Args:
+            key (tuple): Clave ``(fuente, id, data_version, ...)``.
+
+        Returns:
+            object: Valor cacheado o None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as f:
+                    payload = f.read()
+                value = pickle.loads(payload)
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Entrada de caché ilegible {path}: {e}")
+                self._remove_file(path)
+            else:
+                self._remember(key, value, len(payload))
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Guarda ``value`` en memoria y, si está activado, en disco."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, value, len(payload))
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+                self._evict_disk()
+            except OSError as e:
+                print(f"No se pudo escribir la caché en disco: {e}")
+                self._remove_file(tmp_path)
+
+    def get_or_compute(self, key, compute):
+        """
+        Devuelve el valor cacheado de ``key`` o lo calcula con ``compute()`` y lo guarda.
+        Los resultados None no se cachean.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def _remember(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def _evict_disk(self):
+        files = []
+        for path in glob.glob(os.path.join(self.disk_dir, "*.pkl")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            self._remove_file(path)
+            total -= size
+
+    @staticmethod
+    def _remove_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def invalidate(self, source, ids=None):
+        """
+        Descarta los resultados de una fuente (o sólo de los ``ids`` indicados) en
+        memoria y en disco.
+
+        Args:
+            source (str): "foldseek" o "uniprot".
+            ids (list): IDs de alineamiento afectados (None para toda la fuente).
+        """
+        wanted = None if ids is None else {int(i) for i in ids}
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == source and (wanted is None or k[1] in wanted)]:
+                self._bytes -= self._entries.pop(key)[1]
+        if self.disk_dir:
+            patterns = [f"{source}_*.pkl"] if wanted is None else [f"{source}_{i}_*.pkl" for i in wanted]
+            for pattern in patterns:
+                for path in glob.glob(os.path.join(self.disk_dir, pattern)):
+                    self._remove_file(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            for path in glob.glob(os.path.join(self.disk_dir, "*.pkl")):
+                self._remove_file(path)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+def get_result_cache():
+    """Devuelve la ResultCache compartida del proceso (configurada desde Config)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache.from_config()
+    return _cache
+
+
+def invalidate_results(source, ids=None):
+    """Invalida resultados cacheados si la caché del proceso ya fue creada."""
+    if _cache is not None:
+        _cache.invalidate(source, ids)
+
+
+def invalidate_uniprot_accessions(conn, accession_numbers):
+    """Invalida los alineamientos UniProt de las proteínas reescritas por la ingesta."""
+    if _cache is None or not accession_numbers:
+        return
+    placeholders = ",".join("?" * len(accession_numbers))
+    ids = [row[0] for row in conn.execute(
+        f"SELECT alignment_id FROM Alignments WHERE source_id IN ({placeholders})", list(accession_numbers))]
+    _cache.invalidate("uniprot", ids)
+
+
+def invalidate_foldseek_entries(conn, foldseek_ids):
+    """Invalida los alineamientos FoldSeek de las entradas reescritas por la ingesta."""
+    if _cache is None or not foldseek_ids:
+        return
+    placeholders = ",".join("?" * len(foldseek_ids))
+    ids = [row[0] for row in conn.execute(
+        f"SELECT alignment_detail_id FROM FoldSeekAlignmentDetails WHERE foldseek_id IN ({placeholders})",
+        list(foldseek_ids))]
+    _cache.invalidate("foldseek", ids)
@@ -0,0 +1,125 @@
+"""
+Codificación de secuencias de aminoácidos como arreglos uint8 para calcular propiedades
+con tablas de consulta: cada residuo se convierte en un índice 0..19 (orden de
+AMINO_ACIDS) y cualquier otro carácter (X, B, Z, gaps...) en UNKNOWN.
+"""
+import numpy as np
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+UNKNOWN = len(AMINO_ACIDS)
+
+# Escalas por residuo (letra -> valor). Las funciones que reciben una escala aceptan su
+# nombre en estos registros o directamente un diccionario con otra escala.
+HYDROPHOBICITY_SCALES = {
+    "kyte_doolittle": {
+        "A": 1.8, "R": -4.5, "N": -3.5, "D": -3.5, "C": 2.5, "Q": -3.5, "E": -3.5, "G": -0.4,
+        "H": -3.2, "I": 4.5, "L": 3.8, "K": -3.9, "M": 1.9, "F": 2.8, "P": -1.6, "S": -0.8,
+        "T": -0.7, "W": -0.9, "Y": -1.3, "V": 4.2,
+    },
+    "hopp_woods": {
+        "A": -0.5, "R": 3.0, "N": 0.2, "D": 3.0, "C": -1.0, "Q": 0.2, "E": 3.0, "G": 0.0,
+        "H": -0.5, "I": -1.8, "L": -1.8, "K": 3.0, "M": -1.3, "F": -2.5, "P": 0.0, "S": 0.3,
+        "T": -0.4, "W": -3.4, "Y": -2.3, "V": -1.5,
+    },
+    "eisenberg": {
+        "A": 0.62, "R": -2.53, "N": -0.78, "D": -0.90, "C": 0.29, "Q": -0.85, "E": -0.74, "G": 0.48,
+        "H": -0.40, "I": 1.38, "L": 1.06, "K": -1.50, "M": 0.64, "F": 1.19, "P": 0.12, "S": -0.18,
+        "T": -0.05, "W": 0.81, "Y": 0.26, "V": 1.08,
+    },
+}
+
+# Volumen de los residuos en Å³
+VOLUME_SCALES = {
+    "zamyatnin": {
+        "A": 88.6, "R": 173.4, "N": 114.1, "D": 111.1, "C": 108.5, "Q": 143.8, "E": 138.4, "G": 60.1,
+        "H": 153.2, "I": 166.7, "L": 166.7, "K": 168.6, "M": 162.9, "F": 189.9, "P": 112.7, "S": 89.0,
+        "T": 116.1, "W": 227.8, "Y": 193.6, "V": 140.0,
+    },
+}
+
+# Carga de la cadena lateral (entera)
+CHARGE_SCALES = {
+    "ph7": {"K": 1, "R": 1, "D": -1, "E": -1},
+    "ph7_histidine": {"K": 1, "R": 1, "H": 1, "D": -1, "E": -1},
+}
+
+# Byte ASCII -> código (mayúsculas y minúsculas)
+CODE_TABLE = np.full(256, UNKNOWN, dtype=np.uint8)
+for _code, _letter in enumerate(AMINO_ACIDS):
+    CODE_TABLE[ord(_letter)] = _code
+    CODE_TABLE[ord(_letter.lower())] = _code
+
+
+def residue_table(values, default=0.0):
+    """
+    Tabla de consulta indexada por código a partir de un diccionario letra -> valor.
+
+    Args:
+        values (dict): Valor de cada aminoácido.
+        default (float): Valor para los aminoácidos ausentes y para UNKNOWN.
+
+    Returns:
+        np.ndarray: Arreglo de longitud UNKNOWN + 1.
+    """
+    table = np.full(UNKNOWN + 1, default, dtype=np.float64)
+    for letter, value in values.items():
+        table[AMINO_ACIDS.index(letter)] = value
+    return table
+
+
+def scale_values(scale, registry):
+    """
+    Diccionario letra -> valor de una escala.
+
+    Args:
+        scale (str | dict): Nombre registrado en ``registry`` o la escala misma.
+        registry (dict): Registro de escalas (p. ej. HYDROPHOBICITY_SCALES).
+
+    Raises:
+        ValueError: Si el nombre no está registrado.
+    """
+    if isinstance(scale, dict):
+        return scale
+    try:
+        return registry[scale]
+    except KeyError:
+        raise ValueError(f"Escala desconocida '{scale}'; disponibles: {', '.join(sorted(registry))}") from None
+
+
+def encode(sequence):
+    """Códigos uint8 de una secuencia."""
+    return CODE_TABLE[np.frombuffer((sequence or "").encode("ascii", "replace"), dtype=np.uint8)]
+
+
+def encode_many(sequences):
+    """
+    Codifica varias secuencias en un único arreglo concatenado.
+
+    Args:
+        sequences (list): Secuencias (str).
+
+    Returns:
+        tuple: (códigos uint8 concatenados, offsets int64 de longitud len(sequences) + 1).
+    """
+    lengths = np.fromiter((len(sequence or "") for sequence in sequences), dtype=np.int64, count=len(sequences))
+    offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    joined = "".join(sequence or "" for sequence in sequences).encode("ascii", "replace")
+    return CODE_TABLE[np.frombuffer(joined, dtype=np.uint8)], offsets
+
+
+def composition_counts(codes, offsets):
+    """
+    Conteo de cada código por secuencia con un único ``np.bincount``.
+
+    Args:
+        codes (np.ndarray): Códigos concatenados (``encode_many``).
+        offsets (np.ndarray): Límites de cada secuencia.
+
+    Returns:
+        np.ndarray: Matriz (n_secuencias, UNKNOWN + 1) de conteos.
+    """
+    n = len(offsets) - 1
+    owner = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+    flat = owner * (UNKNOWN + 1) + codes
+    return np.bincount(flat, minlength=n * (UNKNOWN + 1)).reshape(n, UNKNOWN + 1)
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+
+class StructureCache:
+    """
+    Caché local, direccionada por contenido, de los modelos PDB/AlphaFold descargados.
+
+    Cada archivo se guarda una sola vez bajo ``objects/<sha256>`` y un índice SQLite
+    relaciona cada enlace (o identificador) con su digest. El tamaño total se limita
+    expulsando los objetos usados hace más tiempo, y todo objeto se verifica contra
+    su digest al leerse.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 ** 3, offline=False, mirror_dir=None):
+        """
+        Args:
+            cache_dir (str): Directorio de la caché.
+            max_bytes (int): Tamaño máximo de los objetos almacenados.
+            offline (bool): Si es True, sólo se sirven archivos ya cacheados.
+            mirror_dir (str): Directorio local consultado antes que los servidores remotos;
+                cada enlace se resuelve por el nombre de archivo de su URL.
+        """
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.index_path = os.path.join(cache_dir, "index.db")
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.mirror_dir = mirror_dir
+        self._lock = threading.Lock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS objects (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS links (
+                    cache_key TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL REFERENCES objects (digest)
+                )
+            """)
+
+    @classmethod
+    def from_config(cls):
+        """Crea la caché con los parámetros definidos en Config."""
+        from config import Config
+        return cls(
+            Config.STRUCTURE_CACHE_DIR,
+            max_bytes=Config.STRUCTURE_CACHE_MAX_BYTES,
+            offline=Config.STRUCTURE_CACHE_OFFLINE,
+            mirror_dir=Config.STRUCTURE_MIRROR_DIR,
+        )
+
+    @contextmanager
+    def _connect(self):
+        """Conexión al índice: confirma (o revierte) la transacción y se cierra al salir."""
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def get(self, key):
+        """
+        Obtiene un archivo cacheado verificando su integridad.
+
+        Args:
+            key (str): Enlace o identificador de la estructura.
+
+        Returns:
+            str: Contenido del archivo, o None si no está cacheado o está corrupto.
+        """
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT digest FROM links WHERE cache_key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            digest = row[0]
+            try:
+                with open(self._object_path(digest), "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = None
+
+            if data is None or hashlib.sha256(data).hexdigest() != digest:
+                print(f"Caché: objeto {digest} ausente o corrupto, se descarta")
+                self._drop_object(conn, digest)
+                return None
+
+            conn.execute("UPDATE objects SET last_access = ? WHERE digest = ?", (time.time(), digest))
+        return data.decode("utf-8")
+
+    def put(self, key, content):
+        """
+        Guarda un archivo en la caché y aplica la política de expulsión.
+
+        Args:
+            key (str): Enlace o identificador de la estructura.
+            content (str): Contenido del archivo.
+
+        Returns:
+            str: Digest SHA-256 del contenido.
+        """
+        data = content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        with self._lock, self._connect() as conn:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+
+            conn.execute("""
+                INSERT INTO objects (digest, size, last_access) VALUES (?, ?, ?)
+                ON CONFLICT(digest) DO UPDATE SET last_access = excluded.last_access
+            """, (digest, len(data), time.time()))
+            conn.execute("INSERT OR REPLACE INTO links (cache_key, digest) VALUES (?, ?)", (key, digest))
+            self._evict(conn, keep=digest)
+        return digest
+
+    def fetch(self, link, downloader):
+        """
+        Devuelve el archivo de ``link`` desde la caché o lo obtiene y lo cachea.
+
+        El origen se resuelve en este orden: caché, ``file://``, directorio espejo
+        y finalmente ``downloader`` (también cuando el espejo no tiene el archivo).
+        En modo offline sólo se consulta la caché.
+
+        Args:
+            link (str): URL del modelo; es también la clave de caché.
+            downloader (callable): Función ``link -> str | None`` para descargas remotas.
+
+        Returns:
+            str: Contenido del archivo, o None si no está disponible.
+        """
+        content = self.get(link)
+        if content is not None:
+            return content
+        if self.offline:
+            print(f"Caché (offline): {link} no está disponible localmente")
+            return None
+
+        parsed = urlparse(link)
+        if parsed.scheme == "file":
+            content = self._read_local(url2pathname(parsed.path))
+        else:
+            if self.mirror_dir:
+                content = self._read_local(os.path.join(self.mirror_dir, os.path.basename(parsed.path)))
+            if content is None:
+                content = downloader(link)
+
+        if content is not None:
+            self.put(link, content)
+        return content
+
+    @staticmethod
+    def _read_local(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return f.read()
+
+    def total_size(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _evict(self, conn, keep=None):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT digest, size FROM objects ORDER BY last_access").fetchall()
+        for digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            self._drop_object(conn, digest)
+            total -= size
+
+    def _drop_object(self, conn, digest):
+        conn.execute("DELETE FROM links WHERE digest = ?", (digest,))
+        conn.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass
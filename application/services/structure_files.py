@@ -0,0 +1,79 @@
+from application.services.db_connection import get_connection_manager
+from application.services.structure_store import load_pdb
+
+# Consultas por fuente: (reference_sequence_id, pdb alineado) de un alineamiento
+ALIGNED_PDB_QUERIES = {
+    "foldseek": """
+        SELECT f.id_referencia, fad.pdb_hash, fad.pdb
+        FROM FoldSeekAlignmentDetails fad
+        JOIN FoldSeek f ON fad.foldseek_id = f.foldseek_id
+        WHERE fad.alignment_detail_id = ?
+    """,
+    "uniprot": """
+        SELECT reference_sequence_id, pdb_hash, pdb
+        FROM Alignments
+        WHERE alignment_id = ?
+    """,
+}
+
+
+def get_alignment_pdb(db_path, source, alignment_id):
+    """
+    PDB alineado de un alineamiento y el ID de su secuencia de referencia.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        source (str): "foldseek" o "uniprot".
+        alignment_id (int): alignment_detail_id (FoldSeek) o alignment_id (UniProt).
+
+    Returns:
+        tuple: (reference_sequence_id, pdb) o (None, None) si no existe.
+    """
+    query = ALIGNED_PDB_QUERIES.get(source)
+    if query is None:
+        return None, None
+    with get_connection_manager(db_path).reader() as conn:
+        row = conn.execute(query, (alignment_id,)).fetchone()
+        return (row[0], load_pdb(conn, row[1], row[2])) if row else (None, None)
+
+
+def get_reference_pdb(db_path, reference_sequence_id):
+    """
+    PDB de una secuencia de referencia (compartido por todos sus alineamientos).
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        reference_sequence_id (int): ID en ReferenceSequences.
+
+    Returns:
+        str: Contenido PDB o None.
+    """
+    with get_connection_manager(db_path).reader() as conn:
+        row = conn.execute(
+            "SELECT pdb_hash, pdb FROM ReferenceSequences WHERE reference_sequence_id = ?", (reference_sequence_id,)
+        ).fetchone()
+        return load_pdb(conn, row[0], row[1]) if row else None
+
+
+def get_alignment_pdb_hash(db_path, source, alignment_id):
+    """
+    Hash almacenado del PDB alineado y el ID de su referencia, sin leer el PDB.
+
+    Returns:
+        tuple: (reference_sequence_id, pdb_hash) o (None, None) si no existe; pdb_hash
+        es None en las filas antiguas que guardan el texto en la columna ``pdb``.
+    """
+    query = ALIGNED_PDB_QUERIES.get(source)
+    if query is None:
+        return None, None
+    with get_connection_manager(db_path).reader() as conn:
+        row = conn.execute(query, (alignment_id,)).fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def get_reference_pdb_hash(db_path, reference_sequence_id):
+    """Hash almacenado del PDB de una referencia (None si no existe o no tiene hash)."""
+    with get_connection_manager(db_path).reader() as conn:
+        row = conn.execute("SELECT pdb_hash FROM ReferenceSequences WHERE reference_sequence_id = ?",
+                           (reference_sequence_id,)).fetchone()
+    return row[0] if row else None
@@ -1,127 +1,241 @@
-import sqlite3
+import numpy as np
 import requests
-from vmd import molecule, atomsel
-import pymol2
 import os
-from Bio.PDB import PDBParser, PDBIO, Select
 from io import StringIO
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from application.services.superposition import superpose_pdb, SuperpositionError
+from application.services.temp_files import scoped_temp_dir, VMD_LOCK
+from application.services.backends import BackendUnavailable, get_backend
+from application.services.structure_store import load_pdb, put_pdb, release_pdbs, row_hashes
+from application.services.coordinate_store import write_structures
+from application.services.db_connection import get_connection_manager
+from application.services.result_cache import invalidate_foldseek_entries, invalidate_uniprot_accessions
+from application.services.summary_tables import (
+    ensure_summary_tables, refresh_foldseek_summary, refresh_uniprot_summary
+)
+
+
+def create_http_session(pool_size=10, retries=3, backoff_factor=1.0):
+    """
+    Crea una sesión HTTP con pool de conexiones y reintentos con backoff exponencial.
+
+    Args:
+        pool_size (int): Número máximo de conexiones reutilizables por host.
+        retries (int): Número de reintentos ante errores de conexión o 5xx.
+        backoff_factor (float): Factor de espera entre reintentos (1s, 2s, 4s...).
+
+    Returns:
+        requests.Session: Sesión lista para compartir entre hilos.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 class StructureProcessor:
-    def __init__(self, db_path):
+    def __init__(self, db_path, session=None, cache=None, aligner="kabsch"):
+        """
+        Args:
+            db_path (str): Ruta de la base de datos.
+            session (requests.Session): Sesión HTTP compartida (opcional).
+            cache (StructureCache): Caché de modelos (por defecto, la definida en Config).
+            aligner (str): "kabsch" (motor NumPy, con PyMOL como respaldo) o "pymol".
+        """
         self.db_path = db_path
+        self._session = session
+        self._cache = cache
+        self.aligner = aligner
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = create_http_session()
+        return self._session
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            from application.services.structure_cache import StructureCache
+            self._cache = StructureCache.from_config()
+        return self._cache
+
+    def process_all_valid_structures(self, pipelined=False, **pipeline_options):
+        """
+        Process all valid structures (both UniProt and FoldSeek) from database.
+
+        Args:
+            pipelined (bool): Si es True, usa IngestionPipeline (descargas concurrentes,
+                corte/alineamiento en procesos y escritura por lotes con checkpoints).
+            **pipeline_options: Opciones adicionales para IngestionPipeline.
+        """
+        self.ensure_schema()
+        if pipelined:
+            from application.services.ingestion_pipeline import IngestionPipeline
+            pipeline_options.setdefault("session", self._session)
+            pipeline_options.setdefault("cache", self._cache)
+            return IngestionPipeline(self.db_path, **pipeline_options).run()
 
-    def process_all_valid_structures(self):
-        """Process all valid structures (both UniProt and FoldSeek) from database"""
         print("Processing UniProt structures...")
         self.process_uniprot_structures(self.db_path)
 
         print("Processing FoldSeek structures...")
         self.process_foldseek_structures(self.db_path)
 
+    def ensure_schema(self):
+        """Aplica a bases de datos existentes las columnas añadidas al esquema."""
+        from database.create_db import upgrade_database
+        upgrade_database(self.db_path)
+        ensure_summary_tables(self.db_path)
+
+    def fetch_pdb(self, download_link):
+        """
+        Obtiene un archivo de estructura a través de la caché local; sólo se descarga
+        (con la sesión compartida) si no está cacheado.
+
+        Args:
+            download_link (str): URL del modelo PDB/AlphaFold.
+
+        Returns:
+            str: Contenido del archivo, o None si no está disponible.
+        """
+        return self.cache.fetch(download_link, self._download)
+
+    def _download(self, download_link):
+        try:
+            response = self.session.get(download_link, timeout=60)
+        except requests.exceptions.RequestException as e:
+            print(f"Download failed for {download_link}: {e}")
+            return None
+        if response.status_code != 200:
+            return None
+        return response.content.decode('utf-8')
+
+    def get_valid_accessions(self, db_path):
+        """Obtiene los accession numbers con zonas VSD válidas y estructura 3D disponible."""
+        with get_connection_manager(db_path).reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT DISTINCT A.source_id
+                FROM Alignments A
+                JOIN AlignedZones AZ ON A.alignment_id = AZ.alignment_id
+    			JOIN ThreeDStructures TD ON A.source_id = TD.accession_number
+                WHERE AZ.vsd_valido = 1 AND (TD.has_alphafold = 1 OR TD.has_pdb =1 )
+            ''')
+            accessions = [row[0] for row in cursor.fetchall()]
+        return accessions
+
+    def get_valid_foldseek_entries(self, db_path):
+        """Obtiene las entradas FoldSeek (id, enlace, inicio, fin) con zonas VSD válidas."""
+        with get_connection_manager(db_path).reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT DISTINCT F.foldseek_id, F.hyperlink, F.dbStartPos, F.dbEndPos
+                FROM FoldSeek F
+    			JOIN FoldSeekAlignmentDetails fad ON F.foldseek_id = fad.foldseek_id
+    			JOIN FoldSeekAlignedZones faz ON fad.alignment_detail_id = faz.alignment_detail_id
+                WHERE alphafold_pdb IS NOT NULL AND database_name != 'gmgcl_id' AND vsd_valido = 1
+            ''')
+            entries = cursor.fetchall()
+        return entries
+
     def process_uniprot_structures(self,db_path):
-        # Get valid accessions
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT DISTINCT A.source_id
-            FROM Alignments A
-            JOIN AlignedZones AZ ON A.alignment_id = AZ.alignment_id
-			JOIN ThreeDStructures TD ON A.source_id = TD.accession_number
-            WHERE AZ.vsd_valido = 1 AND (TD.has_alphafold = 1 OR TD.has_pdb =1 )
-        ''')
-        accessions = [row[0] for row in cursor.fetchall()]
-        conn.close()
-
-        for accession_number in accessions:
+        for accession_number in self.get_valid_accessions(db_path):
             structures = self.get_protein_structures(db_path, accession_number)
             for structure_id, pdb_id, resolution, download_link, source in structures:
                 if self.process_structure(db_path, accession_number, structure_id, source, pdb_id, resolution, download_link):
                     break
 
     def process_foldseek_structures(self,db_path):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT F.foldseek_id, F.hyperlink, F.dbStartPos, F.dbEndPos
-            FROM FoldSeek F
-			JOIN FoldSeekAlignmentDetails fad ON F.foldseek_id = fad.foldseek_id
-			JOIN FoldSeekAlignedZones faz ON fad.alignment_detail_id = faz.alignment_detail_id
-            WHERE alphafold_pdb IS NOT NULL AND database_name != 'gmgcl_id' AND vsd_valido = 1
-        ''')
-        entries = cursor.fetchall()
-        conn.close()
-
-        for foldseek_id, download_link, start_pos, end_pos in entries:
+        for foldseek_id, download_link, start_pos, end_pos in self.get_valid_foldseek_entries(db_path):
             self.process_foldseek_entry(db_path, foldseek_id, download_link, start_pos, end_pos)
 
     def get_protein_structures(self, db_path, accession_number):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Consulta para PDB
-        cursor.execute('''
-            SELECT P.pdb_entry_id, P.pdb_id, P.resolution, P.download_link, 'PDB' as source
-            FROM PDBEntries P
-            JOIN ThreeDStructures T ON P.structure_id = T.structure_id
-            WHERE T.accession_number = ? AND T.has_pdb = 1
-        ''', (accession_number,))
-        pdb_results = cursor.fetchall()
-
-        # Consulta para AlphaFold
-        cursor.execute('''
-            SELECT AF.alphafold_id, AF.identifier, NULL, AF.download_link, 'AlphaFold' as source
-            FROM AlphaFoldData AF
-            JOIN ThreeDStructures T ON AF.structure_id = T.structure_id
-            WHERE T.accession_number = ? AND T.has_alphafold = 1
-        ''', (accession_number,))
-        alphafold_results = cursor.fetchall()
-
-        conn.close()
+        with get_connection_manager(db_path).reader() as conn:
+            cursor = conn.cursor()
+
+            # Consulta para PDB
+            cursor.execute('''
+                SELECT P.pdb_entry_id, P.pdb_id, P.resolution, P.download_link, 'PDB' as source
+                FROM PDBEntries P
+                JOIN ThreeDStructures T ON P.structure_id = T.structure_id
+                WHERE T.accession_number = ? AND T.has_pdb = 1
+            ''', (accession_number,))
+            pdb_results = cursor.fetchall()
+
+            # Consulta para AlphaFold
+            cursor.execute('''
+                SELECT AF.alphafold_id, AF.identifier, NULL, AF.download_link, 'AlphaFold' as source
+                FROM AlphaFoldData AF
+                JOIN ThreeDStructures T ON AF.structure_id = T.structure_id
+                WHERE T.accession_number = ? AND T.has_alphafold = 1
+            ''', (accession_number,))
+            alphafold_results = cursor.fetchall()
+
 
         # Combinar los resultados
         structures = pdb_results + alphafold_results
         return structures
 
     def process_structure(self,db_path, accession_number, structure_id, source, pdb_id, resolution, download_link):
-        response = requests.get(download_link)
-        if response.status_code != 200:
+        pdb_content = self.fetch_pdb(download_link)
+        if pdb_content is None:
             return False
 
-        pdb_content = response.content.decode('utf-8')
         seq = self.get_sequence_from_db(db_path, accession_number)
         if not seq:
             return False
 
-        aligned_pdb = self.cut_and_align_pdb(db_path, pdb_content, seq, accession_number)
-        if not aligned_pdb:
+        result = self.cut_and_align_pdb(db_path, pdb_content, seq, accession_number)
+        if not result:
             return False
 
         success_info = f"{source}, {pdb_id}, {resolution or download_link}"
-        self.store_aligned_pdb_uniprot(db_path, accession_number, aligned_pdb, success_info)
+        self.store_aligned_pdb_uniprot(db_path, accession_number, result["pdb"], success_info,
+                                       rmsd=result["rmsd"], aligned_atoms=result["aligned_atoms"])
         return True
 
     def get_sequence_from_db(self,db_path, accession_number):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT seq FROM Alignments WHERE source_id = ?
-        ''', (accession_number,))
-        seq = cursor.fetchone()
-        conn.close()
+        with get_connection_manager(db_path).reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT seq FROM Alignments WHERE source_id = ?
+            ''', (accession_number,))
+            seq = cursor.fetchone()
         return seq[0].replace('-', '') if seq else None
 
+    def get_alignment_sequences_uniprot(self, db_path, accession_number):
+        """
+        Returns:
+            tuple: (seq_ref, seq) alineadas del accession, o (None, None).
+        """
+        with get_connection_manager(db_path).reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT seq_ref, seq FROM Alignments WHERE source_id = ?
+            ''', (accession_number,))
+            row = cursor.fetchone()
+        return row if row else (None, None)
+
     def get_reference_pdb_uniprot(self, db_path, accession_number):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT R.pdb 
-            FROM ReferenceSequences R
-            JOIN Alignments A ON R.reference_sequence_id = A.reference_sequence_id
-            WHERE A.source_id = ?
-        ''', (accession_number,))
-        ref_pdb = cursor.fetchone()
-        conn.close()
+        with get_connection_manager(db_path).reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT R.pdb_hash, R.pdb 
+                FROM ReferenceSequences R
+                JOIN Alignments A ON R.reference_sequence_id = A.reference_sequence_id
+                WHERE A.source_id = ?
+            ''', (accession_number,))
+            row = cursor.fetchone()
+            ref_pdb = (load_pdb(conn, row[0], row[1]),) if row else None
         
         # If no reference PDB found, use the water-containing reference
         if not ref_pdb or not ref_pdb[0]:
@@ -133,79 +247,90 @@ class StructureProcessor:
         return ref_pdb[0] if ref_pdb else None
 
     def cut_and_align_pdb(self, db_path, pdb_content, sequence, accession_number):
-        temp_pdb = f"temp_{os.getpid()}.pdb"
-        cut_pdb = f"cut_{os.getpid()}.pdb"
+        cut_pdb_content = self.cut_primary_chain(pdb_content, sequence)
+        if not cut_pdb_content:
+            return None
 
-        with open(temp_pdb, 'w') as f:
-            f.write(pdb_content)
+        ref_pdb = self.get_reference_pdb_uniprot(db_path, accession_number)
+        if not ref_pdb:
+            return None
 
-        mol_id = molecule.load('pdb', temp_pdb)
-        
-        # Primera selección: encontrar cadena principal con la secuencia
-        protein_selection = atomsel(f"protein and sequence {sequence}", molid=mol_id)
+        seq_ref, seq = self.get_alignment_sequences_uniprot(db_path, accession_number)
+        return self.align_pdb(ref_pdb, cut_pdb_content, seq_ref, seq)
 
-        if len(protein_selection) == 0:
-            # Try without sequence constraint if nothing found
-            protein_selection = atomsel("protein", molid=mol_id)
-            if len(protein_selection) == 0:
-                return None
+    def cut_primary_chain(self, pdb_content, sequence):
+        """
+        Extrae con VMD la cadena principal que contiene ``sequence`` junto con todas las aguas.
 
-        chains = protein_selection.get('chain')
-        primary_chain = sorted(set(chains))[0] if chains else None
-        
-        if primary_chain:
-            # Asegurarse de incluir TODAS las moléculas de agua
-            final_selection = atomsel(f"(chain {primary_chain} and protein) or (resname HOH or resname WAT)", molid=mol_id)
-            final_selection.write('pdb', cut_pdb)
-        else:
-            # If no chain identified, try to get all protein and water
-            final_selection = atomsel("protein or resname HOH or resname WAT", molid=mol_id)
-            final_selection.write('pdb', cut_pdb)
+        Los archivos intermedios viven en un directorio temporal propio de cada llamada y
+        el acceso a VMD se serializa con VMD_LOCK, por lo que es seguro entre hilos.
 
-        with open(cut_pdb, 'r') as f:
-            cut_pdb_content = f.read()
+        Returns:
+            str: PDB recortado, o None si no hay proteína.
+        """
+        with scoped_temp_dir(prefix="cut_") as work_dir, VMD_LOCK:
+            temp_pdb = os.path.join(work_dir, "input.pdb")
+            cut_pdb = os.path.join(work_dir, "cut.pdb")
 
-        os.remove(temp_pdb)
-        os.remove(cut_pdb)
+            with open(temp_pdb, 'w') as f:
+                f.write(pdb_content)
 
-        ref_pdb = self.get_reference_pdb_uniprot(db_path, accession_number)
-        if not ref_pdb:
-            return None
+            vmd = get_backend("vmd")
+            molecule, atomsel = vmd.molecule, vmd.atomsel
+            mol_id = molecule.load('pdb', temp_pdb)
+            try:
+                # Primera selección: encontrar cadena principal con la secuencia
+                protein_selection = atomsel(f"protein and sequence {sequence}", molid=mol_id)
 
-        # En PyMOL, asegurarse de preservar moléculas HETATM (incluidas aguas)
-        with pymol2.PyMOL() as pymol_session:
-            pymol_session.cmd.read_pdbstr(ref_pdb, "reference")
-            pymol_session.cmd.read_pdbstr(cut_pdb_content, "target")
-            # Primero alinear solo usando la proteína
-            pymol_session.cmd.align("target and polymer", "reference and polymer")
-            # Obtener el PDB completo incluyendo aguas
-            aligned_pdb = pymol_session.cmd.get_pdbstr("target")
+                if len(protein_selection) == 0:
+                    # Try without sequence constraint if nothing found
+                    protein_selection = atomsel("protein", molid=mol_id)
+                    if len(protein_selection) == 0:
+                        return None
 
-        return aligned_pdb
+                chains = protein_selection.get('chain')
+                primary_chain = sorted(set(chains))[0] if chains else None
 
-    def store_aligned_pdb_uniprot(self, db_path, accession_number, aligned_pdb, success_info):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE Alignments
-            SET pdb = ?, success_info = ?
-            WHERE source_id = ?
-        ''', (aligned_pdb, success_info, accession_number))
-        conn.commit()
-        conn.close()
+                if primary_chain:
+                    # Asegurarse de incluir TODAS las moléculas de agua
+                    final_selection = atomsel(f"(chain {primary_chain} and protein) or (resname HOH or resname WAT)", molid=mol_id)
+                else:
+                    # If no chain identified, try to get all protein and water
+                    final_selection = atomsel("protein or resname HOH or resname WAT", molid=mol_id)
+                final_selection.write('pdb', cut_pdb)
+            finally:
+                molecule.delete(mol_id)
+
+            with open(cut_pdb, 'r') as f:
+                return f.read()
+
+    def store_aligned_pdb_uniprot(self, db_path, accession_number, aligned_pdb, success_info,
+                                  rmsd=None, aligned_atoms=None):
+        with get_connection_manager(db_path).writer() as conn:
+            previous = row_hashes(conn, "Alignments", "source_id", [accession_number])
+            digest = put_pdb(conn, aligned_pdb)
+            conn.execute('''
+                UPDATE Alignments
+                SET pdb = NULL, pdb_hash = ?, success_info = ?, rmsd = ?, aligned_atoms = ?
+                WHERE source_id = ?
+            ''', (digest, success_info, rmsd, aligned_atoms, accession_number))
+            release_pdbs(conn, previous - {digest})
+            refresh_uniprot_summary(conn, accession_number, touch=True)
+            invalidate_uniprot_accessions(conn, [accession_number])
+        write_structures([(digest, aligned_pdb)])
 
     def get_reference_pdb_foldseek(self, db_path, foldseek_id):
         # Este método debe asegurarse de cargar un PDB con agua
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT R.pdb 
-            FROM ReferenceSequences R
-            JOIN FoldSeek F ON R.reference_sequence_id = F.id_referencia
-            WHERE F.foldseek_id = ?
-        ''', (foldseek_id,))
-        ref_pdb = cursor.fetchone()
-        conn.close()
+        with get_connection_manager(db_path).reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT R.pdb_hash, R.pdb 
+                FROM ReferenceSequences R
+                JOIN FoldSeek F ON R.reference_sequence_id = F.id_referencia
+                WHERE F.foldseek_id = ?
+            ''', (foldseek_id,))
+            row = cursor.fetchone()
+            ref_pdb = (load_pdb(conn, row[0], row[1]),) if row else None
         
         # Si no hay PDB de referencia con agua, usar explícitamente el archivo de respaldo con agua
         water_pdb_path = os.path.join(os.path.dirname(db_path), "vsd_water_bk_test.pdb")
@@ -231,57 +356,102 @@ class StructureProcessor:
         return ref_pdb[0] if ref_pdb else None
 
     def process_foldseek_entry(self, db_path, foldseek_id, download_link, start_pos, end_pos):
-        attempts = 3
-        for attempt in range(attempts):
-            try:
-                response = requests.get(download_link)
-                if response.status_code == 200:
-                    foldseek_pdb_content = response.text
-                    ref_pdb = self.get_reference_pdb_foldseek(db_path, foldseek_id)
-                    if not ref_pdb:
-                        return False
-
-                    cut_pdb = self.cut_pdb_by_position(foldseek_pdb_content, start_pos, end_pos)
-                    aligned_pdb = self.align_pdb(ref_pdb, cut_pdb)
-                    if not aligned_pdb:
-                        return False
-
-                    self.store_aligned_pdb_foldseek(db_path, foldseek_id, aligned_pdb)
-                    return True
-            except requests.exceptions.RequestException as e:
-                print(f"Attempt {attempt + 1} failed: {e}")
-                time.sleep(5)
-
-        return False
+        # Los reintentos con backoff los gestiona el adaptador HTTP de la sesión
+        foldseek_pdb_content = self.fetch_pdb(download_link)
+        if foldseek_pdb_content is None:
+            return False
+
+        ref_pdb = self.get_reference_pdb_foldseek(db_path, foldseek_id)
+        if not ref_pdb:
+            return False
+
+        ref_aligned, target_aligned = self.get_alignment_sequences_foldseek(db_path, foldseek_id)
+        cut_pdb = self.cut_pdb_by_position(foldseek_pdb_content, start_pos, end_pos)
+        result = self.align_pdb(ref_pdb, cut_pdb, ref_aligned, target_aligned)
+        if not result:
+            return False
+
+        self.store_aligned_pdb_foldseek(db_path, foldseek_id, result["pdb"],
+                                        rmsd=result["rmsd"], aligned_atoms=result["aligned_atoms"])
+        return True
+
+    def get_alignment_sequences_foldseek(self, db_path, foldseek_id):
+        """
+        Returns:
+            tuple: (reference_aligned, target_aligned) de la entrada FoldSeek, o (None, None).
+        """
+        with get_connection_manager(db_path).reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT reference_aligned, target_aligned
+                FROM FoldSeekAlignmentDetails
+                WHERE foldseek_id = ?
+            ''', (foldseek_id,))
+            row = cursor.fetchone()
+        return row if row else (None, None)
 
     def cut_pdb_by_position(self, pdb_content, start_pos, end_pos):
-        parser = PDBParser(QUIET=True)
+        bio_pdb = get_backend("biopython")
+        parser = bio_pdb.PDBParser(QUIET=True)
         structure = parser.get_structure("foldseek", StringIO(pdb_content))
 
-        class ResidueSelect(Select):
+        class ResidueSelect(bio_pdb.Select):
             def accept_residue(self, residue):
                 return start_pos <= residue.id[1] <= end_pos
 
         output_io = StringIO()
-        io = PDBIO()
+        io = bio_pdb.PDBIO()
         io.set_structure(structure)
         io.save(output_io, ResidueSelect())
         return output_io.getvalue()
 
-    def align_pdb(self, ref_pdb, target_pdb):
+    def align_pdb(self, ref_pdb, target_pdb, ref_aligned=None, target_aligned=None):
+        """
+        Superpone ``target_pdb`` sobre ``ref_pdb``.
+
+        Con las secuencias alineadas disponibles se usa el motor Kabsch (NumPy) sobre los
+        CA emparejados; si no hay alineamiento, no se obtienen suficientes pares o se
+        configuró ``aligner="pymol"``, se recurre a ``cmd.align`` de PyMOL.
+
+        Returns:
+            dict: ``pdb`` alineado (con aguas y heteroátomos), ``rmsd``, ``aligned_atoms``
+            y ``method``; None si el alineamiento falla.
+        """
+        if self.aligner == "kabsch" and ref_aligned and target_aligned:
+            try:
+                return superpose_pdb(ref_pdb, target_pdb, ref_aligned, target_aligned)
+            except (SuperpositionError, ValueError, np.linalg.LinAlgError) as e:
+                print(f"Kabsch superposition failed, falling back to PyMOL: {e}")
+        return self.align_pdb_pymol(ref_pdb, target_pdb)
+
+    def align_pdb_pymol(self, ref_pdb, target_pdb):
+        try:
+            pymol2 = get_backend("pymol2")
+        except BackendUnavailable:
+            print("PyMOL no está disponible para el alineamiento de respaldo")
+            return None
+
+        # En PyMOL, asegurarse de preservar moléculas HETATM (incluidas aguas)
         with pymol2.PyMOL() as pymol_session:
             pymol_session.cmd.read_pdbstr(ref_pdb, "reference")
             pymol_session.cmd.read_pdbstr(target_pdb, "target")
-            pymol_session.cmd.align("target", "reference")
-            return pymol_session.cmd.get_pdbstr("target")
-
-    def store_aligned_pdb_foldseek(self,db_path, foldseek_id, aligned_pdb):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE FoldSeekAlignmentDetails
-            SET pdb = ?
-            WHERE foldseek_id = ?
-        ''', (aligned_pdb, foldseek_id))
-        conn.commit()
-        conn.close()
\ No newline at end of file
+            # Alinear solo usando la proteína
+            rmsd, aligned_atoms = pymol_session.cmd.align("target and polymer", "reference and polymer")[:2]
+            # Obtener el PDB completo incluyendo aguas
+            aligned_pdb = pymol_session.cmd.get_pdbstr("target")
+
+        return {"pdb": aligned_pdb, "rmsd": round(rmsd, 3), "aligned_atoms": aligned_atoms, "method": "pymol"}
+
+    def store_aligned_pdb_foldseek(self,db_path, foldseek_id, aligned_pdb, rmsd=None, aligned_atoms=None):
+        with get_connection_manager(db_path).writer() as conn:
+            previous = row_hashes(conn, "FoldSeekAlignmentDetails", "foldseek_id", [foldseek_id])
+            digest = put_pdb(conn, aligned_pdb)
+            conn.execute('''
+                UPDATE FoldSeekAlignmentDetails
+                SET pdb = NULL, pdb_hash = ?, rmsd = ?, aligned_atoms = ?
+                WHERE foldseek_id = ?
+            ''', (digest, rmsd, aligned_atoms, foldseek_id))
+            release_pdbs(conn, previous - {digest})
+            refresh_foldseek_summary(conn, foldseek_id, touch=True)
+            invalidate_foldseek_entries(conn, [foldseek_id])
+        write_structures([(digest, aligned_pdb)])
\ No newline at end of file
@@ -0,0 +1,252 @@
+"""
+Almacenamiento de los PDB en la tabla StructureBlobs: cada estructura se guarda una sola
+vez, comprimida (zstd si está instalado, si no zlib) e identificada por el SHA-256 de su
+texto. Alignments, FoldSeekAlignmentDetails y ReferenceSequences sólo guardan ese hash
+en ``pdb_hash``; la columna ``pdb`` se conserva para las bases aún no migradas.
+
+Migración de una base existente:
+    python -m application.services.structure_store database/proteins_discovery.db --vacuum
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import zlib
+
+from application.services.result_cache import ResultCache
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional: sin él se comprime con zlib
+    zstandard = None
+
+# Tablas con una estructura por fila: tabla -> clave primaria
+PDB_TABLES = {
+    "Alignments": "alignment_id",
+    "FoldSeekAlignmentDetails": "alignment_detail_id",
+    "ReferenceSequences": "reference_sequence_id",
+}
+
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+
+# Textos ya descomprimidos, por hash (el contenido de un hash nunca cambia)
+_texts = ResultCache(max_entries=64, max_bytes=256 * 1024 ** 2)
+
+
+def pdb_hash(pdb_text):
+    return hashlib.sha256(pdb_text.encode()).hexdigest()
+
+
+def compress(data):
+    """
+    Returns:
+        tuple: (códec, bytes comprimidos).
+    """
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "zlib", zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("La estructura está comprimida con zstd y zstandard no está instalado")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return bytes(data)
+
+
+def put_pdb(conn, pdb_text):
+    """
+    Guarda un PDB (si no existía ya) dentro de la transacción de ``conn``.
+
+    Args:
+        conn (sqlite3.Connection): Conexión de escritura.
+        pdb_text (str): Contenido PDB.
+
+    Returns:
+        str: Hash del PDB, o None si ``pdb_text`` está vacío.
+    """
+    if not pdb_text:
+        return None
+    digest = pdb_hash(pdb_text)
+    exists = conn.execute("SELECT 1 FROM StructureBlobs WHERE pdb_hash = ?", (digest,)).fetchone()
+    if not exists:
+        data = pdb_text.encode()
+        codec, blob = compress(data)
+        conn.execute("INSERT OR IGNORE INTO StructureBlobs (pdb_hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                     (digest, codec, len(data), blob))
+    return digest
+
+
+def get_pdb(conn, digest):
+    """
+    Args:
+        conn (sqlite3.Connection): Conexión de lectura.
+        digest (str): Hash del PDB.
+
+    Returns:
+        str: Contenido PDB o None si no existe.
+    """
+    text = _texts.get(("pdb", digest))
+    if text is not None:
+        return text
+    row = conn.execute("SELECT codec, data FROM StructureBlobs WHERE pdb_hash = ?", (digest,)).fetchone()
+    if row is None:
+        return None
+    text = decompress(row[0], row[1]).decode()
+    _texts.put(("pdb", digest), text)
+    return text
+
+
+def load_pdb(conn, digest, legacy_pdb=None):
+    """PDB de una fila: desde StructureBlobs si tiene hash, si no el texto de la columna ``pdb``."""
+    if digest:
+        return get_pdb(conn, digest)
+    return legacy_pdb
+
+
+def store_row_pdb(conn, table, key, pdb_text):
+    """Guarda el PDB de una fila de ``table`` (una de PDB_TABLES) y vacía su columna ``pdb``."""
+    conn.execute(f"UPDATE {table} SET pdb_hash = ?, pdb = NULL WHERE {PDB_TABLES[table]} = ?",
+                 (put_pdb(conn, pdb_text), key))
+
+
+def _referenced_query():
+    return " UNION ".join(f"SELECT pdb_hash FROM {table} WHERE pdb_hash IS NOT NULL" for table in PDB_TABLES)
+
+
+def prune_unreferenced(conn):
+    """
+    Elimina las estructuras que ya no referencia ninguna fila.
+
+    Returns:
+        int: Estructuras eliminadas.
+    """
+    return conn.execute(f"DELETE FROM StructureBlobs WHERE pdb_hash NOT IN ({_referenced_query()})").rowcount
+
+
+def row_hashes(conn, table, column, keys):
+    """Hashes que referencian ahora las filas de ``table`` con ``column`` en ``keys``."""
+    keys = list(keys)
+    if not keys:
+        return set()
+    placeholders = ", ".join("?" for _ in keys)
+    rows = conn.execute(f"SELECT pdb_hash FROM {table} WHERE {column} IN ({placeholders}) AND pdb_hash IS NOT NULL",
+                        keys)
+    return {row[0] for row in rows}
+
+
+def release_pdbs(conn, digests):
+    """
+    Elimina, de entre ``digests``, las estructuras que ya no referencia ninguna fila;
+    se llama tras reemplazar el PDB de una fila con los hashes que tenía antes.
+
+    Returns:
+        int: Estructuras eliminadas.
+    """
+    digests = [digest for digest in digests if digest]
+    if not digests:
+        return 0
+    placeholders = ", ".join("?" for _ in digests)
+    return conn.execute(f"""
+        DELETE FROM StructureBlobs
+        WHERE pdb_hash IN ({placeholders}) AND pdb_hash NOT IN ({_referenced_query()})
+    """, digests).rowcount
+
+
+def schema_ready(conn):
+    """Indica si la base ya tiene StructureBlobs y la columna pdb_hash en todas las tablas de PDB_TABLES."""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if "StructureBlobs" not in tables:
+        return False
+    return all("pdb_hash" in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+               for table in PDB_TABLES if table in tables)
+
+
+def ensure_schema(db_path):
+    """
+    Crea StructureBlobs y las columnas pdb_hash en una base existente que aún no las tenga.
+
+    Se llama también al arrancar la aplicación web: con el esquema al día no escribe
+    nada, y si la base es de sólo lectura (o otro proceso la migró a la vez) avisa en
+    lugar de fallar.
+    """
+    from database.create_db import STRUCTURE_BLOBS_TABLE, add_missing_columns, database_exists
+    if not database_exists(db_path):
+        return
+    conn = sqlite3.connect(db_path)
+    try:
+        if schema_ready(conn):
+            return
+        conn.execute(STRUCTURE_BLOBS_TABLE)
+        add_missing_columns(conn.cursor())
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        if not schema_ready(conn):
+            print(f"No se pudo actualizar el esquema de {db_path} ({e}); ejecute "
+                  f"'python -m application.services.structure_store {db_path}'")
+    finally:
+        conn.close()
+
+
+def migrate_database(db_path, batch_size=200, vacuum=False):
+    """
+    Traslada a StructureBlobs los PDB guardados como texto. Cada lote se confirma por
+    separado, de modo que la migración puede interrumpirse y reanudarse.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        batch_size (int): Filas por transacción.
+        vacuum (bool): Compactar el archivo al terminar (recupera el espacio liberado).
+
+    Returns:
+        dict: Filas migradas por tabla.
+    """
+    from database.create_db import upgrade_database
+    upgrade_database(db_path)
+
+    migrated = {}
+    conn = sqlite3.connect(db_path)
+    try:
+        for table, key_column in PDB_TABLES.items():
+            migrated[table] = 0
+            while True:
+                rows = conn.execute(f"SELECT {key_column}, pdb FROM {table} WHERE pdb IS NOT NULL LIMIT ?",
+                                    (batch_size,)).fetchall()
+                if not rows:
+                    break
+                with conn:
+                    for key, pdb_text in rows:
+                        store_row_pdb(conn, table, key, pdb_text)
+                migrated[table] += len(rows)
+                print(f"{table}: {migrated[table]} estructuras migradas")
+        with conn:
+            pruned = prune_unreferenced(conn)
+        if pruned:
+            print(f"{pruned} estructuras sin referencias eliminadas")
+        if vacuum:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", nargs="?", default=os.path.join("database", "proteins_discovery.db"))
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--vacuum", action="store_true")
+    args = parser.parse_args()
+
+    size_before = os.path.getsize(args.db_path)
+    migrated = migrate_database(args.db_path, args.batch_size, args.vacuum)
+    print(f"Migradas: {migrated}")
+    print(f"Tamaño: {size_before / 1024 ** 2:.1f} MB -> {os.path.getsize(args.db_path) / 1024 ** 2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
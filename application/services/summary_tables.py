@@ -0,0 +1,215 @@
+import sqlite3
+
+from application.services.db_connection import get_connection_manager
+from database.create_db import SUMMARY_TABLES
+
+# Criterio de la página principal: alineamientos con PDB guardado y al menos una zona VSD válida
+FOLDSEEK_SUMMARY_SELECT = """
+    SELECT fad.alignment_detail_id, f.foldseek_id, f.database_name, f.alphafold_pdb
+    FROM FoldSeek f
+    JOIN FoldSeekAlignmentDetails fad ON f.foldseek_id = fad.foldseek_id
+    JOIN ReferenceSequences rz ON f.id_referencia = rz.reference_sequence_id
+    WHERE f.database_name != 'gmgcl_id'
+    AND (fad.pdb_hash IS NOT NULL OR fad.pdb IS NOT NULL)
+    AND EXISTS (
+        SELECT 1 FROM FoldSeekAlignedZones faz
+        WHERE faz.alignment_detail_id = fad.alignment_detail_id AND faz.vsd_valido = 1
+    )
+"""
+
+UNIPROT_SUMMARY_SELECT = """
+    SELECT a.alignment_id, p.accession_number, p.name, MAX(ts.has_pdb), MAX(ts.has_alphafold)
+    FROM Proteins p
+    JOIN Alignments a ON p.accession_number = a.source_id
+    JOIN ThreeDStructures ts ON p.accession_number = ts.accession_number
+    WHERE (a.pdb_hash IS NOT NULL OR a.pdb IS NOT NULL)
+    AND EXISTS (
+        SELECT 1 FROM AlignedZones az
+        WHERE az.alignment_id = a.alignment_id AND az.vsd_valido = 1
+    )
+"""
+
+# Condiciones de los upserts: la fila listada cambió respecto de la almacenada
+FOLDSEEK_SUMMARY_CHANGED = """
+    foldseek_id IS NOT excluded.foldseek_id
+    OR database_name IS NOT excluded.database_name
+    OR target IS NOT excluded.target
+"""
+
+UNIPROT_SUMMARY_CHANGED = """
+    accession_number IS NOT excluded.accession_number
+    OR protein_name IS NOT excluded.protein_name
+    OR has_pdb IS NOT excluded.has_pdb
+    OR has_alphafold IS NOT excluded.has_alphafold
+"""
+
+SOURCE_VERSIONS_TABLE = next(statement for statement in SUMMARY_TABLES if "summary_versions" in statement)
+
+# Por fuente: tabla materializada y columna con el ID del alineamiento
+SUMMARY_KEYS = {
+    "foldseek": ("foldseek_summary_view", "alignment_detail_id"),
+    "uniprot": ("uniprot_summary_view", "alignment_id"),
+}
+
+
+def create_summary_tables(conn):
+    """Crea, dentro de la transacción de ``conn``, las tablas materializadas que falten."""
+    for statement in SUMMARY_TABLES:
+        conn.execute(statement)
+
+
+def ensure_summary_tables(db_path):
+    """
+    Crea las tablas materializadas si no existen y las llena si están vacías.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+    """
+    with get_connection_manager(db_path).writer() as conn:
+        create_summary_tables(conn)
+        empty = (conn.execute("SELECT COUNT(*) FROM foldseek_summary_view").fetchone()[0] == 0
+                 and conn.execute("SELECT COUNT(*) FROM uniprot_summary_view").fetchone()[0] == 0)
+        if empty:
+            refresh_foldseek_summary(conn)
+            refresh_uniprot_summary(conn)
+
+
+def rebuild_summary_tables(db_path):
+    """Recalcula por completo ambos listados (data_version sólo aumenta en las filas que cambian)."""
+    with get_connection_manager(db_path).writer() as conn:
+        create_summary_tables(conn)
+        refresh_foldseek_summary(conn)
+        refresh_uniprot_summary(conn)
+
+
+def refresh_foldseek_summary(conn, foldseek_id=None, touch=False):
+    """
+    Actualiza de forma incremental foldseek_summary_view dentro de la transacción de ``conn``.
+
+    data_version sólo aumenta en las filas cuyo listado cambia, salvo con ``touch``.
+
+    Args:
+        conn (sqlite3.Connection): Conexión con la transacción en curso.
+        foldseek_id (int): Entrada FoldSeek modificada (None para recalcular todo).
+        touch (bool): Aumentar data_version de todas las filas del alcance (el llamador
+            reescribió sus datos aunque el listado no cambie).
+    """
+    scope, params = ("AND f.foldseek_id = ?", (foldseek_id,)) if foldseek_id is not None else ("", ())
+    changes = conn.total_changes
+    conn.execute(f"""
+        DELETE FROM foldseek_summary_view
+        WHERE {"foldseek_id = ? AND" if foldseek_id is not None else ""}
+        alignment_detail_id NOT IN (SELECT alignment_detail_id FROM ({FOLDSEEK_SUMMARY_SELECT} {scope}))
+    """, params + params)
+    conn.execute(f"""
+        INSERT INTO foldseek_summary_view (alignment_detail_id, foldseek_id, database_name, target)
+        {FOLDSEEK_SUMMARY_SELECT} {scope}
+        ON CONFLICT(alignment_detail_id) DO UPDATE SET
+            foldseek_id = excluded.foldseek_id,
+            database_name = excluded.database_name,
+            target = excluded.target,
+            data_version = data_version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE {"1" if touch else FOLDSEEK_SUMMARY_CHANGED}
+    """, params)
+    if touch or conn.total_changes != changes:
+        bump_source_version(conn, "foldseek")
+
+
+def refresh_uniprot_summary(conn, accession_number=None, touch=False):
+    """
+    Actualiza de forma incremental uniprot_summary_view dentro de la transacción de ``conn``.
+
+    data_version sólo aumenta en las filas cuyo listado cambia, salvo con ``touch``.
+
+    Args:
+        conn (sqlite3.Connection): Conexión con la transacción en curso.
+        accession_number (str): Proteína modificada (None para recalcular todo).
+        touch (bool): Aumentar data_version de todas las filas del alcance (el llamador
+            reescribió sus datos aunque el listado no cambie).
+    """
+    scope, params = ("AND a.source_id = ?", (accession_number,)) if accession_number is not None else ("", ())
+    changes = conn.total_changes
+    conn.execute(f"""
+        DELETE FROM uniprot_summary_view
+        WHERE {"accession_number = ? AND" if accession_number is not None else ""}
+        alignment_id NOT IN (SELECT alignment_id FROM ({UNIPROT_SUMMARY_SELECT} {scope} GROUP BY a.alignment_id))
+    """, params + params)
+    conn.execute(f"""
+        INSERT INTO uniprot_summary_view (alignment_id, accession_number, protein_name, has_pdb, has_alphafold)
+        {UNIPROT_SUMMARY_SELECT} {scope}
+        GROUP BY a.alignment_id
+        ON CONFLICT(alignment_id) DO UPDATE SET
+            accession_number = excluded.accession_number,
+            protein_name = excluded.protein_name,
+            has_pdb = excluded.has_pdb,
+            has_alphafold = excluded.has_alphafold,
+            data_version = data_version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE {"1" if touch else UNIPROT_SUMMARY_CHANGED}
+    """, params)
+    if touch or conn.total_changes != changes:
+        bump_source_version(conn, "uniprot")
+
+
+def touch_summary(conn, source, alignment_ids):
+    """
+    Aumenta data_version de alineamientos listados cuyos datos se reescribieron.
+
+    Args:
+        conn (sqlite3.Connection): Conexión con la transacción en curso.
+        source (str): "foldseek" o "uniprot".
+        alignment_ids (list): alignment_detail_id (FoldSeek) o alignment_id (UniProt).
+    """
+    if not alignment_ids:
+        return
+    table, column = SUMMARY_KEYS[source]
+    conn.executemany(f"""
+        UPDATE {table} SET data_version = data_version + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE {column} = ?
+    """, [(alignment_id,) for alignment_id in alignment_ids])
+    bump_source_version(conn, source)
+
+
+def bump_source_version(conn, source):
+    """
+    Aumenta el contador de la fuente, que versiona los alineamientos no listados.
+
+    Args:
+        conn (sqlite3.Connection): Conexión con la transacción en curso.
+        source (str): "foldseek" o "uniprot".
+    """
+    conn.execute(SOURCE_VERSIONS_TABLE)
+    conn.execute("""
+        INSERT INTO summary_versions (source, version) VALUES (?, 1)
+        ON CONFLICT(source) DO UPDATE SET version = version + 1
+    """, (source,))
+
+
+def get_data_version(conn, source, alignment_id):
+    """
+    Versión de los datos de un alineamiento.
+
+    Para los alineamientos listados es su data_version (siempre positiva). Los que no
+    figuran en el listado usan el contador de la fuente con signo negativo, de modo
+    que cualquier escritura de la fuente también los invalida y ambas numeraciones
+    nunca coinciden.
+
+    Args:
+        conn (sqlite3.Connection): Conexión de lectura.
+        source (str): "foldseek" o "uniprot".
+        alignment_id (int): alignment_detail_id (FoldSeek) o alignment_id (UniProt).
+
+    Returns:
+        int: Versión del alineamiento.
+    """
+    table, column = SUMMARY_KEYS[source]
+    row = conn.execute(f"SELECT data_version FROM {table} WHERE {column} = ?", (alignment_id,)).fetchone()
+    if row:
+        return row[0]
+    try:
+        row = conn.execute("SELECT version FROM summary_versions WHERE source = ?", (source,)).fetchone()
+    except sqlite3.OperationalError:
+        # Base anterior a summary_versions
+        row = None
+    return -row[0] if row else 0
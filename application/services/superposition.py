@@ -0,0 +1,148 @@
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from application.services.pdb_arrays import parse_pdb, format_pdb
+
+
+class SuperpositionError(ValueError):
+    """No fue posible establecer suficientes pares de residuos para superponer."""
+
+
+def map_sequence_to_residues(sequence, structure_sequence):
+    """
+    Asocia cada posición de ``sequence`` a un residuo de la estructura.
+
+    Se busca primero una coincidencia exacta; si la estructura tiene residuos
+    ausentes se recurre a los bloques coincidentes de ``SequenceMatcher``.
+
+    Args:
+        sequence (str): Secuencia sin gaps.
+        structure_sequence (str): Secuencia de los residuos CA de la estructura.
+
+    Returns:
+        np.ndarray: Índice de residuo estructural por posición (-1 si no hay correspondencia).
+    """
+    mapping = np.full(len(sequence), -1, dtype=np.int64)
+    offset = structure_sequence.find(sequence)
+    if offset != -1:
+        mapping[:] = np.arange(offset, offset + len(sequence))
+        return mapping
+
+    matcher = SequenceMatcher(None, sequence, structure_sequence, autojunk=False)
+    for a, b, size in matcher.get_matching_blocks():
+        mapping[a:a + size] = np.arange(b, b + size)
+    return mapping
+
+
+def alignment_pairs(ref_aligned, target_aligned, ref_mapping, target_mapping):
+    """
+    Pares (residuo de referencia, residuo objetivo) definidos por un alineamiento.
+
+    Args:
+        ref_aligned (str): Secuencia de referencia alineada (con gaps).
+        target_aligned (str): Secuencia objetivo alineada (con gaps).
+        ref_mapping (np.ndarray): Mapeo de ``map_sequence_to_residues`` para la referencia.
+        target_mapping (np.ndarray): Mapeo para el objetivo.
+
+    Returns:
+        tuple: Índices de residuo (ref, target) alineados.
+    """
+    length = min(len(ref_aligned), len(target_aligned))
+    ref_cols = np.frombuffer(ref_aligned[:length].encode("ascii", "replace"), dtype=np.uint8) != ord("-")
+    tgt_cols = np.frombuffer(target_aligned[:length].encode("ascii", "replace"), dtype=np.uint8) != ord("-")
+
+    # Posición sin gaps de cada columna en su propia secuencia
+    ref_pos = np.cumsum(ref_cols) - 1
+    tgt_pos = np.cumsum(tgt_cols) - 1
+    both = ref_cols & tgt_cols
+
+    ref_res = ref_mapping[ref_pos[both]]
+    tgt_res = target_mapping[tgt_pos[both]]
+    valid = (ref_res >= 0) & (tgt_res >= 0)
+    return ref_res[valid], tgt_res[valid]
+
+
+def kabsch(mobile, target):
+    """
+    Rotación y traslación óptimas que llevan ``mobile`` sobre ``target``.
+
+    Args:
+        mobile (np.ndarray): Coordenadas (n, 3) a mover.
+        target (np.ndarray): Coordenadas (n, 3) fijas.
+
+    Returns:
+        tuple: (R, t) tales que ``mobile @ R.T + t`` aproxima ``target``.
+    """
+    mobile_center = mobile.mean(axis=0)
+    target_center = target.mean(axis=0)
+    h = (mobile - mobile_center).T @ (target - target_center)
+    u, _, vt = np.linalg.svd(h)
+    d = np.sign(np.linalg.det(vt.T @ u.T))
+    rotation = vt.T @ np.diag([1.0, 1.0, d]) @ u.T
+    return rotation, target_center - mobile_center @ rotation.T
+
+
+def iterative_kabsch(mobile, target, cycles=5, cutoff=2.0):
+    """
+    Ajuste de Kabsch con rechazo iterativo de outliers (mismo criterio que ``cmd.align``:
+    se descartan pares a más de ``cutoff`` veces el RMSD en cada ciclo).
+
+    Returns:
+        tuple: (R, t, rmsd, mask) con la máscara de pares usados en el ajuste final.
+    """
+    mask = np.ones(len(mobile), dtype=bool)
+    for cycle in range(cycles + 1):
+        rotation, translation = kabsch(mobile[mask], target[mask])
+        dist = np.linalg.norm(mobile @ rotation.T + translation - target, axis=1)
+        rmsd = float(np.sqrt(np.mean(dist[mask] ** 2)))
+        # Tras el último ajuste no se recorta: la máscara devuelta es la usada en él
+        if cycle == cycles:
+            break
+        new_mask = dist <= cutoff * rmsd
+        if new_mask.sum() < 3 or np.array_equal(new_mask, mask):
+            break
+        mask = new_mask
+    return rotation, translation, rmsd, mask
+
+
+def superpose_pdb(ref_pdb, target_pdb, ref_aligned, target_aligned, cycles=5, cutoff=2.0):
+    """
+    Superpone ``target_pdb`` sobre ``ref_pdb`` usando los CA emparejados por el alineamiento.
+
+    Args:
+        ref_pdb (str): PDB de referencia.
+        target_pdb (str): PDB a transformar (se conservan aguas y heteroátomos).
+        ref_aligned (str): Secuencia de referencia alineada.
+        target_aligned (str): Secuencia objetivo alineada.
+        cycles (int): Ciclos de rechazo de outliers.
+        cutoff (float): Umbral de rechazo en unidades de RMSD.
+
+    Returns:
+        dict: ``pdb`` transformado, ``rmsd``, ``aligned_atoms`` y ``method``.
+
+    Raises:
+        SuperpositionError: Si hay menos de 3 pares de residuos.
+    """
+    ref_atoms = parse_pdb(ref_pdb)
+    target_atoms = parse_pdb(target_pdb)
+    ref_ca = ref_atoms.ca_indices()
+    target_ca = target_atoms.ca_indices()
+
+    ref_mapping = map_sequence_to_residues(ref_aligned.replace("-", ""), ref_atoms.sequence(ref_ca))
+    target_mapping = map_sequence_to_residues(target_aligned.replace("-", ""), target_atoms.sequence(target_ca))
+    ref_res, target_res = alignment_pairs(ref_aligned, target_aligned, ref_mapping, target_mapping)
+    if len(ref_res) < 3:
+        raise SuperpositionError(f"Sólo {len(ref_res)} pares de residuos alineados")
+
+    mobile = target_atoms.coords[target_ca[target_res]]
+    fixed = ref_atoms.coords[ref_ca[ref_res]]
+    rotation, translation, rmsd, mask = iterative_kabsch(mobile, fixed, cycles=cycles, cutoff=cutoff)
+
+    coords = target_atoms.coords @ rotation.T + translation
+    return {
+        "pdb": format_pdb(target_atoms, coords),
+        "rmsd": round(rmsd, 3),
+        "aligned_atoms": int(mask.sum()),
+        "method": "kabsch",
+    }
@@ -0,0 +1,27 @@
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# VMD mantiene un estado global de moléculas (incluida la "molécula top") que no es
+# seguro compartir entre hilos; toda interacción con VMD debe hacerse con este lock.
+VMD_LOCK = threading.RLock()
+
+
+@contextmanager
+def scoped_temp_dir(prefix="vsd_"):
+    """
+    Directorio temporal exclusivo para la operación en curso; se elimina al salir.
+
+    Args:
+        prefix (str): Prefijo del nombre del directorio.
+
+    Yields:
+        str: Ruta del directorio.
+    """
+    path = tempfile.mkdtemp(prefix=prefix)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
@@ -53,6 +53,8 @@ class VSDTableCreator:
             grado_promedio FLOAT,
             densidad FLOAT,
             grafo BLOB,
+            sequence_hash TEXT,
+            grafo_hash TEXT,
             FOREIGN KEY (vsd_protein_id) REFERENCES ValidVSDProteins(id)
         );
         """
@@ -77,7 +79,7 @@ class UniProtDataInserter:
         WHERE a.alignment_id IN (
             SELECT DISTINCT alignment_id FROM AlignedZones WHERE vsd_valido = 1
         )
-        AND a.pdb IS NOT NULL;
+        AND (a.pdb_hash IS NOT NULL OR a.pdb IS NOT NULL);
         """
         self.db_handler.execute_query(insert_query)
         print("Proteínas UniProt insertadas correctamente.")
@@ -99,7 +101,7 @@ class FoldSeekDataInserter:
         JOIN FoldSeekAlignedZones faz ON fad.alignment_detail_id = faz.alignment_detail_id
         JOIN ReferenceSequences rz ON f.id_referencia = rz.reference_sequence_id
         WHERE f.database_name != 'gmgcl_id'
-        AND fad.pdb IS NOT NULL
+        AND (fad.pdb_hash IS NOT NULL OR fad.pdb IS NOT NULL)
         AND fad.alignment_detail_id IN (
             SELECT DISTINCT faz.alignment_detail_id FROM FoldSeekAlignedZones faz WHERE faz.vsd_valido = 1
         )
@@ -0,0 +1,250 @@
+"""
+Cálculo de las propiedades fisicoquímicas de las zonas alineadas (AlignedZones y
+FoldSeekAlignedZones): hidrofobicidad y volumen promedio de la zona, diferencia con la
+zona de referencia (delta_hydrophobicity, delta_volume), carga de cada residuo del
+objetivo y de la referencia (cargas, cargas_reference) y tipo de carga neta de la zona
+(tipo_carga). También se recalculan ReferenceZones.hydrophobicity y volume con las
+mismas escalas.
+
+Todos los fragmentos se codifican como uint8 (sequence_encoding) y las sumas por zona
+salen de una única matriz de conteos multiplicada por la tabla de cada escala, sin
+recorrer residuo a residuo. Las escalas se eligen por nombre (HYDROPHOBICITY_SCALES,
+VOLUME_SCALES y CHARGE_SCALES) o se pasan como diccionario letra -> valor, y todas las
+filas se reescriben con ``executemany`` en una sola transacción.
+
+Uso:
+    python -m application.services.zone_properties database/proteins_discovery.db --hydrophobicity hopp_woods
+"""
+import argparse
+import os
+
+import numpy as np
+
+from application.services.db_connection import get_connection_manager
+from application.services.reference_zones import get_reference_zones, invalidate_reference_zones
+from application.services.result_cache import invalidate_results
+from application.services.sequence_encoding import (
+    CHARGE_SCALES, HYDROPHOBICITY_SCALES, UNKNOWN, VOLUME_SCALES, composition_counts, encode_many,
+    residue_table, scale_values
+)
+from application.services.summary_tables import (
+    create_summary_tables, refresh_foldseek_summary, refresh_uniprot_summary
+)
+
+DIGITS = 3
+
+# Por tabla: columna con el fragmento alineado, columnas de destino, fuente de la caché de
+# resultados y función que actualiza su listado materializado
+ZONE_TABLES = {
+    "AlignedZones": {
+        "sequence": "aligned_sequence",
+        "hydrophobicity": "hydrophobicity_aligned",
+        "volume": "volume_aligned",
+        "cache": "uniprot",
+        "summary": refresh_uniprot_summary,
+    },
+    "FoldSeekAlignedZones": {
+        "sequence": "fragment",
+        "hydrophobicity": "hydrophobicity",
+        "volume": "volume",
+        "cache": "foldseek",
+        "summary": refresh_foldseek_summary,
+    },
+}
+
+REFERENCE_UPDATE_QUERY = "UPDATE ReferenceZones SET hydrophobicity = ?, volume = ? WHERE zone_id = ?"
+
+# Caracteres de gap: no son residuos y no aportan carga
+GAPS = "-."
+
+# Las consultas de detalle unen las zonas de un alineamiento con GROUP_CONCAT(tipo_carga, ', ')
+# y GROUP_CONCAT(cargas, '| ') y luego las separan: tipo_carga no puede contener ", " ni
+# cargas "| "
+
+
+def zones_query(table):
+    columns = ZONE_TABLES[table]
+    return f"SELECT aligned_zone_id, reference_zone_id, {columns['sequence']} FROM {table}"
+
+
+def update_query(table):
+    columns = ZONE_TABLES[table]
+    return f"""
+        UPDATE {table}
+        SET {columns['hydrophobicity']} = ?, {columns['volume']} = ?, delta_hydrophobicity = ?, delta_volume = ?,
+            tipo_carga = ?, cargas = ?, cargas_reference = ?
+        WHERE aligned_zone_id = ?
+    """
+
+
+def charge_translation(charge):
+    """
+    Tabla para ``str.translate`` que convierte cada residuo en su carga seguida de ", ".
+
+    Args:
+        charge (dict): Carga entera de cada aminoácido (los demás valen 0).
+
+    Returns:
+        dict: Ordinal -> texto ("+1, ", "-1, ", "0, "); los gaps se eliminan.
+    """
+    table = {code: "0, " for code in range(128)}
+    for letter, value in charge.items():
+        text = f"{int(value):+d}, " if value else "0, "
+        table[ord(letter)] = table[ord(letter.lower())] = text
+    for gap in GAPS:
+        table[ord(gap)] = None
+    return table
+
+
+def charge_strings(sequences, charge):
+    """Carga de cada residuo como "+1, 0, -1" (sin gaps) para cada secuencia."""
+    translation = charge_translation(charge)
+    return [(sequence or "").translate(translation)[:-2] for sequence in sequences]
+
+
+def zone_properties(sequences, hydrophobicity="kyte_doolittle", volume="zamyatnin", charge="ph7"):
+    """
+    Hidrofobicidad y volumen promedio y carga neta de un conjunto de fragmentos.
+
+    Los promedios se toman sobre los residuos reconocidos (se excluyen gaps y letras
+    desconocidas); un fragmento sin residuos reconocidos da NaN.
+
+    Args:
+        sequences (list): Fragmentos (str, pueden contener gaps).
+        hydrophobicity (str | dict): Escala de hidrofobicidad.
+        volume (str | dict): Escala de volumen.
+        charge (str | dict): Escala de carga.
+
+    Returns:
+        dict: Arreglos "hydrophobicity", "volume", "net_charge" y "residues" (residuos reconocidos).
+    """
+    codes, offsets = encode_many(sequences)
+    counts = composition_counts(codes, offsets).astype(np.float64)
+    tables = np.column_stack([
+        residue_table(scale_values(hydrophobicity, HYDROPHOBICITY_SCALES)),
+        residue_table(scale_values(volume, VOLUME_SCALES)),
+        residue_table(scale_values(charge, CHARGE_SCALES)),
+    ])
+    sums = counts @ tables
+    residues = counts[:, :UNKNOWN].sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums[:, :2] / residues[:, None]
+    return {"hydrophobicity": means[:, 0], "volume": means[:, 1], "net_charge": sums[:, 2], "residues": residues}
+
+
+def _rounded(values):
+    return [None if value != value else value for value in np.round(values, DIGITS).tolist()]
+
+
+def charge_types(net_charge):
+    """"positiva", "negativa" o "neutra" según el signo de la carga neta."""
+    return np.array(["neutra", "positiva", "negativa"], dtype=object)[np.sign(net_charge).astype(np.int64)].tolist()
+
+
+def zone_rows(zones, reference_zones, hydrophobicity="kyte_doolittle", volume="zamyatnin", charge="ph7"):
+    """
+    Filas de ``update_query`` para un conjunto de zonas alineadas.
+
+    Args:
+        zones (list): Tuplas (aligned_zone_id, reference_zone_id, fragmento alineado).
+        reference_zones (dict): zone_id -> fragmento de referencia.
+        hydrophobicity, volume, charge: Escalas (ver ``zone_properties``).
+
+    Returns:
+        list: Filas para ``update_query``.
+    """
+    scales = {"hydrophobicity": hydrophobicity, "volume": volume, "charge": charge}
+    charge_values = scale_values(charge, CHARGE_SCALES)
+
+    reference_ids = list(reference_zones)
+    reference = zone_properties([reference_zones[zone_id] for zone_id in reference_ids], **scales)
+    reference_charges = dict(zip(reference_ids, charge_strings(reference_zones.values(), charge_values)))
+    reference_index = {zone_id: i for i, zone_id in enumerate(reference_ids)}
+
+    zone_ids, reference_zone_ids, sequences = zip(*zones) if zones else ((), (), ())
+    aligned = zone_properties(sequences, **scales)
+    # Las zonas sin referencia conocida apuntan a una fila NaN al final
+    index = np.array([reference_index.get(zone_id, len(reference_ids)) for zone_id in reference_zone_ids],
+                     dtype=np.int64)
+    reference_hydrophobicity = np.append(reference["hydrophobicity"], np.nan)[index]
+    reference_volume = np.append(reference["volume"], np.nan)[index]
+
+    return list(zip(
+        _rounded(aligned["hydrophobicity"]), _rounded(aligned["volume"]),
+        _rounded(aligned["hydrophobicity"] - reference_hydrophobicity),
+        _rounded(aligned["volume"] - reference_volume),
+        charge_types(aligned["net_charge"]),
+        charge_strings(sequences, charge_values),
+        [reference_charges.get(zone_id) for zone_id in reference_zone_ids],
+        zone_ids,
+    ))
+
+
+def reference_rows(reference_zones, hydrophobicity="kyte_doolittle", volume="zamyatnin"):
+    """Filas de REFERENCE_UPDATE_QUERY: hidrofobicidad y volumen promedio de cada zona de referencia."""
+    reference = zone_properties(list(reference_zones.values()), hydrophobicity, volume)
+    return list(zip(_rounded(reference["hydrophobicity"]), _rounded(reference["volume"]), reference_zones))
+
+
+def update_zone_properties(db_path, hydrophobicity="kyte_doolittle", volume="zamyatnin", charge="ph7",
+                           tables=tuple(ZONE_TABLES)):
+    """
+    Recalcula las propiedades de todas las zonas alineadas y de ReferenceZones.
+
+    Args:
+        db_path (str): Ruta de la base de datos.
+        hydrophobicity (str | dict): Escala de hidrofobicidad (HYDROPHOBICITY_SCALES).
+        volume (str | dict): Escala de volumen (VOLUME_SCALES).
+        charge (str | dict): Escala de carga (CHARGE_SCALES).
+        tables (tuple): Tablas de ZONE_TABLES a recalcular.
+
+    Returns:
+        dict: Zonas actualizadas por tabla y zonas de referencia.
+    """
+    scales = {"hydrophobicity": hydrophobicity, "volume": volume, "charge": charge}
+    # Valida los nombres antes de leer la base
+    for scale, registry in ((hydrophobicity, HYDROPHOBICITY_SCALES), (volume, VOLUME_SCALES),
+                            (charge, CHARGE_SCALES)):
+        scale_values(scale, registry)
+
+    reference_zones = {zone_id: fragment or "" for zone_id, (_, fragment, _) in
+                       get_reference_zones(db_path).zones().items()}
+    results = {}
+    with get_connection_manager(db_path).reader() as conn:
+        for table in tables:
+            zones = conn.execute(zones_query(table)).fetchall()
+            results[table] = zone_rows(zones, reference_zones, **scales)
+
+    references = reference_rows(reference_zones, hydrophobicity, volume)
+    stats = {}
+    with get_connection_manager(db_path).writer() as conn:
+        for table, rows in results.items():
+            conn.executemany(update_query(table), rows)
+            stats[table] = len(rows)
+        conn.executemany(REFERENCE_UPDATE_QUERY, references)
+        stats["ReferenceZones"] = len(references)
+        # Los detalles de todos los alineamientos listados cambiaron: nueva data_version
+        create_summary_tables(conn)
+        for table in results:
+            ZONE_TABLES[table]["summary"](conn, touch=True)
+
+    invalidate_reference_zones(db_path)
+    for table in results:
+        invalidate_results(ZONE_TABLES[table]["cache"])
+    print(f"Propiedades de zonas: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path", nargs="?", default=os.path.join("database", "proteins_discovery.db"))
+    parser.add_argument("--hydrophobicity", default="kyte_doolittle", choices=sorted(HYDROPHOBICITY_SCALES))
+    parser.add_argument("--volume", default="zamyatnin", choices=sorted(VOLUME_SCALES))
+    parser.add_argument("--charge", default="ph7", choices=sorted(CHARGE_SCALES))
+    parser.add_argument("--tables", nargs="+", default=list(ZONE_TABLES), choices=list(ZONE_TABLES))
+    args = parser.parse_args()
+    update_zone_properties(args.db_path, args.hydrophobicity, args.volume, args.charge, tuple(args.tables))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Misma consulta para ambas fuentes: sólo cambian la tabla, la columna del fragmento y
+# el nombre de las columnas de hidrofobicidad/volumen
+UNIPROT_ZONES_QUERY = """
+    SELECT aligned_zone_id, reference_zone_id, aligned_sequence, match,
+           hydrophobicity_aligned, volume_aligned, delta_hydrophobicity, delta_volume,
+           tipo_carga, cargas, cargas_reference, vsd_valido
+    FROM AlignedZones
+    WHERE alignment_id = ?
+    ORDER BY aligned_zone_id
+"""
+
+FOLDSEEK_ZONES_QUERY = """
+    SELECT aligned_zone_id, reference_zone_id, fragment, match,
+           hydrophobicity, volume, delta_hydrophobicity, delta_volume,
+           tipo_carga, cargas, cargas_reference, vsd_valido
+    FROM FoldSeekAlignedZones
+    WHERE alignment_detail_id = ?
+    ORDER BY aligned_zone_id
+"""
+
+
+class ZoneRecord:
+    """Zona alineada (UniProt o FoldSeek) junto con su zona de referencia."""
+
+    __slots__ = ("aligned_zone_id", "reference_zone_id", "zone_number", "reference_fragment",
+                 "fragment", "match", "hydrophobicity", "volume", "delta_hydrophobicity",
+                 "delta_volume", "tipo_carga", "cargas", "cargas_reference", "vsd_valido")
+
+    def __init__(self, row, reference_zone=None):
+        """
+        Args:
+            row (tuple): Fila de UNIPROT_ZONES_QUERY o FOLDSEEK_ZONES_QUERY.
+            reference_zone (tuple): (zone_number, sequence_fragment) de la zona de referencia.
+        """
+        (self.aligned_zone_id, self.reference_zone_id, self.fragment, self.match,
+         self.hydrophobicity, self.volume, self.delta_hydrophobicity, self.delta_volume,
+         self.tipo_carga, self.cargas, self.cargas_reference, vsd_valido) = row
+        self.vsd_valido = bool(vsd_valido)
+        self.zone_number, self.reference_fragment = reference_zone or (None, None)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"ZoneRecord(zone_number={self.zone_number}, fragment={self.fragment!r})"
+
+
+def fetch_zone_records(conn, query, alignment_id, reference_zones):
+    """
+    Obtiene las zonas alineadas de un alineamiento, una fila por zona.
+
+    Args:
+        conn (sqlite3.Connection): Conexión de lectura.
+        query (str): UNIPROT_ZONES_QUERY o FOLDSEEK_ZONES_QUERY.
+        alignment_id (int): alignment_id (UniProt) o alignment_detail_id (FoldSeek).
+        reference_zones (ReferenceZoneCache): Caché de zonas de referencia.
+
+    Returns:
+        list: Objetos ZoneRecord en el orden en que se guardaron.
+    """
+    rows = conn.execute(query, (alignment_id,)).fetchall()
+    references = reference_zones.lookup([row[1] for row in rows])
+    return [ZoneRecord(row, reference) for row, reference in zip(rows, references)]
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def legacy_zone_lists(records, keys):
+    """
+    Listas paralelas por columna con los nombres de clave del antiguo formato
+    GROUP_CONCAT, para los consumidores que aún las usan.
+
+    Args:
+        records (list): Objetos ZoneRecord.
+        keys (dict): Nombre de clave heredado -> atributo de ZoneRecord.
+
+    Returns:
+        dict: Clave heredada -> lista de cadenas.
+    """
+    return {key: [_text(getattr(record, attribute)) for record in records] for key, attribute in keys.items()}
@@ -1,20 +1,12 @@
 // molstar_viewer.js
 
-async function renderMolstarStructure(encodedRefPDB, encodedAlignedPDB) {
-    try {
-        const plugin = await createMolstarViewer("molstar-viewer");
-
-        const refPDB = atob(encodedRefPDB);
-        const alignedPDB = atob(encodedAlignedPDB);
-
-        await plugin.loadStructureFromData(refPDB, "pdb", { label: "Referencia" });
-        await plugin.loadStructureFromData(alignedPDB, "pdb", { label: "Alineado" });
-
-        plugin.managers.camera.focus.reset();
-        plugin.managers.camera.focus.setFromStructures();
-    } catch (error) {
-        console.error("Error al cargar estructuras con Mol*:", error);
+async function fetchPdb(url) {
+    // La API sirve el PDB comprimido y con ETag: el navegador lo cachea y revalida
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`No se pudo descargar ${url} (HTTP ${response.status})`);
     }
+    return response.text();
 }
 
 async function createMolstarViewer(targetId) {
@@ -49,19 +41,18 @@ $(document).ready(function() {
         // Mostrar indicador de carga
         if (loadingElement) loadingElement.style.display = 'block';
         
-        // Obtener datos codificados
-        const refPdbData = viewerContainer.getAttribute('data-ref-pdb');
-        const alignedPdbData = viewerContainer.getAttribute('data-aligned-pdb');
+        // URLs de las estructuras en la API
+        const refPdbUrl = viewerContainer.getAttribute('data-ref-url');
+        const alignedPdbUrl = viewerContainer.getAttribute('data-aligned-url');
         
-        if (!refPdbData || !alignedPdbData) {
-            throw new Error("No se encontraron datos PDB codificados");
+        if (!refPdbUrl || !alignedPdbUrl) {
+            throw new Error("No se encontraron las URLs de las estructuras");
         }
         
-        // Decodificar datos PDB
-        const refPdb = atob(refPdbData);
-        const alignedPdb = atob(alignedPdbData);
+        // Descargar ambos PDB en paralelo mientras se crea el visualizador Mol*
+        const pdbs = Promise.all([fetchPdb(refPdbUrl), fetchPdb(alignedPdbUrl)]);
+        let refPdb, alignedPdb;
         
-        // Configurar el visualizador Mol*
         molstar.Viewer.create(viewerContainer, {
             layoutIsExpanded: false,
             layoutShowControls: true,
@@ -69,7 +60,11 @@ $(document).ready(function() {
             layoutShowLog: false,
             layoutShowLeftPanel: true,
             viewportBackground: '#000'
-        }).then(viewer => {
+        }).then(viewer => pdbs.then(([ref, aligned]) => {
+            refPdb = ref;
+            alignedPdb = aligned;
+            return viewer;
+        })).then(viewer => {
             // Primero mostrar la estructura de referencia en azul
             return viewer.loadStructureFromData(refPdb, "pdb", {
                 label: "Estructura Referencia",
@@ -0,0 +1,123 @@
+"""
+Benchmark de latencia por petición: una conexión SQLite nueva por consulta frente al
+ConnectionManager compartido (pool acotado de conexiones de lectura con pragmas ajustados).
+
+Cada "petición" reproduce las consultas que hace la vista de detalle de una estructura
+(procesar_estructura_foldseek / procesar_estructura_uniprot, con sus consultas de zonas)
+y se ejecuta desde varios hilos, como en un servidor
+multihilo. La línea base se emula con un administrador que abre y cierra una conexión
+sin configurar en cada consulta, igual que hacía el código anterior.
+
+Uso:
+    python benchmarks/connection_latency.py --proteins 2000 --foldseek 8000 --threads 8 --requests 400
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import build_synthetic_database
+from application.services import db_connection
+from application.services.db_connection import ConnectionManager
+from application.services.uniprot_data_fetch import UniProtDataFetch
+from application.services.alignment_processor import procesar_estructura_foldseek
+from application.routes import foldseek_routes
+
+
+class FreshConnectionManager(ConnectionManager):
+    """Comportamiento anterior: cada consulta abre y cierra su propia conexión."""
+
+    @contextmanager
+    def reader(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def install_manager(db_path, manager_cls):
+    """Registra ``manager_cls`` como administrador compartido de ``db_path``."""
+    key = (os.getpid(), os.path.abspath(db_path))
+    previous = db_connection._managers.pop(key, None)
+    if previous is not None:
+        previous.close_all()
+    db_connection._managers[key] = manager_cls(db_path)
+
+
+def sample_requests(db_path, n_requests, seed=11):
+    with sqlite3.connect(db_path) as conn:
+        alignment_ids = [row[0] for row in conn.execute("SELECT alignment_id FROM Alignments WHERE pdb_hash IS NOT NULL")]
+        detail_ids = [row[0] for row in conn.execute("SELECT alignment_detail_id FROM FoldSeekAlignmentDetails WHERE pdb_hash IS NOT NULL")]
+    rng = random.Random(seed)
+    return [("uniprot", rng.choice(alignment_ids)) if rng.random() < 0.5 else ("foldseek", rng.choice(detail_ids))
+            for _ in range(n_requests)]
+
+
+def run(db_path, requests_, threads):
+    """
+    Returns:
+        tuple: (latencias en segundos, duración total en segundos).
+    """
+    # procesar_estructura_uniprot consulta mediante el fetcher global del módulo de rutas
+    foldseek_routes.uniprot_fetcher = UniProtDataFetch(db_path)
+
+    def handle(request):
+        source, identifier = request
+        start = time.perf_counter()
+        if source == "uniprot":
+            foldseek_routes.procesar_estructura_uniprot(identifier, db_path)
+        else:
+            procesar_estructura_foldseek(identifier, db_path)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(handle, requests_))
+    return latencies, time.perf_counter() - start
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", type=int, default=2000)
+    parser.add_argument("--foldseek", type=int, default=8000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=400)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "synthetic.db")
+        print(f"Generando base sintética ({args.proteins} proteínas, {args.foldseek} aciertos FoldSeek)...")
+        build_synthetic_database(db_path, args.proteins, args.foldseek)
+        requests_ = sample_requests(db_path, args.requests)
+
+        print(f"\n{'Modo':<28}{'p50':>10}{'p95':>10}{'media':>10}{'peticiones/s':>14}")
+        for label, manager_cls in (("conexión por consulta", FreshConnectionManager),
+                                   ("ConnectionManager", ConnectionManager)):
+            install_manager(db_path, manager_cls)
+            run(db_path, requests_[:args.threads * 2], args.threads)  # calentamiento
+            latencies, elapsed = run(db_path, requests_, args.threads)
+            print(f"{label:<28}{percentile(latencies, 50) * 1000:>8.2f}ms{percentile(latencies, 95) * 1000:>8.2f}ms"
+                  f"{statistics.mean(latencies) * 1000:>8.2f}ms{len(latencies) / elapsed:>14.1f}")
+        db_connection._managers[(os.getpid(), os.path.abspath(db_path))].close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark del constructor de grafos de contactos entre residuos (contact_graph).
+
+Mide la búsqueda de pares de CA a menos de ``--cutoff`` Å con el doble bucle de Python
+(O(n²)), las listas de celdas con NumPy y, si SciPy está instalado, ``cKDTree``, para el
+PDB incluido y para nubes de puntos con la densidad de una proteína y más residuos.
+Después compara el tamaño del BLOB CSR con una lista de aristas en JSON y el cálculo de
+estadísticas de red de ``--graphs`` grafos: decodificando el JSON en listas de
+adyacencia de Python frente a ``load_graphs`` y ``GraphBatch.statistics``.
+
+Uso:
+    python benchmarks/contact_graph.py --graphs 2000 --cutoff 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import REFERENCE_PDB, perturbed_pdb_factory
+from application.services.backends import backend_available, get_backend
+from application.services.contact_graph import ContactGraph, _cell_pairs, load_graphs, residue_points
+
+# Residuos por Å³ en el interior de una proteína globular (~1 CA cada 130 Å³)
+RESIDUE_DENSITY = 1 / 130.0
+
+
+def python_pairs(points, cutoff):
+    """Doble bucle sobre todos los pares de residuos."""
+    pairs = []
+    limit = cutoff * cutoff
+    coords = points.tolist()
+    for i in range(len(coords)):
+        xi, yi, zi = coords[i]
+        for j in range(i + 1, len(coords)):
+            xj, yj, zj = coords[j]
+            if (xi - xj) ** 2 + (yi - yj) ** 2 + (zi - zj) ** 2 <= limit:
+                pairs.append((i, j))
+    return pairs
+
+
+def protein_like_points(rng, n):
+    side = (n / RESIDUE_DENSITY) ** (1 / 3)
+    return rng.uniform(0, side, (n, 3))
+
+
+def best_of(func, repeats=3):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def python_statistics(edge_lists):
+    """Estadísticas con listas de adyacencia de Python (un objeto por arista)."""
+    stats = []
+    for n, edges in edge_lists:
+        adjacency = {node: set() for node in range(n)}
+        for i, j in edges:
+            adjacency[i].add(j)
+            adjacency[j].add(i)
+        m = sum(len(neighbours) for neighbours in adjacency.values()) // 2
+        stats.append((n, m, 2 * m / n if n else 0.0, 2 * m / (n * (n - 1)) if n > 1 else 0.0,
+                      max((len(neighbours) for neighbours in adjacency.values()), default=0)))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--graphs", type=int, default=2000, help="Grafos de la carga por lotes")
+    parser.add_argument("--cutoff", type=float, default=8.0)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000],
+                        help="Residuos de las nubes de puntos sintéticas")
+    args = parser.parse_args()
+    rng = np.random.default_rng(5)
+    kdtree = get_backend("scipy").cKDTree if backend_available("scipy") else None
+
+    with open(REFERENCE_PDB) as f:
+        _, reference = residue_points(f.read())
+    cases = [("PDB de referencia", reference)] + [(f"{n} residuos", protein_like_points(rng, n)) for n in args.sizes]
+    print(f"{'Búsqueda de pares':<20}{'aristas':>10}{'Python':>12}{'celdas':>12}{'cKDTree':>12}")
+    for label, points in cases:
+        cell_time, (first, _) = best_of(lambda: _cell_pairs(points, args.cutoff))
+        python_time = best_of(lambda: python_pairs(points, args.cutoff), 1)[0] if len(points) <= 5000 else None
+        tree_time = best_of(lambda: kdtree(points).query_pairs(args.cutoff, output_type="ndarray"))[0] \
+            if kdtree else None
+        cell = lambda value: f"{value * 1000:>10.1f}ms" if value is not None else f"{'-':>12}"
+        print(f"{label:<20}{len(first):>10}{cell(python_time)}{cell(cell_time)}{cell(tree_time)}")
+    if kdtree is None:
+        print("SciPy no está instalado: contact_pairs usa las listas de celdas")
+
+    factory = perturbed_pdb_factory(16)
+    templates = [ContactGraph.from_structure(factory(None, i), args.cutoff) for i in range(16)]
+    graphs = [templates[i % len(templates)] for i in range(args.graphs)]
+    blobs = [graph.to_bytes() for graph in graphs]
+    edge_json = [json.dumps({"n": graph.n_nodes, "edges": np.column_stack(graph.edges()).tolist()})
+                 for graph in graphs]
+    print(f"\nTamaño medio por grafo: CSR {np.mean([len(b) for b in blobs]):,.0f} bytes, "
+          f"lista de aristas JSON {np.mean([len(e) for e in edge_json]):,.0f} bytes")
+
+    def python_batch():
+        decoded = [json.loads(text) for text in edge_json]
+        return python_statistics([(item["n"], item["edges"]) for item in decoded])
+
+    python_time, expected = best_of(python_batch)
+    batch_time, stats = best_of(lambda: load_graphs(blobs).statistics())
+    got = list(zip(*(stats[key].tolist() for key in
+                     ("numero_nodos", "numero_aristas", "grado_promedio", "densidad", "grado_maximo"))))
+    print(f"\nEstadísticas de {len(graphs)} grafos ({int(stats['numero_aristas'].sum()):,} aristas)")
+    print(f"{'JSON + listas de adyacencia':<32}{python_time * 1000:>10.1f}ms")
+    print(f"{'load_graphs + statistics':<32}{batch_time * 1000:>10.1f}ms   x{python_time / batch_time:.0f}   "
+          f"mismos valores: {'sí' if np.allclose(got, expected) else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
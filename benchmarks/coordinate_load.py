@@ -0,0 +1,112 @@
+"""
+Benchmark de carga de estructuras: reparsear el texto PDB (pdb_arrays.parse_pdb,
+build_residue_table y, si están instalados, Biopython y MDAnalysis) frente a abrir el
+formato binario de coordinate_store con ``np.load(mmap_mode="r")``.
+
+Usa variantes del PDB de referencia con ruido en las coordenadas (como
+benchmarks/synthetic_db.py --pdbs perturbed). Para cada método se mide el tiempo por
+estructura hasta tener las coordenadas y la tabla de residuos; para el almacén binario,
+la primera apertura (archivo recién abierto) y la lectura con la estructura ya abierta.
+También se comprueba la conversión de vuelta a PDB y se comparan los tamaños en disco.
+
+Uso:
+    python benchmarks/coordinate_load.py --structures 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import perturbed_pdb_factory
+from application.services.backends import backend_available, get_backend
+from application.services.coordinate_store import CoordinateStore
+from application.services.pdb_arrays import build_residue_table, parse_pdb
+from application.services.structure_store import compress, pdb_hash
+
+
+def time_per_item(func, items):
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--structures", type=int, default=200)
+    args = parser.parse_args()
+
+    factory = perturbed_pdb_factory(args.structures)
+    texts = [factory(None, i) for i in range(args.structures)]
+    digests = [pdb_hash(text) for text in texts]
+    by_hash = dict(zip(digests, texts))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        store = CoordinateStore(work_dir)
+        start = time.perf_counter()
+        for digest, text in by_hash.items():
+            store.write(digest, text)
+        write_time = (time.perf_counter() - start) / len(by_hash)
+
+        def text_arrays(digest):
+            atoms = parse_pdb(by_hash[digest])
+            return atoms.coords, build_residue_table(by_hash[digest])
+
+        def cold_store(digest):
+            structure = CoordinateStore(work_dir).load(digest)
+            return structure.coords, structure.residue_table()
+
+        def warm_store(digest):
+            structure = store.load(digest)
+            return structure.coords, structure.residue_table()
+
+        methods = [
+            ("parse_pdb + tabla", text_arrays),
+            ("binario, en frío", cold_store),
+            ("binario, abierto", warm_store),
+        ]
+        for digest in digests:
+            store.load(digest)
+        if backend_available("biopython"):
+            bio_pdb = get_backend("biopython")
+            methods.append(("Biopython PDBParser", lambda digest: bio_pdb.PDBParser(QUIET=True).get_structure(
+                "s", io.StringIO(by_hash[digest]))))
+        if backend_available("mdanalysis"):
+            mda = get_backend("mdanalysis")
+            methods.append(("MDAnalysis Universe", lambda digest: mda.Universe(
+                io.StringIO(by_hash[digest]), format="PDB")))
+
+        n_atoms = len(store.load(digests[0]))
+        print(f"{len(digests)} estructuras de {n_atoms} átomos\n")
+        print(f"{'Método':<24}{'mediana por estructura':>24}")
+        baseline = None
+        for label, func in methods:
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed = time_per_item(func, digests)
+            baseline = baseline or elapsed
+            print(f"{label:<24}{elapsed * 1e6:>20.1f} µs   x{baseline / elapsed:.1f}")
+
+        roundtrip = all(store.load(digest).to_pdb() == by_hash[digest] for digest in digests)
+        to_pdb = time_per_item(lambda digest: store.load(digest).to_pdb(), digests)
+        text_bytes = statistics.mean(len(text.encode()) for text in texts)
+        npy_bytes = statistics.mean(os.path.getsize(store.path(d)) + os.path.getsize(store.path(d, ".json"))
+                                    for d in digests)
+        blob_bytes = statistics.mean(len(compress(text.encode())[1]) for text in texts)
+        print(f"\nConversión a PDB: {to_pdb * 1000:.2f} ms por estructura; "
+              f"texto idéntico al original: {'sí' if roundtrip else 'NO'}")
+        print(f"Escritura en la ingesta: {write_time * 1000:.2f} ms por estructura")
+        print(f"Tamaño medio: texto {text_bytes / 1024:.0f} KB, binario {npy_bytes / 1024:.0f} KB, "
+              f"StructureBlobs {blob_bytes / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark del llenado de HelicesDetails (helices_details).
+
+Genera una base sintética con PDB alineados derivados del de referencia (``--pdbs
+perturbed``) y mide: el recorrido estructura a estructura (un análisis y una
+transacción con un INSERT por residuo para cada estructura) frente al pipeline por
+bloques (análisis de ``--chunk-size`` estructuras por llamada y ``executemany`` en una
+sola transacción) con 1 y ``--workers`` procesos, con y sin el almacén binario de
+coordenadas, y la ejecución incremental sin cambios.
+
+Uso:
+    python benchmarks/helices_details.py --proteins 300 --foldseek 600 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import build_synthetic_database, perturbed_pdb_factory
+from application.services.coordinate_store import build_store
+from application.services.db_connection import get_connection_manager
+from application.services.helices_details import (
+    DEFAULT_CUTOFF, INSERT_QUERY, ensure_schema, helix_rows, pending_structures, update_helices_details
+)
+from config import Config
+
+
+def per_structure(db_path, cutoff=DEFAULT_CUTOFF):
+    """Una estructura por llamada y una transacción con INSERT fila a fila por estructura."""
+    pending, _ = pending_structures(db_path, cutoff, force=True)
+    conn = sqlite3.connect(db_path)
+    rows_written = 0
+    try:
+        for item in pending:
+            rows, _ = helix_rows(db_path, cutoff, [item])
+            for row in rows:
+                conn.execute(INSERT_QUERY, row)
+            conn.commit()
+            rows_written += len(rows)
+    finally:
+        conn.close()
+    return rows_written
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", type=int, default=300)
+    parser.add_argument("--foldseek", type=int, default=600)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "synthetic.db")
+        print(f"Generando base sintética ({args.proteins} proteínas, {args.foldseek} aciertos FoldSeek)...")
+        build_synthetic_database(db_path, args.proteins, args.foldseek, pdb_factory=perturbed_pdb_factory())
+        ensure_schema(db_path)
+        structures = len(pending_structures(db_path)[0])
+        print(f"{structures} estructuras alineadas válidas\n")
+
+        # Primero sin almacén binario: cada estructura se lee de StructureBlobs
+        store_dir = os.path.join(work_dir, "coordinates")
+        original_root, Config.COORDINATE_DIR = Config.COORDINATE_DIR, ""
+
+        print(f"{'Caso':<44}{'tiempo':>10}{'estructuras/s':>16}")
+        cases = [("estructura a estructura", lambda: per_structure(db_path))]
+        cases += [(f"por bloques, {workers} proceso(s)",
+                   lambda workers=workers: update_helices_details(db_path, workers=workers,
+                                                                  chunk_size=args.chunk_size, force=True))
+                  for workers in sorted({1, args.workers})]
+        try:
+            for label, func in cases:
+                with get_connection_manager(db_path).writer() as conn:
+                    conn.execute("DELETE FROM HelicesDetails")
+                elapsed, _ = timed(func)
+                print(f"{label + ' (PDB)':<44}{elapsed:>9.2f}s{structures / elapsed:>16,.0f}")
+
+            Config.COORDINATE_DIR = store_dir
+            timed(lambda: build_store(db_path))
+            elapsed, _ = timed(lambda: update_helices_details(db_path, workers=1, chunk_size=args.chunk_size,
+                                                              force=True))
+            print(f"{'por bloques, 1 proceso (almacén binario)':<44}{elapsed:>9.2f}s{structures / elapsed:>16,.0f}")
+            elapsed, stats = timed(lambda: update_helices_details(db_path, workers=args.workers,
+                                                                  chunk_size=args.chunk_size))
+            print(f"{'incremental sin cambios':<44}{elapsed:>9.2f}s{'':>16}   (analizadas {stats['analizadas']})")
+        finally:
+            Config.COORDINATE_DIR = original_root
+            get_connection_manager(db_path).close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark del análisis de orientación de hélices del VSD (VSDAnalyzer) sobre el PDB
+incluido (database/vsd_water_bk_test.pdb) con las hélices S1-S4 de cortar_pdb.py.
+
+Compara el recorrido anterior (una selección y un centro de masa por residuo en un bucle
+de Python) con la versión vectorizada de helix_orientation.analyze_structures (todos los
+centros de masa con una reducción agrupada y todas las distancias en una expresión), para
+una estructura y para un lote de variantes con ruido en las coordenadas analizadas en una
+sola llamada. Si MDAnalysis está instalado, también se mide el bucle original sobre un
+``Universe``. Se comprueba que ambos métodos seleccionan los mismos residuos.
+
+Uso:
+    python benchmarks/helix_orientation.py --structures 50 --repeats 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import REFERENCE_PDB, perturbed_pdb_factory
+from application.services.backends import backend_available, get_backend
+from application.services.helix_orientation import PROTEIN_RESNAMES, analyze_structures, guess_masses
+from application.services.pdb_arrays import parse_pdb
+
+HELICES = {"S1": (110, 129), "S2": (148, 170), "S3": (181, 199), "S4": (207, 223)}
+CUTOFF = 5.0
+
+
+def loop_orientation(atoms, helices_residues, cutoff=CUTOFF):
+    """Algoritmo anterior sobre arreglos: selección y centro de masa residuo a residuo."""
+    protein = np.isin(atoms.resnames, list(PROTEIN_RESNAMES))
+    masses = guess_masses(atoms.elements, atoms.names)
+    center_of_mass = (atoms.coords[protein] * masses[protein, None]).sum(axis=0) / masses[protein].sum()
+    z_axis = np.array([center_of_mass[0], center_of_mass[1], 1e3])
+    z_direction = z_axis - center_of_mass
+    z_direction /= np.linalg.norm(z_direction)
+
+    inward = []
+    for start, end in helices_residues.values():
+        selection = protein & (atoms.resseqs >= start) & (atoms.resseqs <= end)
+        for residue in np.unique(atoms.residue_index[selection]):
+            residue_atoms = selection & (atoms.residue_index == residue)
+            res_center = (atoms.coords[residue_atoms] * masses[residue_atoms, None]).sum(axis=0) \
+                / masses[residue_atoms].sum()
+            vector_to_center = center_of_mass - res_center
+            projection = np.dot(vector_to_center, z_direction)
+            normal_distance = np.linalg.norm(vector_to_center - projection * z_direction)
+            if normal_distance < cutoff:
+                inward.append(int(atoms.resseqs[residue_atoms][0]))
+    return inward
+
+
+def mdanalysis_loop(universe, helices_residues, cutoff=CUTOFF):
+    """Bucle original de VSDAnalyzer.analyze_helices_orientation sobre un Universe."""
+    protein = universe.select_atoms("protein")
+    center_of_mass = protein.center_of_mass()
+    z_axis = np.array([center_of_mass[0], center_of_mass[1], 1e3])
+    z_direction = z_axis - center_of_mass
+    z_direction /= np.linalg.norm(z_direction)
+    inward = []
+    for start, end in helices_residues.values():
+        for res in protein.select_atoms(f"resid {start}:{end}").residues:
+            vector_to_center = center_of_mass - res.atoms.center_of_mass()
+            projection = np.dot(vector_to_center, z_direction)
+            if np.linalg.norm(vector_to_center - projection * z_direction) < cutoff:
+                inward.append(int(res.resid))
+    return inward
+
+
+def best_of(func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--structures", type=int, default=50, help="Variantes analizadas en el lote")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(REFERENCE_PDB) as f:
+        reference = parse_pdb(f.read())
+    factory = perturbed_pdb_factory(args.structures)
+    batch = [parse_pdb(factory(None, i)) for i in range(args.structures)]
+
+    rows = []
+    loop_time, loop_inward = best_of(lambda: loop_orientation(reference, HELICES), args.repeats)
+    vector_time, results = best_of(lambda: analyze_structures([reference], HELICES, CUTOFF), args.repeats)
+    vector_inward = results[0].resids[results[0].inward].tolist()
+    rows.append(("1 estructura", loop_time, vector_time, loop_inward == vector_inward))
+
+    loop_time, loop_batch = best_of(lambda: [loop_orientation(atoms, HELICES) for atoms in batch], args.repeats)
+    vector_time, results = best_of(lambda: analyze_structures(batch, HELICES, CUTOFF), args.repeats)
+    same = loop_batch == [result.resids[result.inward].tolist() for result in results]
+    rows.append((f"lote de {len(batch)}", loop_time, vector_time, same))
+
+    print(f"{len(reference)} átomos, {len(results[0].resids) if results else 0} residuos en las hélices, "
+          f"{len(loop_inward)} hacia el interior (cutoff {CUTOFF} Å)\n")
+    print(f"{'Caso':<16}{'bucle':>12}{'vectorizado':>14}{'aceleración':>13}  mismos residuos")
+    for label, loop_time, vector_time, same in rows:
+        print(f"{label:<16}{loop_time * 1000:>10.2f}ms{vector_time * 1000:>12.2f}ms"
+              f"{loop_time / vector_time:>12.1f}x  {'sí' if same else 'NO'}")
+
+    if backend_available("mdanalysis"):
+        universe = get_backend("mdanalysis").Universe(REFERENCE_PDB)
+        mda_time, mda_inward = best_of(lambda: mdanalysis_loop(universe, HELICES), args.repeats)
+        print(f"\nBucle original con MDAnalysis: {mda_time * 1000:.2f} ms "
+              f"(mismos residuos que la versión vectorizada: {'sí' if mda_inward == vector_inward else 'NO'})")
+    else:
+        print("\nMDAnalysis no está instalado: se omite el bucle original sobre un Universe")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de arranque en frío: tiempo de importación de ``create_app()`` con los
+backends científicos cargados bajo demanda frente a cargarlos todos al arrancar
+(el comportamiento anterior, en que py3dmol_service, structure_processor y
+cortar_pdb importaban py3Dmol, PyMOL, VMD, Biopython y MDAnalysis al cargarse).
+
+Cada escenario se ejecuta en un intérprete nuevo con ``python -X importtime``; se
+informa la suma de los tiempos propios de importación, el tiempo total del proceso
+(mediana de ``--runs`` ejecuciones) y los paquetes que más tardan.
+
+Uso:
+    python benchmarks/import_time.py --runs 5 --top 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "lazy": "",
+    "eager": "from application.services.backends import preload; preload();",
+}
+
+SCRIPT = """
+{setup}
+from application import create_app
+create_app()
+import json
+from application.services.backends import loaded_backends
+print(json.dumps(loaded_backends()))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Returns:
+        dict: Paquete de primer nivel -> (tiempo propio, tiempo acumulado) en microsegundos.
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name[1:]  # la sangría adicional indica el nivel de anidamiento
+        top = name.strip().split(".")[0]
+        own, total = packages.get(top, (0, 0))
+        if not name.startswith(" "):
+            total += int(cumulative_us)
+        packages[top] = (own + int(self_us), total)
+    return packages
+
+
+def run_scenario(setup, env):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", SCRIPT.format(setup=setup)],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return elapsed, parse_importtime(result.stderr), json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [env.get("PYTHONPATH"), ROOT]))
+
+    summary = {}
+    for name, setup in SCENARIOS.items():
+        walls, imports = [], []
+        for _ in range(args.runs):
+            elapsed, packages, loaded = run_scenario(setup, env)
+            walls.append(elapsed)
+            imports.append(sum(own for own, _ in packages.values()))
+        summary[name] = (statistics.median(walls), statistics.median(imports))
+
+        print(f"\n== {name} ==")
+        print(f"backends cargados tras create_app(): {', '.join(loaded) or 'ninguno'}")
+        print(f"importaciones: {summary[name][1] / 1000:.1f} ms   proceso: {summary[name][0] * 1000:.1f} ms (mediana)")
+        print(f"{'paquete':<24}{'acumulado (ms)':>16}")
+        for package, (_, total) in sorted(packages.items(), key=lambda item: -item[1][1])[:args.top]:
+            print(f"{package:<24}{total / 1000:>16.1f}")
+
+    lazy, eager = summary["lazy"], summary["eager"]
+    print(f"\nArranque: {eager[0] * 1000:.1f} ms -> {lazy[0] * 1000:.1f} ms "
+          f"(importaciones {eager[1] / 1000:.1f} ms -> {lazy[1] / 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
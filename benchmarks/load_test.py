@@ -0,0 +1,219 @@
+"""
+Prueba de carga de extremo a extremo: genera una base sintética con PDB derivados del
+de referencia (benchmarks/synthetic_db.py --pdbs perturbed) y ejecuta una mezcla de
+peticiones contra la aplicación Flask desde varios hilos: página principal, listados,
+vista completa de una estructura, API JSON y descarga de PDB.
+
+Informa p50/p95/p99 por tipo de petición y en total, el rendimiento (peticiones/s), los
+errores (respuestas 5xx) y el pico de memoria residente del proceso. La base se genera
+en un subproceso para que el pico de memoria refleje sólo el servicio de peticiones.
+Con ``--json`` se guardan los resultados y con ``--max-p95-ms`` el script termina con
+código 1 si el p95 total supera el umbral, para detectar regresiones.
+
+Las peticiones se envían con el cliente de pruebas de Flask (sin servidor WSGI), por lo
+que se mide la aplicación y no la red.
+
+Uso:
+    python benchmarks/load_test.py --proteins 300 --foldseek 1200 --threads 8 --requests 2000
+    python benchmarks/load_test.py --db /tmp/synthetic.db --json resultados.json --max-p95-ms 250
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows: sin getrusage no se informa el pico de memoria
+    resource = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from application import create_app
+from application.routes import api_routes, foldseek_routes
+from application.services import result_cache
+from application.services.foldseek_data_fetch import FoldSeekDataFetch
+from application.services.result_cache import ResultCache
+from application.services.uniprot_data_fetch import UniProtDataFetch
+
+# (nombre, peso): proporción de cada tipo de petición en la mezcla
+SCENARIOS = (
+    ("home", 1),
+    ("list_foldseek", 1),
+    ("view_foldseek", 3),
+    ("view_uniprot", 2),
+    ("api_structures", 1),
+    ("api_alignment", 4),
+    ("api_pdb_aligned", 3),
+    ("api_pdb_reference", 2),
+)
+
+
+def point_app_to(db_path):
+    """Apunta las rutas (y sus fetchers globales) a ``db_path``."""
+    for module in (foldseek_routes, api_routes):
+        module.db_path = db_path
+        module.foldseek_fetcher = FoldSeekDataFetch(db_path)
+        module.uniprot_fetcher = UniProtDataFetch(db_path)
+
+
+def sample_ids(db_path):
+    with sqlite3.connect(db_path) as conn:
+        foldseek = [row[0] for row in conn.execute("SELECT alignment_detail_id FROM foldseek_summary_view")]
+        uniprot = [row[0] for row in conn.execute("SELECT alignment_id FROM uniprot_summary_view")]
+        references = [row[0] for row in conn.execute("SELECT reference_sequence_id FROM ReferenceSequences")]
+    if not foldseek or not uniprot:
+        raise SystemExit("La base no tiene alineamientos listados (¿PDB y zonas válidas?)")
+    return {"foldseek": foldseek, "uniprot": uniprot, "reference": references}
+
+
+def build_plan(ids, n_requests, seed=11):
+    """Secuencia de peticiones ``(escenario, método, url, datos)``."""
+    rng = random.Random(seed)
+    names = [name for name, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    plan = []
+    for name in rng.choices(names, weights, k=n_requests):
+        foldseek_id, uniprot_id = rng.choice(ids["foldseek"]), rng.choice(ids["uniprot"])
+        if name == "home":
+            plan.append((name, "GET", "/", None))
+        elif name == "list_foldseek":
+            plan.append((name, "POST", "/", {"source": "foldseek"}))
+        elif name == "view_foldseek":
+            plan.append((name, "POST", "/", {"source": "foldseek", "structure_id": str(foldseek_id),
+                                             "show_structures": "yes"}))
+        elif name == "view_uniprot":
+            plan.append((name, "POST", "/", {"source": "uniprot", "structure_id": str(uniprot_id)}))
+        elif name == "api_structures":
+            plan.append((name, "GET", "/api/structures?source=uniprot", None))
+        elif name == "api_alignment":
+            source, identifier = rng.choice((("foldseek", foldseek_id), ("uniprot", uniprot_id)))
+            plan.append((name, "GET", f"/api/alignments/{source}/{identifier}", None))
+        elif name == "api_pdb_aligned":
+            plan.append((name, "GET", f"/api/pdb/foldseek/{foldseek_id}/aligned", None))
+        else:
+            plan.append((name, "GET", f"/api/pdb/reference/{rng.choice(ids['reference'])}", None))
+    return plan
+
+
+def run(app, plan, threads):
+    """
+    Returns:
+        tuple: (lista de (escenario, latencia, status), duración total en segundos).
+    """
+    local = threading.local()
+
+    def handle(item):
+        name, method, url, data = item
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        start = time.perf_counter()
+        response = client.open(url, method=method, data=data, headers={"Accept-Encoding": "gzip"})
+        response.get_data()
+        return name, time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(handle, plan))
+    return results, time.perf_counter() - start
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB; macOS, bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(results, elapsed):
+    rows = {}
+    for name in [name for name, _ in SCENARIOS] + ["total"]:
+        selected = [(latency, status) for scenario, latency, status in results if name in ("total", scenario)]
+        if not selected:
+            continue
+        latencies = [latency for latency, _ in selected]
+        rows[name] = {
+            "requests": len(selected),
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "errors": sum(1 for _, status in selected if status >= 500),
+        }
+    return {
+        "scenarios": rows,
+        "throughput_rps": len(results) / elapsed,
+        "elapsed_s": elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="Base existente (por defecto se genera una sintética temporal)")
+    parser.add_argument("--proteins", type=int, default=300)
+    parser.add_argument("--foldseek", type=int, default=1200)
+    parser.add_argument("--pdb-variants", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--no-result-cache", action="store_true", help="Desactiva la caché de vistas renderizadas")
+    parser.add_argument("--json", help="Archivo donde guardar los resultados")
+    parser.add_argument("--max-p95-ms", type=float, help="Falla (código 1) si el p95 total supera este valor")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(work_dir, "synthetic.db")
+            print(f"Generando base sintética ({args.proteins} proteínas, {args.foldseek} aciertos FoldSeek, "
+                  f"PDB perturbados)...")
+            subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "synthetic_db.py"), db_path,
+                            "--proteins", str(args.proteins), "--foldseek", str(args.foldseek),
+                            "--pdbs", "perturbed", "--pdb-variants", str(args.pdb_variants)],
+                           check=True, stdout=subprocess.DEVNULL)
+
+        point_app_to(db_path)
+        if args.no_result_cache:
+            result_cache._cache = ResultCache(max_entries=0)
+        app = create_app()
+        ids = sample_ids(db_path)
+        run(app, build_plan(ids, args.warmup, seed=3), args.threads)  # calentamiento
+        results, elapsed = run(app, build_plan(ids, args.requests), args.threads)
+        summary = summarize(results, elapsed)
+
+    print(f"\n{'Petición':<20}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'errores':>9}")
+    for name, row in summary["scenarios"].items():
+        print(f"{name:<20}{row['requests']:>7}{row['p50_ms']:>8.2f}ms{row['p95_ms']:>8.2f}ms"
+              f"{row['p99_ms']:>8.2f}ms{row['errors']:>9}")
+    print(f"\nRendimiento: {summary['throughput_rps']:.1f} peticiones/s con {args.threads} hilos")
+    if summary["peak_rss_mb"] is not None:
+        print(f"Pico de memoria residente: {summary['peak_rss_mb']:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(dict(summary, threads=args.threads, requests=args.requests), f, indent=2)
+    if args.max_p95_ms is not None and summary["scenarios"]["total"]["p95_ms"] > args.max_p95_ms:
+        print(f"p95 total por encima de {args.max_p95_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark del cálculo de ProteinCalculations (proteínas por segundo).
+
+Genera una base sintética, llena ValidVSDProteins con VSDProteinProcessor y mide:
+el cálculo de las propiedades proteína a proteína en Python puro (como lo haría un
+bucle sobre Biopython ProteinAnalysis) frente a los bloques vectorizados de
+protein_calculations, la actualización completa de la base con 1 y ``--workers``
+procesos, y la ejecución incremental (sin cambios y con un 1 % de secuencias
+modificadas). Si Biopython está instalado se compara el pI y la masa con
+ProteinAnalysis.
+
+Uso:
+    python benchmarks/protein_calculations.py --proteins 5000 --foldseek 20000 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import build_synthetic_database
+from application.services import protein_calculations
+from application.services.backends import backend_available
+from application.services.db_connection import get_connection_manager
+from application.services.protein_calculations import (
+    C_TERMINAL_PK, KYTE_DOOLITTLE, N_TERMINAL_PK, NEGATIVE_PKS, POSITIVE_PKS, AVERAGE_MASSES, WATER_MASS,
+    compute_properties, update_protein_calculations
+)
+from application.services.sequence_encoding import AMINO_ACIDS
+from application.services.vsd_protein_processor import SQLiteHandler, VSDProteinProcessor
+
+
+def python_properties(sequence):
+    """Mismas propiedades para una sola secuencia, con diccionarios y bucles de Python."""
+    counts = {aa: sequence.count(aa) for aa in AMINO_ACIDS}
+    known = sum(counts.values())
+    mass = sum(counts[aa] * AVERAGE_MASSES[i] for i, aa in enumerate(AMINO_ACIDS)) - (known - 1) * WATER_MASS
+    gravy = sum(counts[aa] * KYTE_DOOLITTLE[i] for i, aa in enumerate(AMINO_ACIDS)) / known
+    n_pk = N_TERMINAL_PK[AMINO_ACIDS.find(sequence[0])] if sequence[0] in AMINO_ACIDS else N_TERMINAL_PK[-1]
+    c_pk = C_TERMINAL_PK[AMINO_ACIDS.find(sequence[-1])] if sequence[-1] in AMINO_ACIDS else C_TERMINAL_PK[-1]
+
+    def charge(ph):
+        value = 1 / (1 + 10 ** (ph - n_pk)) - 1 / (1 + 10 ** (c_pk - ph))
+        value += sum(counts[aa] / (1 + 10 ** (ph - pk)) for aa, pk in POSITIVE_PKS.items())
+        value -= sum(counts[aa] / (1 + 10 ** (pk - ph)) for aa, pk in NEGATIVE_PKS.items())
+        return value
+
+    low, high = 0.0, 14.0
+    for _ in range(protein_calculations.PI_ITERATIONS):
+        middle = (low + high) / 2
+        low, high = (middle, high) if charge(middle) > 0 else (low, middle)
+    return mass, (low + high) / 2, gravy, charge(7.0)
+
+
+def load_sequences(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return [row[1] for row in conn.execute(protein_calculations.SEQUENCES_QUERY) if row[1]]
+
+
+def timed_update(db_path, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats = update_protein_calculations(db_path, **kwargs)
+    return time.perf_counter() - start, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", type=int, default=5000)
+    parser.add_argument("--foldseek", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "synthetic.db")
+        print(f"Generando base sintética ({args.proteins} proteínas, {args.foldseek} aciertos FoldSeek)...")
+        build_synthetic_database(db_path, args.proteins, args.foldseek)
+        with contextlib.redirect_stdout(io.StringIO()):
+            VSDProteinProcessor(SQLiteHandler(db_path)).process()
+        sequences = load_sequences(db_path)
+        residues = sum(len(sequence) for sequence in sequences)
+        print(f"{len(sequences)} proteínas válidas, {residues / len(sequences):.0f} residuos de media\n")
+
+        sample = sequences[:min(len(sequences), 2000)]
+        start = time.perf_counter()
+        expected = [python_properties(sequence) for sequence in sample]
+        python_rate = len(sample) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        properties = compute_properties(sequences)
+        vector_rate = len(sequences) / (time.perf_counter() - start)
+        got = np.column_stack([properties[key][:len(sample)] for key in ("mass", "pi", "gravy", "charge_ph7")])
+        max_error = np.abs(got - np.array(expected)).max(axis=0)
+
+        print(f"{'Cálculo':<34}{'proteínas/s':>14}")
+        print(f"{'Python, proteína a proteína':<34}{python_rate:>14,.0f}")
+        print(f"{'NumPy, bloques vectorizados':<34}{vector_rate:>14,.0f}   x{vector_rate / python_rate:.0f}")
+        print(f"Diferencia máxima (masa, pI, GRAVY, carga): {', '.join(f'{e:.1e}' for e in max_error)}")
+
+        print(f"\n{'Actualización de la base':<34}{'tiempo':>10}{'proteínas/s':>14}")
+        for label, kwargs in (("completa, 1 proceso", {"workers": 1, "force": True}),
+                              (f"completa, {args.workers} procesos", {"workers": args.workers, "force": True}),
+                              ("incremental sin cambios", {"workers": args.workers})):
+            elapsed, stats = timed_update(db_path, chunk_size=args.chunk_size, **kwargs)
+            print(f"{label:<34}{elapsed:>9.2f}s{len(sequences) / elapsed:>14,.0f}   "
+                  f"(calculadas {stats['calculadas']})")
+
+        rng = random.Random(3)
+        with get_connection_manager(db_path).writer() as conn:
+            accessions = [row[0] for row in conn.execute("SELECT accession_number FROM Proteins")]
+            changed = rng.sample(accessions, max(1, len(accessions) // 100))
+            conn.executemany("UPDATE Proteins SET sequence = sequence || 'K' WHERE accession_number = ?",
+                             [(accession,) for accession in changed])
+        elapsed, stats = timed_update(db_path, workers=args.workers, chunk_size=args.chunk_size)
+        print(f"{'incremental, 1 % modificado':<34}{elapsed:>9.2f}s{'':>14}   (calculadas {stats['calculadas']})")
+        get_connection_manager(db_path).close_all()
+
+    if backend_available("biopython"):
+        from Bio.SeqUtils.ProtParam import ProteinAnalysis
+        check = [sequence for sequence in sample[:200] if set(sequence) <= set(AMINO_ACIDS)]
+        bio = np.array([(ProteinAnalysis(s).molecular_weight(), ProteinAnalysis(s).isoelectric_point()) for s in check])
+        ours = compute_properties(check)
+        print(f"\nFrente a Biopython: masa ±{np.abs(ours['mass'] - bio[:, 0]).max():.3f} Da, "
+              f"pI ±{np.abs(ours['pi'] - bio[:, 1]).max():.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark de consultas SQLite: tiempos y EXPLAIN QUERY PLAN con y sin índices secundarios.
+
+Genera una base de datos sintética, ejecuta todas las consultas de UniProtDataFetch,
+FoldSeekDataFetch, alignment_processor y los paquetes de descarga capturando cada
+sentencia SQL emitida (con sus parámetros ya enlazados) y muestra, para cada una, el
+tiempo medio antes y después de crear los índices de database/create_db.py junto con
+el plan de consulta resultante.
+
+Uso:
+    python benchmarks/query_plans.py --proteins 5000 --foldseek 20000 --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import build_synthetic_database
+from database.create_db import create_indexes
+from application.services.db_connection import get_connection_manager
+from application.services.uniprot_data_fetch import UniProtDataFetch
+from application.services.foldseek_data_fetch import FoldSeekDataFetch
+from application.services.alignment_processor import procesar_estructura_foldseek
+from application.services import download_packages
+
+
+class StatementRecorder:
+    """Intercepta sqlite3.connect para registrar las sentencias que ejecutan los servicios."""
+
+    def __init__(self):
+        self.statements = []
+        self._connect = sqlite3.connect
+
+    def __enter__(self):
+        def connect(*args, **kwargs):
+            conn = self._connect(*args, **kwargs)
+            conn.set_trace_callback(self._record)
+            return conn
+        sqlite3.connect = connect
+        return self
+
+    def __exit__(self, *exc):
+        sqlite3.connect = self._connect
+
+    def _record(self, statement):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            self.statements.append(statement)
+
+
+def sample_ids(db_path):
+    with sqlite3.connect(db_path) as conn:
+        alignment_id = conn.execute(
+            "SELECT alignment_id FROM AlignedZones WHERE vsd_valido = 1 ORDER BY alignment_id DESC LIMIT 1").fetchone()[0]
+        detail_id = conn.execute(
+            "SELECT alignment_detail_id FROM FoldSeekAlignedZones WHERE vsd_valido = 1 "
+            "ORDER BY alignment_detail_id DESC LIMIT 1").fetchone()[0]
+        zone_ids = [row[0] for row in conn.execute("SELECT zone_id FROM ReferenceZones")]
+    return alignment_id, detail_id, zone_ids
+
+
+def workload(db_path):
+    """Operaciones de los servicios a medir: (nombre, callable)."""
+    uniprot = UniProtDataFetch(db_path)
+    foldseek = FoldSeekDataFetch(db_path)
+    alignment_id, detail_id, zone_ids = sample_ids(db_path)
+
+    return [
+        ("UniProtDataFetch.get_uniprot_structures", uniprot.get_uniprot_structures),
+        ("UniProtDataFetch.get_uniprot_alignment_details", lambda: uniprot.get_uniprot_alignment_details(alignment_id)),
+        ("UniProtDataFetch.get_zone_numbers", lambda: uniprot.get_zone_numbers(zone_ids)),
+        ("download_packages.package_members (uniprot)",
+         lambda: list(download_packages.package_members(db_path, "uniprot", alignment_id))),
+        ("FoldSeekDataFetch.get_foldseek_structures", foldseek.get_foldseek_structures),
+        ("FoldSeekDataFetch.get_alignment_details", lambda: foldseek.get_alignment_details(detail_id)),
+        ("FoldSeekDataFetch.get_zone_numbers", lambda: foldseek.get_zone_numbers(zone_ids)),
+        ("download_packages.package_members (foldseek)",
+         lambda: list(download_packages.package_members(db_path, "foldseek", detail_id))),
+        ("alignment_processor.procesar_estructura_foldseek", lambda: procesar_estructura_foldseek(detail_id, db_path)),
+    ]
+
+
+def measure(db_path, repeat):
+    """
+    Returns:
+        OrderedDict: nombre -> (segundos por llamada, sentencias SQL emitidas).
+    """
+    results = OrderedDict()
+    for name, operation in workload(db_path):
+        # Las conexiones compartidas se abren de nuevo dentro del recorder para trazarlas
+        get_connection_manager(db_path).close_all()
+        with StatementRecorder() as recorder:
+            operation()
+        statements = list(OrderedDict.fromkeys(recorder.statements))
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            operation()
+        results[name] = ((time.perf_counter() - start) / repeat, statements)
+    return results
+
+
+def explain(db_path, statement):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+    return [detail for _, _, _, detail in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", type=int, default=5000)
+    parser.add_argument("--foldseek", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="Ruta de la base sintética (por defecto, temporal)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = args.db or os.path.join(work_dir, "synthetic.db")
+        print(f"Generando base sintética ({args.proteins} proteínas, {args.foldseek} aciertos FoldSeek)...")
+        build_synthetic_database(db_path, args.proteins, args.foldseek, indexes=False)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            baseline = measure(db_path, args.repeat)
+            with sqlite3.connect(db_path) as conn:
+                create_indexes(conn.cursor())
+            indexed = measure(db_path, args.repeat)
+
+        print(f"\n{'Operación':<55}{'sin índices':>14}{'con índices':>14}{'mejora':>9}")
+        for name, (before, _) in baseline.items():
+            after = indexed[name][0]
+            print(f"{name:<55}{before * 1000:>12.2f}ms{after * 1000:>12.2f}ms{before / after:>8.1f}x")
+
+        print("\nPlanes de consulta (con índices)")
+        for name, (_, statements) in indexed.items():
+            print(f"\n== {name}")
+            for statement in statements:
+                print("   " + " ".join(statement.split())[:160])
+                for detail in explain(db_path, statement):
+                    print(f"      -> {detail}")
+
+
+if __name__ == "__main__":
+    main()
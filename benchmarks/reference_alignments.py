@@ -0,0 +1,125 @@
+"""
+Benchmark del alineamiento por lotes de la referencia contra Proteins/Isoforms
+(pairwise_alignment y reference_alignments).
+
+Genera una base sintética (proteínas con un prefijo aleatorio seguido de una copia
+mutada de la referencia) y mide: el alineamiento par a par con la programación dinámica
+de Gotoh en Python puro (sólo el puntaje, sobre una muestra) frente a ``align_batch``
+(antidiagonales vectorizadas para bloques de candidatas de longitud parecida, con el
+camino de vuelta), comprobando que los puntajes coinciden, y la actualización completa
+de Alignments/AlignedZones con 1 y ``--workers`` procesos y la ejecución incremental.
+Si Biopython está instalado se compara también con Bio.Align.PairwiseAligner.
+
+Uso:
+    python benchmarks/reference_alignments.py --proteins 2000 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import REFERENCE_FASTA, build_synthetic_database
+from application.services.backends import backend_available
+from application.services.db_connection import get_connection_manager
+from application.services.pairwise_alignment import BLOSUM62, align_batch
+from application.services.reference_alignments import (
+    CANDIDATES_QUERY, chunk_candidates, read_fasta, update_reference_alignments
+)
+from application.services.sequence_encoding import CODE_TABLE
+
+
+def python_score(reference, target, gap_open=10.0, gap_extend=0.5):
+    """Puntaje semiglobal con la recurrencia de Gotoh, celda a celda."""
+    scores = BLOSUM62.tolist()
+    reference_codes = [int(CODE_TABLE[ord(aa)]) for aa in reference]
+    target_codes = [int(CODE_TABLE[ord(aa)]) for aa in target]
+    neg = -1e9
+    n = len(target)
+    h_row = [0.0] * (n + 1)
+    f_row = [neg] * (n + 1)
+    for i, code in enumerate(reference_codes, 1):
+        row_scores = scores[code]
+        h_new = [-(gap_open + gap_extend * (i - 1))] + [0.0] * n
+        f_new = [neg] * (n + 1)
+        e = neg
+        for j in range(1, n + 1):
+            e = max(h_new[j - 1] - gap_open, e - gap_extend)
+            f = max(h_row[j] - gap_open, f_row[j] - gap_extend)
+            f_new[j] = f
+            h_new[j] = max(h_row[j - 1] + row_scores[target_codes[j - 1]], e, f)
+        h_row, f_row = h_new, f_new
+    return max(h_row)
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", type=int, default=2000)
+    parser.add_argument("--sample", type=int, default=20, help="Candidatas alineadas en Python puro")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    args = parser.parse_args()
+    _, reference = read_fasta(REFERENCE_FASTA)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "synthetic.db")
+        print(f"Generando base sintética ({args.proteins} proteínas)...")
+        build_synthetic_database(db_path, args.proteins, 0)
+        with sqlite3.connect(db_path) as conn:
+            candidates = [sequence for _, _, sequence in conn.execute(CANDIDATES_QUERY)]
+        residues = sum(len(sequence) for sequence in candidates)
+        print(f"{len(candidates)} candidatas de {residues / len(candidates):.0f} residuos de media, "
+              f"referencia de {len(reference)}\n")
+
+        sample = candidates[:args.sample]
+        python_time, expected = timed(lambda: [python_score(reference, target) for target in sample])
+        chunks = chunk_candidates([(None, None, sequence) for sequence in candidates], len(reference),
+                                  args.chunk_size, 64 * 1024 ** 2)
+        batch_time, results = timed(lambda: [alignment for chunk in chunks
+                                             for alignment in align_batch(reference, [item[2] for item in chunk])])
+        got = {target: alignment.score for target, alignment in
+               zip((item[2] for chunk in chunks for item in chunk), results)}
+        same = all(abs(got[target] - score) < 1e-3 for target, score in zip(sample, expected))
+        python_rate, batch_rate = len(sample) / python_time, len(candidates) / batch_time
+        print(f"{'Alineamiento':<38}{'candidatas/s':>14}")
+        print(f"{'Python, Gotoh celda a celda':<38}{python_rate:>14,.1f}")
+        print(f"{'NumPy, antidiagonales por bloques':<38}{batch_rate:>14,.1f}   x{batch_rate / python_rate:.0f}   "
+              f"mismos puntajes: {'sí' if same else 'NO'}")
+        if backend_available("biopython"):
+            from Bio.Align import PairwiseAligner, substitution_matrices
+            aligner = PairwiseAligner(mode="global", open_gap_score=-10, extend_gap_score=-0.5,
+                                      substitution_matrix=substitution_matrices.load("BLOSUM62"))
+            # Extremos de la candidata sin penalizar: gaps en los extremos de la referencia (query)
+            aligner.query_end_gap_score = 0.0
+            bio_time, bio = timed(lambda: [aligner.score(target, reference) for target in sample])
+            bio_same = all(abs(got[target] - score) < 1e-3 for target, score in zip(sample, bio))
+            print(f"{'Bio.Align.PairwiseAligner (puntaje)':<38}{len(sample) / bio_time:>14,.1f}   "
+                  f"mismos puntajes: {'sí' if bio_same else 'NO'}")
+
+        print(f"\n{'Actualización de la base':<38}{'tiempo':>10}{'candidatas/s':>14}")
+        cases = [(f"completa, {workers} proceso(s)", {"workers": workers, "force": True})
+                 for workers in sorted({1, args.workers})]
+        cases.append(("incremental sin cambios", {"workers": args.workers}))
+        for label, kwargs in cases:
+            elapsed, stats = timed(lambda: update_reference_alignments(db_path, REFERENCE_FASTA,
+                                                                       chunk_size=args.chunk_size, **kwargs))
+            print(f"{label:<38}{elapsed:>9.2f}s{len(candidates) / elapsed:>14,.0f}   "
+                  f"(alineadas {stats['alineadas']})")
+        get_connection_manager(db_path).close_all()
+
+
+if __name__ == "__main__":
+    main()
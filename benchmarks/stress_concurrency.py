@@ -0,0 +1,135 @@
+"""
+Prueba de estrés de concurrencia para los servicios de estructuras.
+
+Lanza muchos hilos que procesan simultáneamente PDB distintos (derivados del PDB de
+referencia incluido en el repositorio, con numeración de residuos desplazada) y
+verifica que cada hilo obtiene exactamente el resultado calculado en serie: descargas a
+una misma StructureCache, tablas de residuos de Py3DMolService y el corte de la cadena
+principal con VMD usando la secuencia de referencia. Si dos llamadas compartieran
+archivos temporales o estado global de VMD, los resultados se mezclarían y la prueba
+fallaría.
+
+Uso:
+    python benchmarks/stress_concurrency.py --threads 16 --iterations 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from application.services.reference_alignments import read_fasta
+
+REFERENCE_PDB = os.path.join(ROOT, "database", "vsd_water_bk_test.pdb")
+REFERENCE_FASTA = os.path.join(ROOT, "database", "reference.fasta")
+
+
+def shifted_pdb(pdb_text, offset):
+    """Desplaza la numeración de residuos para que cada variante sea distinguible."""
+    lines = []
+    for line in pdb_text.splitlines():
+        if line.startswith(("ATOM", "HETATM")):
+            resid = (int(line[22:26]) + offset) % 10000
+            line = f"{line[:22]}{resid:4d}{line[26:]}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def run_parallel(task, variants, threads, iterations):
+    jobs = [(i, variants[i % len(variants)]) for i in range(threads * iterations)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(task, jobs))
+    elapsed = time.perf_counter() - start
+    failures = [job_id for job_id, ok in results if not ok]
+    return len(jobs), failures, elapsed
+
+
+def stress_structure_cache(variants, threads, iterations):
+    """Descargas simultáneas a una misma StructureCache (mkstemp + os.replace e índice SQLite)."""
+    from application.services.structure_cache import StructureCache
+
+    contents = dict(variants)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Límite menor que el total para que las expulsiones compitan con las escrituras
+        cache = StructureCache(cache_dir, max_bytes=len(contents[0]) * max(2, len(variants) // 2))
+
+        def download(link):
+            time.sleep(0)  # ceder el GIL entre la consulta y la escritura en caché
+            return contents[int(link.rsplit("/", 1)[1].split(".")[0])]
+
+        def task(job):
+            job_id, (offset, content) = job
+            return job_id, cache.fetch(f"https://models.example/{offset}.pdb", download) == content
+
+        return run_parallel(task, variants, threads, iterations)
+
+
+def stress_residue_info(variants, threads, iterations):
+    from application.services.py3dmol_service import Py3DMolService
+
+    expected = {offset: Py3DMolService.get_residue_info(content) for offset, content in variants}
+
+    def task(job):
+        job_id, (offset, content) = job
+        result = Py3DMolService.get_residue_info(content)
+        return job_id, result == expected[offset]
+
+    return run_parallel(task, variants, threads, iterations)
+
+
+def stress_vmd_cut(variants, threads, iterations):
+    from application.services.structure_processor import StructureProcessor
+
+    processor = StructureProcessor(None)
+    _, sequence = read_fasta(REFERENCE_FASTA)
+    expected = {offset: processor.cut_primary_chain(content, sequence) for offset, content in variants}
+
+    def task(job):
+        job_id, (offset, content) = job
+        return job_id, processor.cut_primary_chain(content, sequence) == expected[offset]
+
+    return run_parallel(task, variants, threads, iterations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--variants", type=int, default=8)
+    args = parser.parse_args()
+
+    with open(REFERENCE_PDB) as f:
+        reference = f.read()
+    variants = [(offset, shifted_pdb(reference, offset)) for offset in range(0, args.variants * 100, 100)]
+
+    scenarios = [
+        ("StructureCache.fetch", stress_structure_cache),
+        ("Py3DMolService.get_residue_info", stress_residue_info),
+        ("StructureProcessor.cut_primary_chain (VMD)", stress_vmd_cut),
+    ]
+    failed = False
+    for name, scenario in scenarios:
+        try:
+            total, failures, elapsed = scenario(variants, args.threads, args.iterations)
+        except ImportError as e:
+            print(f"[omitido] {name}: {e}")
+            continue
+        except Exception as e:
+            # Backend instalado pero inutilizable (p. ej. sin display o bibliotecas nativas)
+            print(f"[ERROR] {name}: {type(e).__name__}: {e}")
+            failed = True
+            continue
+        status = "OK" if not failures else f"FALLO ({len(failures)} resultados incorrectos)"
+        print(f"[{status}] {name}: {total} llamadas en {elapsed:.2f}s con {args.threads} hilos")
+        failed = failed or bool(failures)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark del almacenamiento de estructuras: PDB como texto en las filas (esquema
+anterior) frente a StructureBlobs (comprimidos, deduplicados y referenciados por hash).
+
+Genera una base sintética con PDB perturbados, deriva de ella una copia con los PDB en
+línea y mide el tamaño de ambos archivos, el tiempo de la migración
+(structure_store.migrate_database) y la latencia de lectura de un PDB (get_alignment_pdb,
+en frío y con la caché de textos) y de un recorrido de Alignments y
+FoldSeekAlignmentDetails que lee columnas situadas después de ``pdb``.
+
+Uso:
+    python benchmarks/structure_storage.py --proteins 300 --foldseek 1200 --reads 500
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import build_synthetic_database, perturbed_pdb_factory
+from application.services import db_connection, structure_store
+from application.services.structure_files import get_alignment_pdb
+from application.services.structure_store import PDB_TABLES, get_pdb, migrate_database
+
+SCAN_QUERIES = (
+    "SELECT COUNT(*), AVG(rmsd), MAX(aligned_atoms) FROM Alignments",
+    "SELECT COUNT(*), AVG(rmsd), MAX(aligned_atoms) FROM FoldSeekAlignmentDetails",
+)
+
+
+def inline_copy(source_path, target_path):
+    """Copia de la base con los PDB como texto en cada fila, como antes de StructureBlobs."""
+    shutil.copyfile(source_path, target_path)
+    conn = sqlite3.connect(target_path)
+    with conn:
+        for table, key_column in PDB_TABLES.items():
+            rows = conn.execute(f"SELECT {key_column}, pdb_hash FROM {table} WHERE pdb_hash IS NOT NULL").fetchall()
+            conn.executemany(f"UPDATE {table} SET pdb = ?, pdb_hash = NULL WHERE {key_column} = ?",
+                             [(get_pdb(conn, digest), key) for key, digest in rows])
+        conn.execute("DELETE FROM StructureBlobs")
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def measure_reads(db_path, ids, cold):
+    latencies = []
+    for source, alignment_id in ids:
+        if cold:
+            structure_store._texts.clear()
+        start = time.perf_counter()
+        get_alignment_pdb(db_path, source, alignment_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def measure_scans(db_path, repeats=5):
+    conn = sqlite3.connect(db_path)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for query in SCAN_QUERIES:
+            conn.execute(query).fetchone()
+        timings.append(time.perf_counter() - start)
+    conn.close()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", type=int, default=300)
+    parser.add_argument("--foldseek", type=int, default=1200)
+    parser.add_argument("--pdb-variants", type=int, default=16)
+    parser.add_argument("--reads", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        blobs_path = os.path.join(work_dir, "blobs.db")
+        inline_path = os.path.join(work_dir, "inline.db")
+        migrated_path = os.path.join(work_dir, "migrated.db")
+        print(f"Generando base sintética ({args.proteins} proteínas, {args.foldseek} aciertos FoldSeek)...")
+        build_synthetic_database(blobs_path, args.proteins, args.foldseek,
+                                 pdb_factory=perturbed_pdb_factory(args.pdb_variants))
+        inline_copy(blobs_path, inline_path)
+        shutil.copyfile(inline_path, migrated_path)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate_database(migrated_path, vacuum=True)
+        migration_time = time.perf_counter() - start
+
+        with sqlite3.connect(inline_path) as conn:
+            ids = [("uniprot", row[0]) for row in conn.execute("SELECT alignment_id FROM Alignments WHERE pdb IS NOT NULL")]
+            ids += [("foldseek", row[0]) for row in conn.execute(
+                "SELECT alignment_detail_id FROM FoldSeekAlignmentDetails WHERE pdb IS NOT NULL")]
+        rng = random.Random(5)
+        sample = [rng.choice(ids) for _ in range(args.reads)]
+
+        print(f"\n{'Almacenamiento':<18}{'tamaño':>11}{'lectura p50':>13}{'p95':>10}"
+              f"{'con caché p50':>15}{'recorrido':>12}")
+        for label, path in (("PDB en línea", inline_path), ("StructureBlobs", migrated_path)):
+            cold = measure_reads(path, sample, cold=True)
+            warm = measure_reads(path, sample, cold=False)
+            scan = measure_scans(path)
+            print(f"{label:<18}{os.path.getsize(path) / 1024 ** 2:>9.1f}MB{percentile(cold, 50) * 1000:>11.2f}ms"
+                  f"{percentile(cold, 95) * 1000:>8.2f}ms{percentile(warm, 50) * 1000:>13.3f}ms{scan * 1000:>10.2f}ms")
+            db_connection.get_connection_manager(path).close_all()
+
+        with sqlite3.connect(migrated_path) as conn:
+            blobs, raw, stored = conn.execute(
+                "SELECT COUNT(*), SUM(size), SUM(LENGTH(data)) FROM StructureBlobs").fetchone()
+        print(f"\n{len(ids)} filas con PDB -> {blobs} estructuras distintas "
+              f"({raw / 1024 ** 2:.1f} MB sin comprimir, {stored / 1024 ** 2:.1f} MB comprimidas, "
+              f"códec {structure_store.compress(b'')[0]})")
+        print(f"Migración de la base en línea: {migration_time:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Generador de una base de datos proteins_discovery.db sintética de tamaño configurable.
+
+Reproduce el esquema de database/create_db.py con datos plausibles: la secuencia de
+referencia de database/reference.fasta, sus cuatro zonas S1-S4, proteínas UniProt con
+alineamientos mutados y aciertos FoldSeek, cada uno con sus zonas alineadas. Con
+``--pdbs perturbed`` los alineamientos válidos guardan un PDB derivado del de referencia
+(database/vsd_water_bk_test.pdb) con ruido en las coordenadas; por defecto se guarda un
+PDB mínimo. Los listados materializados de la página principal se recalculan al final.
+
+Uso:
+    python benchmarks/synthetic_db.py /tmp/synthetic.db --proteins 5000 --foldseek 20000
+    python benchmarks/synthetic_db.py /tmp/synthetic.db --proteins 500 --foldseek 2000 --pdbs perturbed
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database.create_db import create_database, INDEXES
+from application.services.pdb_arrays import format_pdb, parse_pdb
+from application.services.structure_store import put_pdb
+from application.services.summary_tables import refresh_foldseek_summary, refresh_uniprot_summary
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+REFERENCE_FASTA = os.path.join(ROOT, "database", "reference.fasta")
+REFERENCE_PDB = os.path.join(ROOT, "database", "vsd_water_bk_test.pdb")
+
+# Hélices S1-S4 del PDB de referencia (numeración PDB, el primer residuo es el 93)
+HELICES = {1: (110, 129), 2: (148, 170), 3: (181, 199), 4: (207, 223)}
+FIRST_RESID = 93
+
+SYNTHETIC_PDB = "REMARK 999 SYNTHETIC STRUCTURE\nEND\n"
+
+
+def read_reference_sequence():
+    with open(REFERENCE_FASTA) as f:
+        return "".join(line.strip() for line in f if not line.startswith(">"))
+
+
+def mutate(rng, sequence, rate):
+    return "".join(rng.choice(AMINO_ACIDS) if rng.random() < rate else aa for aa in sequence)
+
+
+def match_line(reference, target):
+    return "".join("*" if a == b else " " for a, b in zip(reference, target))
+
+
+def perturbed_pdb_factory(variants=16, noise=0.3, seed=7):
+    """
+    Factoría de PDB alineados derivados del PDB de referencia: cada variante desplaza
+    todas las coordenadas con ruido gaussiano (como una estructura homóloga ya
+    superpuesta). Se generan ``variants`` variantes y las filas las reciben por turnos.
+
+    Args:
+        variants (int): Número de PDB distintos.
+        noise (float): Desviación típica del ruido, en Å.
+        seed (int): Semilla del ruido.
+
+    Returns:
+        callable: ``(rng, index) -> str`` para ``build_synthetic_database``.
+    """
+    with open(REFERENCE_PDB) as f:
+        atoms = parse_pdb(f.read())
+    noise_rng = np.random.default_rng(seed)
+    texts = [format_pdb(atoms, atoms.coords + noise_rng.normal(scale=noise, size=atoms.coords.shape))
+             for _ in range(variants)]
+    # No se consume ``rng``: el resto de los datos no depende de la factoría elegida
+    return lambda rng, index: texts[index % len(texts)]
+
+
+def drop_indexes(conn):
+    """Elimina los índices secundarios para medir la línea base sin ellos."""
+    for statement in INDEXES:
+        name = statement.split("EXISTS ")[1].split()[0]
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+
+
+def build_synthetic_database(db_path, n_proteins=5000, n_foldseek=20000, valid_fraction=0.6,
+                             mutation_rate=0.3, seed=7, indexes=True, pdb_factory=None):
+    """
+    Crea una base de datos sintética.
+
+    Args:
+        db_path (str): Ruta del archivo a crear (se sobrescribe).
+        n_proteins (int): Proteínas UniProt (cada una con un alineamiento).
+        n_foldseek (int): Aciertos FoldSeek (cada uno con un detalle de alineamiento).
+        valid_fraction (float): Fracción de alineamientos con zonas vsd_valido = 1.
+        mutation_rate (float): Probabilidad de sustitución por residuo.
+        seed (int): Semilla del generador aleatorio.
+        indexes (bool): Si es False, se eliminan los índices secundarios.
+        pdb_factory (callable): ``(rng, index) -> str`` con el PDB alineado de cada fila;
+            por defecto se usa un PDB mínimo.
+
+    Returns:
+        dict: Número de filas generadas por tabla.
+    """
+    rng = random.Random(seed)
+    # Generador aparte para RMSD/átomos alineados: no altera el resto de los datos
+    fit_rng = random.Random(seed + 1)
+    pdb_factory = pdb_factory or (lambda rng, index: SYNTHETIC_PDB)
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        create_database(db_path)
+
+    reference = read_reference_sequence()
+    with open(REFERENCE_PDB) as f:
+        reference_pdb = f.read()
+    zones = {number: reference[start - FIRST_RESID:end - FIRST_RESID + 1]
+             for number, (start, end) in HELICES.items()}
+
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO ReferenceSequences (reference_segment, source_protein, pdb_hash) VALUES (?, ?, ?)",
+                (reference, "vsd_bk", put_pdb(conn, reference_pdb)))
+    reference_id = cur.lastrowid
+    zone_ids = {}
+    for number, fragment in zones.items():
+        cur.execute("""
+            INSERT INTO ReferenceZones (reference_sequence_id, zone_number, sequence_fragment, volume, hydrophobicity)
+            VALUES (?, ?, ?, ?, ?)
+        """, (reference_id, number, fragment, rng.uniform(120, 160), rng.uniform(-1, 2)))
+        zone_ids[number] = cur.lastrowid
+
+    def fit_values(valid):
+        if not valid:
+            return None, None
+        return round(fit_rng.uniform(0.5, 4.0), 3), fit_rng.randint(80, 130)
+
+    def zone_rows(target):
+        for number, fragment in zones.items():
+            start = reference.find(fragment)
+            aligned = target[start:start + len(fragment)]
+            yield (zone_ids[number], aligned, match_line(fragment, aligned),
+                   round(rng.uniform(-1, 2), 3), round(rng.uniform(110, 170), 3),
+                   round(rng.uniform(-1, 1), 3), round(rng.uniform(-20, 20), 3),
+                   rng.choice(["positiva", "negativa", "neutra"]),
+                   ", ".join(rng.choice(["+1", "0", "-1"]) for _ in range(3)),
+                   ", ".join(rng.choice(["+1", "0", "-1"]) for _ in range(3)))
+
+    for i in range(n_proteins):
+        accession = f"SYN{i:06d}"
+        target = mutate(rng, reference, mutation_rate)
+        sequence = "".join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(50, 400))) + target
+        has_pdb = rng.random() < 0.3
+        cur.execute("""
+            INSERT INTO Proteins (accession_number, name, full_name, organism, gene, description, sequence, length)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (accession, f"KCN{i}", f"Synthetic channel {i}", rng.choice(["Homo sapiens", "Mus musculus", "Danio rerio"]),
+              f"kcn{i}", "Synthetic voltage-gated channel", sequence, len(sequence)))
+        cur.execute("INSERT INTO ThreeDStructures (accession_number, has_pdb, has_alphafold) VALUES (?, ?, 1)",
+                    (accession, int(has_pdb)))
+        structure_id = cur.lastrowid
+        cur.execute("INSERT INTO AlphaFoldData (structure_id, identifier, download_link) VALUES (?, ?, ?)",
+                    (structure_id, f"AF-{accession}-F1", f"https://alphafold.ebi.ac.uk/files/AF-{accession}-F1-model_v4.pdb"))
+        if has_pdb:
+            cur.execute("INSERT INTO PDBEntries (structure_id, pdb_id, resolution, download_link) VALUES (?, ?, ?, ?)",
+                        (structure_id, f"{i % 10}X{i % 100:02d}", f"{rng.uniform(1.5, 3.5):.2f} A",
+                         f"https://files.rcsb.org/download/{i % 10}X{i % 100:02d}.pdb"))
+
+        valid = rng.random() < valid_fraction
+        cur.execute("""
+            INSERT INTO Alignments (reference_sequence_id, source_id, source_type, adjusted_score, similarity,
+                                    seq_ref, seq, match, pdb_hash, success_info, rmsd, aligned_atoms)
+            VALUES (?, ?, 'Protein', ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (reference_id, accession, rng.uniform(50, 500), rng.uniform(0.3, 1.0), reference, target,
+              match_line(reference, target), put_pdb(conn, pdb_factory(rng, i)) if valid else None,
+              f"AlphaFold, AF-{accession}-F1, https://alphafold.ebi.ac.uk/files/AF-{accession}-F1-model_v4.pdb",
+              *fit_values(valid)))
+        alignment_id = cur.lastrowid
+        cur.executemany("""
+            INSERT INTO AlignedZones (alignment_id, reference_zone_id, aligned_sequence, match,
+                                      hydrophobicity_aligned, volume_aligned, delta_hydrophobicity, delta_volume,
+                                      tipo_carga, cargas, cargas_reference, vsd_valido)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(alignment_id,) + row + (int(valid),) for row in zone_rows(target)])
+
+    databases = ["afdb50", "afdb-swissprot", "afdb-proteome", "gmgcl_id"]
+    for i in range(n_foldseek):
+        target = mutate(rng, reference, mutation_rate)
+        start = rng.randint(1, 200)
+        cur.execute("""
+            INSERT INTO FoldSeek (id_referencia, database_name, target, seqId, alnLength, dbStartPos, dbEndPos,
+                                  prob, eval, score, taxId, taxName, alphafold_pdb, protein_name, hyperlink, tSeq)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (reference_id, rng.choice(databases), f"AF-FS{i:06d}-F1-model_v4", rng.uniform(0.2, 0.9),
+              len(reference), start, start + len(reference), 1.0, rng.uniform(1e-30, 1e-5), rng.uniform(100, 900),
+              rng.randint(1, 100000), rng.choice(["Homo sapiens", "Mus musculus", "Danio rerio"]),
+              f"AF-FS{i:06d}-F1-model_v4.pdb", f"Synthetic FoldSeek hit {i}",
+              f"https://alphafold.ebi.ac.uk/files/AF-FS{i:06d}-F1-model_v4.pdb", target))
+        foldseek_id = cur.lastrowid
+
+        valid = rng.random() < valid_fraction
+        cur.execute("""
+            INSERT INTO FoldSeekAlignmentDetails (foldseek_id, reference_aligned, match, target_aligned, similarity,
+                                                  pdb_hash, rmsd, aligned_atoms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (foldseek_id, reference, match_line(reference, target), target, rng.uniform(30, 100),
+              put_pdb(conn, pdb_factory(rng, n_proteins + i)) if valid else None, *fit_values(valid)))
+        detail_id = cur.lastrowid
+        cur.executemany("""
+            INSERT INTO FoldSeekAlignedZones (alignment_detail_id, reference_zone_id, fragment, match,
+                                              hydrophobicity, volume, delta_hydrophobicity, delta_volume,
+                                              tipo_carga, cargas, cargas_reference, vsd_valido)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(detail_id,) + row + (int(valid),) for row in zone_rows(target)])
+
+    refresh_foldseek_summary(conn)
+    refresh_uniprot_summary(conn)
+    conn.commit()
+    if not indexes:
+        drop_indexes(conn)
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("Proteins", "Alignments", "AlignedZones", "FoldSeek",
+                            "FoldSeekAlignmentDetails", "FoldSeekAlignedZones")}
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("db_path")
+    parser.add_argument("--proteins", type=int, default=5000)
+    parser.add_argument("--foldseek", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-indexes", action="store_true")
+    parser.add_argument("--pdbs", choices=("minimal", "perturbed"), default="minimal")
+    parser.add_argument("--pdb-variants", type=int, default=16)
+    args = parser.parse_args()
+
+    pdb_factory = perturbed_pdb_factory(args.pdb_variants, seed=args.seed) if args.pdbs == "perturbed" else None
+    counts = build_synthetic_database(args.db_path, args.proteins, args.foldseek, seed=args.seed,
+                                      indexes=not args.no_indexes, pdb_factory=pdb_factory)
+    for table, count in counts.items():
+        print(f"{table:<26}{count:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark del cálculo de propiedades de las zonas alineadas (zone_properties).
+
+Genera una base sintética (por defecto 5000 proteínas y 20000 aciertos FoldSeek, es
+decir, 100k zonas alineadas) y mide: el cálculo zona a zona en Python puro (un
+diccionario por escala y un bucle por residuo) frente a ``zone_rows`` (codificación
+uint8 y conteos por zona multiplicados por las tablas de las escalas), la
+actualización completa de la base (lectura, cálculo y ``executemany`` en una
+transacción) y el recálculo con otra escala de hidrofobicidad.
+
+Uso:
+    python benchmarks/zone_properties.py --proteins 5000 --foldseek 20000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_db import build_synthetic_database
+from application.services.db_connection import get_connection_manager
+from application.services.sequence_encoding import CHARGE_SCALES, HYDROPHOBICITY_SCALES, VOLUME_SCALES
+from application.services.zone_properties import ZONE_TABLES, update_zone_properties, zone_rows, zones_query
+
+
+def python_rows(zones, reference_zones, hydrophobicity, volume, charge):
+    """Mismas filas, zona a zona y residuo a residuo."""
+
+    def properties(sequence):
+        residues = [aa for aa in sequence.upper() if aa in hydrophobicity]
+        if not residues:
+            return None, None, 0
+        return (sum(hydrophobicity[aa] for aa in residues) / len(residues),
+                sum(volume[aa] for aa in residues) / len(residues),
+                sum(charge.get(aa, 0) for aa in residues))
+
+    def charges(sequence):
+        return ", ".join(f"{charge[aa]:+d}" if charge.get(aa) else "0"
+                         for aa in sequence.upper() if aa not in "-.")
+
+    rows = []
+    for aligned_zone_id, reference_zone_id, sequence in zones:
+        sequence = sequence or ""
+        reference = reference_zones.get(reference_zone_id)
+        h, v, net = properties(sequence)
+        ref_h, ref_v, _ = properties(reference) if reference is not None else (None, None, 0)
+        rows.append((
+            None if h is None else round(h, 3), None if v is None else round(v, 3),
+            None if h is None or ref_h is None else round(h - ref_h, 3),
+            None if v is None or ref_v is None else round(v - ref_v, 3),
+            "positiva" if net > 0 else "negativa" if net < 0 else "neutra",
+            charges(sequence), charges(reference) if reference is not None else None,
+            aligned_zone_id,
+        ))
+    return rows
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", type=int, default=5000)
+    parser.add_argument("--foldseek", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "synthetic.db")
+        print(f"Generando base sintética ({args.proteins} proteínas, {args.foldseek} aciertos FoldSeek)...")
+        build_synthetic_database(db_path, args.proteins, args.foldseek)
+        with sqlite3.connect(db_path) as conn:
+            zones = [row for table in ZONE_TABLES for row in conn.execute(zones_query(table))]
+            reference_zones = dict(conn.execute("SELECT zone_id, sequence_fragment FROM ReferenceZones"))
+        print(f"{len(zones):,} zonas alineadas\n")
+
+        scales = (HYDROPHOBICITY_SCALES["kyte_doolittle"], VOLUME_SCALES["zamyatnin"], CHARGE_SCALES["ph7"])
+        python_time, expected = timed(lambda: python_rows(zones, reference_zones, *scales))
+        vector_time, got = timed(lambda: zone_rows(zones, reference_zones, *scales))
+        same = all(a[4:] == b[4:] and all(x is None and y is None or abs(x - y) < 2e-3 for x, y in zip(a[:4], b[:4]))
+                   for a, b in zip(expected, got))
+        print(f"{'Cálculo':<36}{'tiempo':>10}{'zonas/s':>14}")
+        print(f"{'Python, zona a zona':<36}{python_time:>9.2f}s{len(zones) / python_time:>14,.0f}")
+        print(f"{'NumPy, una pasada (zone_rows)':<36}{vector_time:>9.2f}s{len(zones) / vector_time:>14,.0f}   "
+              f"x{python_time / vector_time:.0f}   mismos valores: {'sí' if same else 'NO'}")
+
+        print(f"\n{'Actualización de la base':<36}{'tiempo':>10}{'zonas/s':>14}")
+        for label, hydrophobicity in (("completa (kyte_doolittle)", "kyte_doolittle"),
+                                      ("cambio de escala (hopp_woods)", "hopp_woods")):
+            elapsed, _ = timed(lambda: update_zone_properties(db_path, hydrophobicity=hydrophobicity))
+            print(f"{label:<36}{elapsed:>9.2f}s{len(zones) / elapsed:>14,.0f}")
+        get_connection_manager(db_path).close_all()
+
+
+if __name__ == "__main__":
+    main()
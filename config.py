@@ -5,6 +5,31 @@ class Config:
     DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'database', 'proteins_discovery.db')
     TEMP_DIR = os.path.join(os.path.dirname(__file__), 'data', 'temp')
     OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'data', 'output')
+
+    # Caché local de modelos PDB/AlphaFold descargados
+    STRUCTURE_CACHE_DIR = os.environ.get('STRUCTURE_CACHE_DIR') or os.path.join(os.path.dirname(__file__), 'data', 'structure_cache')
+    STRUCTURE_CACHE_MAX_BYTES = int(os.environ.get('STRUCTURE_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+    STRUCTURE_CACHE_OFFLINE = os.environ.get('STRUCTURE_CACHE_OFFLINE', '0') == '1'
+    STRUCTURE_MIRROR_DIR = os.environ.get('STRUCTURE_MIRROR_DIR')
+
+    # Caché de vistas ya renderizadas (memoria y, si se define el directorio, disco)
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', 256))
+    RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 256 * 1024 ** 2))
+    RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR')
+    RESULT_CACHE_DISK_MAX_BYTES = int(os.environ.get('RESULT_CACHE_DISK_MAX_BYTES', 2 * 1024 ** 3))
+
+    # Exportaciones masivas en segundo plano (los ZIP se eliminan al vencer)
+    EXPORT_DIR = os.environ.get('EXPORT_DIR') or os.path.join(OUTPUT_DIR, 'exports')
+    EXPORT_TTL_SECONDS = int(os.environ.get('EXPORT_TTL_SECONDS', 3600))
+
+    # Instrumentación: cabecera Server-Timing y perfil cProfile de una muestra de peticiones lentas
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 500))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(OUTPUT_DIR, 'profiles')
+
+    # Estructuras en formato binario (memmap) por hash de StructureBlobs; vacío lo desactiva
+    COORDINATE_DIR = os.environ.get('COORDINATE_DIR', os.path.join(os.path.dirname(__file__), 'data', 'coordinates'))
     
     # Asegurar que los directorios existan
     os.makedirs(TEMP_DIR, exist_ok=True)
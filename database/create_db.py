@@ -63,6 +63,144 @@ def create_table(cursor, create_statement):
         print(f"Error al crear la tabla: {e}")
         raise
 
+# Tablas materializadas con los listados de estructuras de la página principal.
+# Las mantiene application/services/summary_tables.py cada vez que se guarda un PDB alineado.
+SUMMARY_TABLES = [
+    '''CREATE TABLE IF NOT EXISTS foldseek_summary_view (
+        alignment_detail_id INTEGER PRIMARY KEY,
+        foldseek_id INTEGER,
+        database_name TEXT,
+        target TEXT,
+        data_version INTEGER NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );''',
+
+    '''CREATE TABLE IF NOT EXISTS uniprot_summary_view (
+        alignment_id INTEGER PRIMARY KEY,
+        accession_number TEXT,
+        protein_name TEXT,
+        has_pdb BOOLEAN,
+        has_alphafold BOOLEAN,
+        data_version INTEGER NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );''',
+
+    # Contador por fuente: versión de los alineamientos que no figuran en los listados
+    '''CREATE TABLE IF NOT EXISTS summary_versions (
+        source TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    );''',
+
+    "CREATE INDEX IF NOT EXISTS idx_foldseek_summary_order ON foldseek_summary_view (foldseek_id, alignment_detail_id)",
+    "CREATE INDEX IF NOT EXISTS idx_uniprot_summary_order ON uniprot_summary_view (has_pdb DESC, alignment_id)",
+    "CREATE INDEX IF NOT EXISTS idx_uniprot_summary_accession ON uniprot_summary_view (accession_number)",
+]
+
+# PDB comprimidos y deduplicados (ver application/services/structure_store.py).
+# Alignments, FoldSeekAlignmentDetails y ReferenceSequences los referencian por pdb_hash.
+STRUCTURE_BLOBS_TABLE = '''CREATE TABLE IF NOT EXISTS StructureBlobs (
+    pdb_hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);'''
+
+# Estado de cada entrada de la ingesta (ver application/services/ingestion_pipeline.py).
+CHECKPOINT_TABLE = '''CREATE TABLE IF NOT EXISTS IngestionCheckpoints (
+    source TEXT NOT NULL,
+    entry_key TEXT NOT NULL,
+    status TEXT CHECK(status IN ('done', 'failed')),
+    info TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, entry_key)
+);'''
+
+# Índices secundarios para las uniones y filtros de las consultas de la aplicación.
+# Los índices parciales sobre vsd_valido = 1 cubren las subconsultas
+# "SELECT DISTINCT alignment_id ... WHERE vsd_valido = 1" sin tocar la tabla.
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_alignments_source_id ON Alignments (source_id)",
+    "CREATE INDEX IF NOT EXISTS idx_alignments_reference ON Alignments (reference_sequence_id)",
+    "CREATE INDEX IF NOT EXISTS idx_alignedzones_alignment ON AlignedZones (alignment_id, reference_zone_id)",
+    "CREATE INDEX IF NOT EXISTS idx_alignedzones_valid ON AlignedZones (alignment_id) WHERE vsd_valido = 1",
+    "CREATE INDEX IF NOT EXISTS idx_threed_accession ON ThreeDStructures (accession_number, has_pdb, has_alphafold)",
+    "CREATE INDEX IF NOT EXISTS idx_pdbentries_structure ON PDBEntries (structure_id)",
+    "CREATE INDEX IF NOT EXISTS idx_alphafold_structure ON AlphaFoldData (structure_id)",
+    "CREATE INDEX IF NOT EXISTS idx_referencezones_reference ON ReferenceZones (reference_sequence_id, zone_number)",
+    "CREATE INDEX IF NOT EXISTS idx_foldseek_reference ON FoldSeek (id_referencia)",
+    "CREATE INDEX IF NOT EXISTS idx_fad_foldseek ON FoldSeekAlignmentDetails (foldseek_id)",
+    "CREATE INDEX IF NOT EXISTS idx_faz_detail ON FoldSeekAlignedZones (alignment_detail_id, reference_zone_id)",
+    "CREATE INDEX IF NOT EXISTS idx_faz_valid ON FoldSeekAlignedZones (alignment_detail_id) WHERE vsd_valido = 1",
+    "CREATE INDEX IF NOT EXISTS idx_helices_aligned_zone ON HelicesDetails (aligned_zone_id)",
+]
+
+def create_indexes(cursor):
+    """
+    Crea los índices secundarios de INDEXES que falten y, si se creó alguno, actualiza
+    las estadísticas del planificador.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor para ejecutar comandos SQL.
+
+    Returns:
+        int: Número de índices creados.
+    """
+    count_query = "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index'"
+    before = cursor.execute(count_query).fetchone()[0]
+    for index_statement in INDEXES:
+        cursor.execute(index_statement)
+    created = cursor.execute(count_query).fetchone()[0] - before
+    if created:
+        cursor.execute("ANALYZE")
+    return created
+
+# Columnas añadidas después de la creación original del esquema: (tabla, columna, tipo)
+COLUMN_MIGRATIONS = [
+    ("Alignments", "rmsd", "FLOAT"),
+    ("Alignments", "aligned_atoms", "INTEGER"),
+    ("FoldSeekAlignmentDetails", "rmsd", "FLOAT"),
+    ("FoldSeekAlignmentDetails", "aligned_atoms", "INTEGER"),
+    ("Alignments", "pdb_hash", "TEXT"),
+    ("FoldSeekAlignmentDetails", "pdb_hash", "TEXT"),
+    ("ReferenceSequences", "pdb_hash", "TEXT"),
+    ("ProteinCalculations", "sequence_hash", "TEXT"),
+    ("ProteinCalculations", "grafo_hash", "TEXT"),
+    ("Alignments", "helices_hash", "TEXT"),
+    ("FoldSeekAlignmentDetails", "helices_hash", "TEXT"),
+    ("HelicesDetails", "source", "TEXT"),
+    ("Alignments", "alignment_hash", "TEXT"),
+]
+
+def add_missing_columns(cursor):
+    """
+    Agrega a una base de datos existente las columnas de COLUMN_MIGRATIONS que falten.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor para ejecutar comandos SQL.
+    """
+    for table, column, column_type in COLUMN_MIGRATIONS:
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        if existing and column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            print(f"Columna {table}.{column} agregada.")
+
+def upgrade_database(db_name):
+    """
+    Actualiza el esquema de una base de datos existente sin recrearla.
+
+    Args:
+        db_name (str): Nombre del archivo de la base de datos.
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(STRUCTURE_BLOBS_TABLE)
+        add_missing_columns(cursor)
+        create_indexes(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+
 def create_database(db_name, force_create=False):
     """
     Crea la estructura de la base de datos.
@@ -109,6 +247,7 @@ def create_database(db_name, force_create=False):
             reference_segment TEXT,
             source_protein TEXT,
             pdb TEXT,
+            pdb_hash TEXT,
             FOREIGN KEY (source_protein) REFERENCES Proteins (accession_number)
         );''',
 
@@ -169,6 +308,11 @@ def create_database(db_name, force_create=False):
             match TEXT, 
             pdb TEXT,             
             success_info TEXT,          
+            rmsd FLOAT,
+            aligned_atoms INTEGER,
+            pdb_hash TEXT,
+            helices_hash TEXT,
+            alignment_hash TEXT,
             FOREIGN KEY (reference_sequence_id) REFERENCES ReferenceSequences (reference_sequence_id),
             FOREIGN KEY (source_id) REFERENCES Proteins (accession_number) ON DELETE CASCADE,
             FOREIGN KEY (source_id) REFERENCES Isoforms (isoform_id) ON DELETE CASCADE
@@ -230,6 +374,10 @@ def create_database(db_name, force_create=False):
             target_aligned TEXT,
             similarity FLOAT,
             pdb TEXT,
+            rmsd FLOAT,
+            aligned_atoms INTEGER,
+            pdb_hash TEXT,
+            helices_hash TEXT,
             FOREIGN KEY (foldseek_id) REFERENCES FoldSeek (foldseek_id)
         );''',
 
@@ -258,12 +406,15 @@ def create_database(db_name, force_create=False):
             helix TEXT,
             residue_id INTEGER,
             location TEXT CHECK(location IN ('I', 'O')),
+            source TEXT,
             FOREIGN KEY (aligned_zone_id) REFERENCES AlignedZones (aligned_zone_id)
         );'''
     ]
 
-    for create_statement in tables:
+    for create_statement in tables + [STRUCTURE_BLOBS_TABLE, CHECKPOINT_TABLE] + SUMMARY_TABLES:
         create_table(cursor, create_statement)
+    add_missing_columns(cursor)
+    create_indexes(cursor)
 
     connection.commit()
     connection.close()